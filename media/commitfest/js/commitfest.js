@@ -380,15 +380,177 @@ git checkout commitfest/cf/${patchId}
 `);
 }
 
+/*
+ * Initialize the Bootstrap tooltips of the elements in root, which is either
+ * the document or content that was added to it later.
+ */
+function initTooltips(root) {
+    for (const el of root.querySelectorAll('[data-bs-toggle="tooltip"]')) {
+        bootstrap.Tooltip.getOrCreateInstance(el);
+    }
+}
+
+// How often to load the dashboard again when it keeps changing while loading
+const DASHBOARD_MAX_RELOADS = 3;
+
+/*
+ * Load the parts of the dashboard that are not included in the page itself.
+ * They are all requested at the same time, and each one is shown as soon as
+ * it arrives.
+ *
+ * Each request carries the version of the dashboard, and the server answers
+ * 409 with the new version when the dashboard changed since then, see
+ * _dashboard_version_conflict(). Then all parts are loaded again, so that
+ * they don't contradict each other. If it keeps changing, the last attempt
+ * is made without a version.
+ */
+function loadDashboardSections(version, reloads = 0) {
+    const sections = $(".dashboard-section");
+    if (version === undefined) {
+        version = sections.first().attr("data-version");
+    }
+    let reloading = false;
+    sections.each((i, o) => {
+        const section = $(o);
+        $.ajax({
+            url: section.data("url"),
+            dataType: "json",
+            headers: version ? { "X-Dashboard-Version": version } : {},
+        })
+            .done((data) => {
+                if (reloading) {
+                    return;
+                }
+                section.html(data.html);
+                initTooltips(o);
+            })
+            .fail((xhr) => {
+                if (reloading) {
+                    return;
+                }
+                if (xhr.status === 409) {
+                    reloading = true;
+                    loadDashboardSections(
+                        reloads + 1 < DASHBOARD_MAX_RELOADS
+                            ? xhr.responseJSON.version
+                            : null,
+                        reloads + 1,
+                    );
+                    return;
+                }
+                section
+                    .find(".text-muted")
+                    .removeClass("text-muted")
+                    .addClass("text-danger")
+                    .text("Failed to load, please reload the page.");
+            });
+    });
+}
+
+/*
+ * Fetch the next page of rows for a "show more" button, and append them to
+ * the element it points to. The button then points to the page after that,
+ * or goes away when there is nothing left to show.
+ */
+function loadMoreRows(button) {
+    button.prop("disabled", true);
+    $.getJSON(button.data("url"))
+        .done((data) => {
+            const target = $(button.data("target"));
+            target.append(data.html);
+            initTooltips(target[0]);
+            if (data.next) {
+                button.data("url", data.next);
+                button.prop("disabled", false);
+            } else {
+                button.remove();
+            }
+        })
+        .fail(() => {
+            button
+                .removeClass("btn-secondary")
+                .addClass("btn-danger")
+                .text("Failed to load, please reload the page.");
+        });
+}
+
+/*
+ * Follow the live activity stream of the page, see live.py. On the activity
+ * log new entries are added to the top of the table, on other pages a
+ * notice is shown that things have changed.
+ *
+ * The browser connects again by itself when the stream ends, and then sends
+ * the id of the last entry it got, so that the server can send the ones that
+ * were missed. If the server can't be reached at all, the browser gives up,
+ * so then we connect again ourselves after a while.
+ */
+function followActivityStream() {
+    const container = $("#activity-stream");
+    if (container.length === 0 || !window.EventSource) {
+        return;
+    }
+
+    let lastEventId = container.data("last-event-id");
+    let delay = 5000;
+    const rows = container.data("rows");
+
+    const connect = () => {
+        let url = container.data("url");
+        if (lastEventId) {
+            url += `${url.includes("?") ? "&" : "?"}last_event_id=${lastEventId}`;
+        }
+        const source = new EventSource(url);
+
+        source.onopen = () => {
+            delay = 5000;
+        };
+        source.addEventListener("history", (e) => {
+            lastEventId = e.lastEventId;
+            if (rows) {
+                const a = JSON.parse(e.data);
+                $(rows).prepend(
+                    $("<tr>").append(
+                        $("<td>")
+                            .css("white-space", "nowrap")
+                            .text(a.date.replace("T", " ").substring(0, 19)),
+                        $("<td>").text(a.by),
+                        $("<td>").append(
+                            $("<a>")
+                                .attr("href", `/patch/${a.patchid}/`)
+                                .text(a.name),
+                        ),
+                        $("<td>").text(a.what),
+                    ),
+                );
+            } else {
+                container.removeClass("d-none");
+            }
+        });
+        source.addEventListener("cfbot", () => {
+            if (!rows) {
+                container.removeClass("d-none");
+            }
+        });
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(connect, delay);
+                delay = Math.min(delay * 2, 60000);
+            }
+        };
+    };
+    connect();
+}
+
 /* Build our button callbacks */
 $(document).ready(() => {
-    // Initialize Bootstrap tooltips
-    const tooltipTriggerList = [].slice.call(
-        document.querySelectorAll('[data-bs-toggle="tooltip"]'),
-    );
-    const tooltipList = tooltipTriggerList.map(
-        (tooltipTriggerEl) => new bootstrap.Tooltip(tooltipTriggerEl),
-    );
+    loadDashboardSections();
+    followActivityStream();
+
+    $("button.load-more-rows").click((e) => {
+        loadMoreRows($(e.currentTarget));
+    });
+
+    initTooltips(document);
 
     $("button.attachThreadButton").each((i, o) => {
         const b = $(o);
@@ -0,0 +1,17 @@
+"""
+ASGI config for pgcommitfest project.
+
+This only needs to serve the live activity streams (see
+commitfest/live.py), everything else is served by the WSGI application.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+from django.core.asgi import get_asgi_application
+
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pgcommitfest.settings")
+
+application = get_asgi_application()
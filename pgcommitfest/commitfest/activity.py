@@ -0,0 +1,201 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+import hashlib
+from calendar import timegm
+
+from .feeds import ActivityFeed
+from .models import CommitFest, PatchHistory
+
+# The RSS feeds of the activity log are polled by lots of feed readers, so
+# they are rendered when history gets written and stored in the cache, and
+# a poll only has to read them from there.
+#
+# Writes in quick succession, like when a commitfest gets closed, would
+# render the same feed over and over again. So a feed is rendered at most
+# once per FEED_DEBOUNCE seconds: writes in between only mark it as stale,
+# and the first poll after that renders it again.
+FEED_DEBOUNCE = 60
+# Things that don't create history, like renaming a patch, still show up
+# in the feeds after this long.
+FEED_TIMEOUT = 3600
+FEED_LENGTH = 50
+
+# The types of activity the log and the feeds can be limited to, by the name
+# used in the URL. Without one, everything except what cfbot does is shown.
+ACTIVITY_FILTERS = {
+    "status": (
+        "Status changes",
+        [PatchHistory.EVENT_STATUS, PatchHistory.EVENT_CLOSED],
+    ),
+    "moves": ("Moves to other commitfests", [PatchHistory.EVENT_MOVED]),
+    "people": (
+        "Reviewers and committers",
+        [
+            PatchHistory.EVENT_REVIEWER_ADDED,
+            PatchHistory.EVENT_REVIEWER_REMOVED,
+            PatchHistory.EVENT_REVIEWERS_REMOVED,
+            PatchHistory.EVENT_COMMITTER_ADDED,
+            PatchHistory.EVENT_COMMITTER_REMOVED,
+        ],
+    ),
+    "mail": (
+        "Reviews, comments and threads",
+        [
+            PatchHistory.EVENT_POSTED,
+            PatchHistory.EVENT_THREAD_ATTACHED,
+            PatchHistory.EVENT_THREAD_DETACHED,
+            PatchHistory.EVENT_ANNOTATION_ADDED,
+            PatchHistory.EVENT_ANNOTATION_DELETED,
+        ],
+    ),
+    "edits": (
+        "New and edited patches",
+        [PatchHistory.EVENT_CREATED, PatchHistory.EVENT_EDITED],
+    ),
+    "cfbot": (
+        "CFbot",
+        [PatchHistory.EVENT_NEEDS_REBASE, PatchHistory.EVENT_REBASED],
+    ),
+}
+
+
+def get_activity_filter(request):
+    """Return the name of the activity filter in the request, if it's a
+    valid one"""
+    name = request.GET.get("type")
+    return name if name in ACTIVITY_FILTERS else None
+
+
+def _filter_names_for(history):
+    """The filters a history entry shows up in"""
+    names = [None] if not history.by_cfbot else []
+    names.extend(
+        name
+        for name, (_, events) in ACTIVITY_FILTERS.items()
+        if history.event in events
+    )
+    return names
+
+
+def load_activity(cfid=None, num=100, before=None, after_id=None, filtername=None):
+    """Return the latest num history entries, of one commitfest or all of
+    them, that match the activity filter
+
+    If before is given, only the entries before that (date, id) are
+    returned, and if after_id is given only the ones that were added after
+    that entry.
+    """
+    params = {"num": num}
+    if filtername:
+        where = ["ph.event = ANY(%(events)s)"]
+        params["events"] = ACTIVITY_FILTERS[filtername][1]
+    else:
+        where = ["NOT ph.by_cfbot"]
+    if cfid:
+        where.append("ph.commitfest_id=%(cfid)s")
+        params["cfid"] = cfid
+    if before:
+        where.append("(ph.date, ph.id) < (%(date)s, %(id)s)")
+        params.update({"date": before[0], "id": before[1]})
+    if after_id:
+        where.append("ph.id > %(after_id)s")
+        params["after_id"] = after_id
+
+    where_str = " AND ".join(where)
+    curs = connection.cursor()
+    curs.execute(
+        f"SELECT ph.id, ph.date, COALESCE(auth_user.username, 'CFbot') AS by, ph.what, p.id AS patchid, p.name FROM commitfest_patchhistory ph INNER JOIN commitfest_patch p ON ph.patch_id=p.id LEFT JOIN auth_user on auth_user.id=ph.by_id WHERE {where_str} ORDER BY ph.date DESC, ph.id DESC LIMIT %(num)s",
+        params,
+    )
+    return [dict(zip([c[0] for c in curs.description], r)) for r in curs.fetchall()]
+
+
+# A feed is for one commitfest or all of them, and for one activity filter or
+# none. Together those are its scope.
+def _scope(cfid, filtername):
+    return f"{cfid or 'all'}:{filtername or 'all'}"
+
+
+def _feed_key(cfid, filtername):
+    return f"activityfeed:feed:{_scope(cfid, filtername)}"
+
+
+def _stale_key(cfid, filtername):
+    return f"activityfeed:stale:{_scope(cfid, filtername)}"
+
+
+def _debounce_key(cfid, filtername):
+    return f"activityfeed:debounce:{_scope(cfid, filtername)}"
+
+
+def render_activity_feed(cfid=None, filtername=None):
+    """Render a feed and store it"""
+    cf = get_object_or_404(CommitFest, pk=cfid) if cfid else None
+    # Writes from now on need another render, even if they happen while
+    # this one is running.
+    cache.delete(_stale_key(cfid, filtername))
+
+    activity = load_activity(cfid, FEED_LENGTH, filtername=filtername)
+    content = (
+        ActivityFeed(
+            activity, cf, filtername and (filtername, ACTIVITY_FILTERS[filtername][0])
+        )
+        .writeString("utf-8")
+        .encode()
+    )
+    feed = {
+        "content": content,
+        "content_type": ActivityFeed.content_type,
+        "etag": '"{0}"'.format(hashlib.sha256(content).hexdigest()),
+        "last_modified": (
+            timegm(activity[0]["date"].utctimetuple()) if activity else None
+        ),
+    }
+    cache.set(_feed_key(cfid, filtername), feed, FEED_TIMEOUT)
+    return feed
+
+
+def activity_feed_response(request, cfid=None):
+    filtername = get_activity_filter(request)
+    feed_key = _feed_key(cfid, filtername)
+    stale_key = _stale_key(cfid, filtername)
+    stored = cache.get_many([feed_key, stale_key])
+    feed = stored.get(feed_key)
+    if feed is None or (
+        stale_key in stored
+        and cache.add(_debounce_key(cfid, filtername), 1, FEED_DEBOUNCE)
+    ):
+        feed = render_activity_feed(cfid, filtername)
+
+    response = HttpResponse(feed["content"], content_type=feed["content_type"])
+    response["ETag"] = feed["etag"]
+    if feed["last_modified"]:
+        response["Last-Modified"] = http_date(feed["last_modified"])
+    return get_conditional_response(
+        request,
+        etag=feed["etag"],
+        last_modified=feed["last_modified"],
+        response=response,
+    )
+
+
+def _activity_written(scopes):
+    for cfid, filtername in scopes:
+        if cache.add(_debounce_key(cfid, filtername), 1, FEED_DEBOUNCE):
+            render_activity_feed(cfid, filtername)
+        else:
+            cache.set(_stale_key(cfid, filtername), True, FEED_TIMEOUT)
+
+
+def patch_history_saved(sender, instance, created, **kwargs):
+    """Render the feeds the new entry shows up in again, once it's
+    committed"""
+    if created:
+        cfids = [None] + ([instance.commitfest_id] if instance.commitfest_id else [])
+        scopes = [(c, f) for c in cfids for f in _filter_names_for(instance)]
+        transaction.on_commit(lambda: _activity_written(scopes))
@@ -12,6 +12,7 @@ from .models import (
     Patch,
     PatchHistory,
     PatchOnCommitFest,
+    PatchSummary,
     Tag,
     TargetVersion,
     Topic,
@@ -31,6 +32,10 @@ class PatchAdmin(admin.ModelAdmin):
     inlines = (PatchOnCommitFestInline,)
     list_display = ("name",)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_summary()
+
 
 class MailThreadAdmin(admin.ModelAdmin):
     list_display = (
@@ -67,6 +72,12 @@ class TagAdmin(admin.ModelAdmin):
         ColorField: {"widget": ColorInput},
     }
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Tag names are part of the search document of the patches
+        if change and "name" in form.changed_data:
+            PatchSummary.refresh(obj.patches.values_list("id", flat=True))
+
 
 admin.site.register(Committer, CommitterAdmin)
 admin.site.register(CommitFest)
@@ -14,11 +14,13 @@ import requests
 
 from pgcommitfest.auth import user_search
 
+from .cache import invalidate_pages_of_patches, invalidate_patch_pages
 from .models import (
     CommitFest,
     MailThread,
     MailThreadAnnotation,
     MailThreadAttachment,
+    MailThreadMessage,
     Patch,
     PatchHistory,
 )
@@ -131,6 +133,10 @@ def refresh_single_thread(thread):
         thread.latestauthor = r[-1]["from"]
         thread.latestsubject = r[-1]["subj"]
         thread.save()
+        thread.update_patch_summaries()
+
+        for p in thread.patches.all():
+            invalidate_patch_pages(p)
 
 
 @transaction.atomic
@@ -155,16 +161,21 @@ def annotateMessage(request):
                 mailauthor=m["from"],
             )
             annotation.save()
+            thread.update_patch_summaries()
 
-            for p in thread.patches.all():
+            patches = list(thread.patches.all())
+            for p in patches:
                 PatchHistory(
                     patch=p,
                     by=request.user,
                     what='Added annotation "%s" to %s'
                     % (textwrap.shorten(msg, 100), msgid),
+                    event=PatchHistory.EVENT_ANNOTATION_ADDED,
+                    data={"messageid": msgid},
                 ).save_and_notify()
                 p.set_modified()
                 p.save()
+            invalidate_pages_of_patches([p.id for p in patches])
 
             return "OK"
     return "Message not found in thread!"
@@ -174,22 +185,40 @@ def annotateMessage(request):
 def deleteAnnotation(request):
     annotation = get_object_or_404(MailThreadAnnotation, pk=request.POST["id"])
 
-    for p in annotation.mailthread.patches.all():
+    patches = list(annotation.mailthread.patches.all())
+    for p in patches:
         PatchHistory(
             patch=p,
             by=request.user,
             what='Deleted annotation "%s" from %s'
             % (annotation.annotationtext, annotation.msgid),
+            event=PatchHistory.EVENT_ANNOTATION_DELETED,
+            data={"messageid": annotation.msgid},
         ).save_and_notify()
         p.set_modified()
         p.save()
 
     annotation.delete()
+    annotation.mailthread.update_patch_summaries()
+    invalidate_pages_of_patches([p.id for p in patches])
 
     return "OK"
 
 
+def record_thread_messages(threadinfo, mailthread):
+    # Remember the ids of all messages in the thread, so searching for any of
+    # them finds the thread without asking the archives.
+    MailThreadMessage.objects.bulk_create(
+        [
+            MailThreadMessage(mailthread=mailthread, messageid=t["msgid"])
+            for t in threadinfo
+        ],
+        ignore_conflicts=True,
+    )
+
+
 def parse_and_add_attachments(threadinfo, mailthread):
+    record_thread_messages(threadinfo, mailthread)
     for t in threadinfo:
         if len(t["atts"]):
             # One or more attachments. For now, we're only actually going
@@ -239,6 +268,10 @@ def doAttachThread(cf, patch, msgid, user):
         thread.latestsubject = r[-1]["subj"]
         thread.latestmsgid = r[-1]["msgid"]
         thread.save()
+        record_thread_messages(r, thread)
+        # The latest subject is part of the search document of the other
+        # patches on this thread as well.
+        thread.update_patch_summaries()
     else:
         # No existing thread existed, so create it
         # Now create a new mailthread entry
@@ -256,13 +289,19 @@ def doAttachThread(cf, patch, msgid, user):
         m.patches.add(patch)
         m.save()
         parse_and_add_attachments(r, m)
+        patch.update_summary()
 
     PatchHistory(
-        patch=patch, by=user, what="Attached mail thread %s" % r[0]["msgid"]
+        patch=patch,
+        by=user,
+        what="Attached mail thread %s" % r[0]["msgid"],
+        event=PatchHistory.EVENT_THREAD_ATTACHED,
+        data={"messageid": r[0]["msgid"]},
     ).save_and_notify()
     patch.update_lastmail()
     patch.set_modified()
     patch.save()
+    invalidate_patch_pages(patch)
 
     return "OK"
 
@@ -278,10 +317,14 @@ def detachThread(request):
         patch=patch,
         by=request.user,
         what="Detached mail thread %s" % request.POST["msg"],
+        event=PatchHistory.EVENT_THREAD_DETACHED,
+        data={"messageid": request.POST["msg"]},
     ).save_and_notify()
     patch.update_lastmail()
     patch.set_modified()
     patch.save()
+    patch.update_summary()
+    invalidate_patch_pages(patch)
 
     return "OK"
 
@@ -1,5 +1,7 @@
+from django.db import connection
 from django.http import (
     HttpResponse,
+    StreamingHttpResponse,
 )
 from django.shortcuts import get_object_or_404
 
@@ -11,6 +13,11 @@ from .models import (
     Patch,
     PatchOnCommitFest,
 )
+from .views import patchlist_query
+
+# Number of rows fetched from the database at a time when streaming a patch
+# list
+PATCHLIST_FETCH_SIZE = 500
 
 
 def datetime_serializer(obj):
@@ -87,6 +94,53 @@ def commitfest_patches(request, cfid):
     )
 
 
+def commitfest_patchlist(request, cfid):
+    """Return the patch list of a commitfest.
+
+    This supports the same filters and orderings as the commitfest page, using
+    the same query parameters. Unlike the commitfest page it returns all
+    matching patches at once, so the response is streamed to not have to keep
+    all of them in memory.
+    """
+    cf = get_object_or_404(CommitFest, pk=cfid)
+
+    query = patchlist_query(request, cf)
+    if query is None:
+        return api_response({"error": "Login required for this filter"}, status=401)
+
+    response = StreamingHttpResponse(
+        _stream_patchlist(cf, query), content_type="application/json"
+    )
+    response["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+def _stream_patchlist(cf, query):
+    statusstrings = dict(PatchOnCommitFest._STATUS_CHOICES)
+    yield f'{{"commitfest_id": {cf.id}, "patches": ['
+    # A server side cursor, so we only have a limited number of rows in
+    # memory at any time.
+    with connection.chunked_cursor() as curs:
+        curs.itersize = PATCHLIST_FETCH_SIZE
+        curs.execute(query.sql, query.params)
+        separator = ""
+        while True:
+            rows = curs.fetchmany(PATCHLIST_FETCH_SIZE)
+            if not rows:
+                break
+            columns = [col[0] for col in curs.description]
+            patches = []
+            for row in rows:
+                patch = dict(zip(columns, row))
+                for i in range(len(query.sortcols)):
+                    del patch[f"sortval_{i}"]
+                patch["statusstring"] = statusstrings[patch["status"]]
+                patches.append(json.dumps(patch, default=datetime_serializer))
+            yield separator + ", ".join(patches)
+            separator = ", "
+    yield "]}"
+
+
 def patch_threads(request, patch_id):
     """Return thread information for a patch.
 
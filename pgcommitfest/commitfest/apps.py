@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 
 
 class CFAppConfig(AppConfig):
@@ -6,6 +7,59 @@ class CFAppConfig(AppConfig):
 
     def ready(self):
         from pgcommitfest.auth import auth_user_data_received
+        from pgcommitfest.commitfest.activity import patch_history_saved
+        from pgcommitfest.commitfest.cache import patch_people_changed
+        from pgcommitfest.commitfest.memo import (
+            commitfest_changed,
+            patch_on_commitfest_changed,
+            user_email_changed,
+        )
+        from pgcommitfest.commitfest.models import (
+            CommitFest,
+            Committer,
+            Patch,
+            PatchHistory,
+            PatchOnCommitFest,
+            PatchStatus,
+            Tag,
+            TargetVersion,
+            create_patch_summary,
+            refresh_user_patch_summaries,
+            tag_deleted,
+            tag_deleting,
+        )
+        from pgcommitfest.commitfest.refdata import (
+            committer_data_received,
+            reference_data_changed,
+        )
+        from pgcommitfest.userprofile.models import UserExtraEmail, UserProfile
         from pgcommitfest.userprofile.util import handle_user_data
 
         auth_user_data_received.connect(handle_user_data)
+        auth_user_data_received.connect(refresh_user_patch_summaries)
+        auth_user_data_received.connect(committer_data_received)
+
+        for model in (Tag, TargetVersion, Committer, PatchStatus):
+            post_save.connect(reference_data_changed, sender=model)
+            post_delete.connect(reference_data_changed, sender=model)
+
+        # Keep the patch summaries complete, see PatchSummary
+        post_save.connect(create_patch_summary, sender=Patch)
+        pre_delete.connect(tag_deleting, sender=Tag)
+        post_delete.connect(tag_deleted, sender=Tag)
+
+        m2m_changed.connect(patch_people_changed, sender=Patch.authors.through)
+        m2m_changed.connect(patch_people_changed, sender=Patch.reviewers.through)
+
+        # Forget the lookups that are memoized for the request, see memo.py
+        post_save.connect(commitfest_changed, sender=CommitFest)
+        post_delete.connect(commitfest_changed, sender=CommitFest)
+        post_save.connect(patch_on_commitfest_changed, sender=PatchOnCommitFest)
+        post_delete.connect(patch_on_commitfest_changed, sender=PatchOnCommitFest)
+        post_save.connect(user_email_changed, sender=UserProfile)
+        # Deleting the selected email makes the profile fall back to the
+        # main one, without saving the profile.
+        post_delete.connect(user_email_changed, sender=UserExtraEmail)
+
+        # Render the activity feeds again, see activity.py
+        post_save.connect(patch_history_saved, sender=PatchHistory)
@@ -0,0 +1,213 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.cache import get_conditional_response
+
+import functools
+import hashlib
+import time
+
+# Rendered pages are never cached longer than this, so things that we don't
+# explicitly invalidate for (e.g. relative timestamps, or user names) don't
+# get too stale.
+PAGE_CACHE_TIMEOUT = 300
+
+
+def _version_key(scope):
+    return f"pagecache:version:{scope}"
+
+
+def _get_versions(scopes):
+    keys = [_version_key(s) for s in scopes]
+    versions = cache.get_many(keys)
+    return [versions.get(k, 0) for k in keys]
+
+
+def _bump_versions(scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Start from the current time instead of 1, so that if the version
+            # got evicted from the cache we don't go back to a version that
+            # might still have pages cached for it.
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def _request_hash(request, *extra):
+    query = [(k, sorted(request.GET.getlist(k))) for k in sorted(request.GET.keys())]
+    return hashlib.sha256(repr((request.path, query) + extra).encode()).hexdigest()
+
+
+def _page_cache_key(request, versions):
+    return f"pagecache:page:{_request_hash(request, versions)}"
+
+
+def _is_cacheable_request(request):
+    # Only anonymous requests without any cookies get cached pages. Anything
+    # with a session or messages cookie might render something specific to
+    # the user.
+    if request.method != "GET":
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    if "messages" in request.COOKIES:
+        return False
+    return True
+
+
+def cache_anonymous_page(scope):
+    """Cache the full response of a view for anonymous users
+
+    The first argument of the view is the id of the object the page is about,
+    which together with the scope ("cf" or "patch") determines which
+    invalidations apply to it.
+    """
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, objid, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view(request, objid, *args, **kwargs)
+
+            key = _page_cache_key(request, _get_versions(["all", f"{scope}:{objid}"]))
+            response = cache.get(key)
+            if response is not None:
+                # The cached page still matches the ETag it was rendered with,
+                # so we can answer conditional requests without the database.
+                return get_conditional_response(
+                    request, etag=response.get("ETag"), response=response
+                )
+
+            response = view(request, objid, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(key, response, PAGE_CACHE_TIMEOUT)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _count_dashboard(what):
+    key = f"dashboardcache:{what}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def dashboard_version(request):
+    """Return a token that changes whenever the dashboard of the current user
+    may change, with the same invalidations as cached_dashboard_data()"""
+    return "-".join(str(v) for v in _get_versions(["all", f"user:{request.user.id}"]))
+
+
+def cached_dashboard_data(request, name, compute):
+    """Return the result of compute() for the dashboard of the current user
+
+    The result is cached per user and per set of filters, until something
+    happens to one of the patches the user is involved in (see
+    invalidate_patch_pages), or to the commitfests. It must be picklable.
+    """
+    versions = _get_versions(["all", f"user:{request.user.id}"])
+    key = (
+        f"dashboardcache:data:{_request_hash(request, name, request.user.id, versions)}"
+    )
+    data = cache.get(key)
+    if data is not None:
+        _count_dashboard("hits")
+        return data
+
+    _count_dashboard("misses")
+    data = compute()
+    cache.set(key, data, PAGE_CACHE_TIMEOUT)
+    return data
+
+
+def dashboard_cache_stats():
+    """Return the number of dashboard cache hits and misses, of all processes
+    that share the cache"""
+    counts = cache.get_many(["dashboardcache:hits", "dashboardcache:misses"])
+    return {
+        "hits": counts.get("dashboardcache:hits", 0),
+        "misses": counts.get("dashboardcache:misses", 0),
+    }
+
+
+def reset_dashboard_cache_stats():
+    cache.delete_many(["dashboardcache:hits", "dashboardcache:misses"])
+
+
+def _involved_user_ids(*patch_ids):
+    with connection.cursor() as curs:
+        curs.execute(
+            "SELECT DISTINCT user_id FROM commitfest_patchinvolvement WHERE patch_id=ANY(%s)",
+            [list(patch_ids)],
+        )
+        return {r[0] for r in curs.fetchall()}
+
+
+def invalidate_user_dashboards(user_ids):
+    """Invalidate the cached dashboards of these users, after the current
+    transaction commits"""
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: _bump_versions([f"user:{u}" for u in user_ids]))
+
+
+def invalidate_patch_pages(patch):
+    """Invalidate the cached pages showing this patch
+
+    That's the patch page itself, the pages of all commitfests it's in, and
+    the dashboards of everyone involved in it. This happens when the current
+    transaction commits, so that no request can cache the old data again in
+    between.
+    """
+    invalidate_pages_of_patches([patch.id])
+
+
+def invalidate_pages_of_patches(patch_ids):
+    """Like invalidate_patch_pages, for many patches at once"""
+    patch_ids = list(patch_ids)
+    if not patch_ids:
+        return
+
+    # Users that are involved in the patches now, as well as when the
+    # transaction commits, so that both the ones that get removed and the
+    # ones that get added in this transaction see the change.
+    user_ids = _involved_user_ids(*patch_ids)
+
+    def invalidate():
+        user_ids.update(_involved_user_ids(*patch_ids))
+        with connection.cursor() as curs:
+            curs.execute(
+                "SELECT DISTINCT commitfest_id FROM commitfest_patchoncommitfest WHERE patch_id=ANY(%s)",
+                [patch_ids],
+            )
+            cfids = [r[0] for r in curs.fetchall()]
+        _bump_versions(
+            [f"patch:{p}" for p in patch_ids]
+            + [f"cf:{cfid}" for cfid in cfids]
+            + [f"user:{u}" for u in user_ids]
+        )
+
+    transaction.on_commit(invalidate)
+
+
+def patch_people_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Invalidate the dashboards of authors and reviewers that get added or
+    removed"""
+    if action not in ("pre_add", "pre_remove", "pre_clear"):
+        return
+    if reverse:
+        # The patches of a single user changed
+        invalidate_user_dashboards([instance.pk])
+    else:
+        invalidate_user_dashboards(_involved_user_ids(instance.pk) | (pk_set or set()))
+
+
+def invalidate_all_pages():
+    """Invalidate all cached pages, after the current transaction commits"""
+    transaction.on_commit(lambda: _bump_versions(["all"]))
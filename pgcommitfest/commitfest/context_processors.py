@@ -1,3 +1,5 @@
+from django.conf import settings
+
 from .models import CommitFest
 
 
@@ -7,4 +9,5 @@ def global_context(request):
     return {
         "current_cf": cfs.get("in_progress") or cfs.get("open"),
         "open_cf": cfs.get("open"),
+        "activity_stream_url": settings.ACTIVITY_STREAM_URL,
     }
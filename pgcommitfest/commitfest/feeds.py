@@ -1,36 +1,44 @@
-from django.contrib.syndication.views import Feed
+from django.conf import settings
+from django.utils.feedgenerator import Rss201rev2Feed
+from django.utils.timezone import is_naive, make_aware
 
+SITE_URL = "https://commitfest.postgresql.org/"
 
-class ActivityFeed(Feed):
-    title = description = "Commitfest Activity Log"
-    link = "https://commitfest.postgresql.org/"
 
-    def __init__(self, activity, cf, *args, **kwargs):
-        super(ActivityFeed, self).__init__(*args, **kwargs)
-        self.activity = activity
+class ActivityFeed(Rss201rev2Feed):
+    # Built directly with the feed generator instead of through
+    # django.contrib.syndication, since the feeds are rendered ahead of time
+    # when history is written, outside of any request for them.
+    def __init__(self, activity, cf, activity_filter=None):
         if cf:
-            self.cfid = cf.id
-            self.title = self.description = (
-                "PostgreSQL Commitfest {0} Activity Log".format(cf.name)
-            )
+            title = "PostgreSQL Commitfest {0} Activity Log".format(cf.name)
+            feed_url = "{0}{1}/activity.rss/".format(SITE_URL, cf.id)
         else:
-            self.cfid = None
-
-    def items(self):
-        return self.activity
-
-    def item_title(self, item):
-        return item["name"]
-
-    def item_description(self, item):
-        return (
-            "<div>Patch: {name}</div><div>User: {by}</div>\n<div>{what}</div>".format(
-                **item
-            )
+            title = "Commitfest Activity Log"
+            feed_url = "{0}activity.rss/".format(SITE_URL)
+        if activity_filter:
+            # The name and title of the filter, see activity.py
+            title = "{0}: {1}".format(title, activity_filter[1])
+            feed_url = "{0}?type={1}".format(feed_url, activity_filter[0])
+        super(ActivityFeed, self).__init__(
+            title=title,
+            link=SITE_URL,
+            description=title,
+            feed_url=feed_url,
+            language=settings.LANGUAGE_CODE,
         )
 
-    def item_link(self, item):
-        return "https://commitfest.postgresql.org/patch/{patchid}/".format(**item)
-
-    def item_pubdate(self, item):
-        return item["date"]
+        for item in activity:
+            link = "{0}patch/{1}/".format(SITE_URL, item["patchid"])
+            pubdate = item["date"]
+            if is_naive(pubdate):
+                pubdate = make_aware(pubdate)
+            self.add_item(
+                title=item["name"],
+                link=link,
+                description="<div>Patch: {name}</div><div>User: {by}</div>\n<div>{what}</div>".format(
+                    **item
+                ),
+                unique_id=link,
+                pubdate=pubdate,
+            )
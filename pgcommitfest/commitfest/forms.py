@@ -5,7 +5,8 @@ from django.forms.widgets import HiddenInput
 from django.http import Http404
 
 from .ajax import _archivesAPI
-from .models import MailThread, Patch, PatchOnCommitFest, Tag, TargetVersion
+from .models import MailThread, Patch, PatchOnCommitFest
+from .refdata import get_reference_data
 from .widgets import ThreadPickWidget
 
 
@@ -62,15 +63,16 @@ class CommitFestFilterForm(forms.Form):
                 for u in User.objects.filter(pk__in=selected_user_ids)
             )
 
+        refdata = get_reference_data()
         self.fields["targetversion"] = forms.ChoiceField(
             choices=[("-1", "* All"), ("-2", "* None")]
-            + [(v.id, v.version) for v in TargetVersion.objects.all()],
+            + [(v.id, v.version) for v in refdata.target_versions],
             required=False,
             label="Target version",
         )
         self.fields["author"].choices = userchoices
         self.fields["reviewer"].choices = userchoices
-        self.fields["tag"].choices = list(Tag.objects.all().values_list("id", "name"))
+        self.fields["tag"].choices = [(t.id, t.name) for t in refdata.tags]
 
         for f in (
             "status",
@@ -120,11 +122,11 @@ class PatchForm(forms.ModelForm):
         self.fields["reviewers"].widget.attrs["class"] = "add-user-picker"
 
         # Cache checkbox tags for use in JavaScript syncing and template rendering
-        self.checkbox_tags = list(
-            Tag.objects.filter(name__in=CHECKBOX_TAG_NAMES).values(
-                "id", "name", "color"
-            )
-        )
+        self.checkbox_tags = [
+            {"id": t.id, "name": t.name, "color": t.color}
+            for t in get_reference_data().tags
+            if t.name in CHECKBOX_TAG_NAMES
+        ]
 
         # Selectize multiple fields -- don't pre-populate everything
         for field, url in list(self.selectize_fields.items()):
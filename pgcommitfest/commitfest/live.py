@@ -0,0 +1,298 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import StreamingHttpResponse
+
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+
+from .activity import ACTIVITY_FILTERS, load_activity
+
+# New history entries and cfbot status changes are sent by triggers with
+# NOTIFY on this channel (see migration 0026), and streamed to the browsers
+# that have the activity log or a commitfest open.
+#
+# Every process runs a single thread that LISTENs on its own database
+# connection and hands the events to the streams of all the clients
+# connected to that process, so there's one connection per process instead
+# of one per client. The thread only runs while there are clients.
+#
+# Every open page keeps its stream open for minutes, so the streams are only
+# served by the ASGI application (see asgi.py), where a waiting stream
+# doesn't take up a worker, and only when ACTIVITY_STREAM_URL is set.
+
+CHANNEL = "commitfest_activity"
+
+# How often the listener checks if it still has clients
+POLL_INTERVAL = 5
+# How long to wait before connecting again when the connection was lost
+RECONNECT_DELAY = 5
+# How long a new stream waits for the listener to be listening
+LISTEN_TIMEOUT = 10
+# Events that a client can fall behind before its stream gets closed
+MAX_PENDING_EVENTS = 100
+
+# Streams are closed after this long, and the browser then connects again,
+# so that a client doesn't keep a worker busy forever.
+STREAM_DURATION = 600
+# Send something at least this often, to notice clients that went away
+KEEPALIVE_INTERVAL = 15
+# How long the browser waits before connecting again, in milliseconds
+RECONNECT_TIME = 5000
+# The most history entries that are sent again to a client that reconnects
+MAX_REPLAY = 100
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    def __init__(self):
+        # With room for the None that ends the stream
+        self.events = queue.Queue(maxsize=MAX_PENDING_EVENTS + 1)
+        # Set when events may have been missed. The stream then ends after
+        # the events it already has, and the browser connects again and
+        # catches up from the last event it got.
+        self.lost = False
+        # The listener thread wakes up the stream on the event loop of its
+        # request when there are new events.
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+        self._ready = asyncio.Event()
+
+    def put(self, event):
+        self.events.put_nowait(event)
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                # The request already finished, and its event loop with it
+                pass
+
+    async def get(self, timeout):
+        """Wait for the next event, raises queue.Empty after timeout seconds"""
+        while True:
+            try:
+                return self.events.get_nowait()
+            except queue.Empty:
+                pass
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                raise queue.Empty
+
+    def lose(self):
+        if not self.lost:
+            self.lost = True
+            self.put(None)
+
+
+class ActivityListener:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._thread = None
+        # Set while the listener thread has run LISTEN, and gets the events
+        self._listening = threading.Event()
+
+    async def subscribe(self):
+        """Start receiving events, once they are actually being listened for
+
+        So anything that is committed after this returns is sent to the
+        subscription.
+        """
+        subscription = Subscription()
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="activity-listener", daemon=True
+                )
+                self._thread.start()
+        listening = await sync_to_async(self._listening.wait, thread_sensitive=False)(
+            LISTEN_TIMEOUT
+        )
+        if not listening:
+            # No connection to listen on. End the stream after what it
+            # replays, the browser tries again later.
+            subscription.lose()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def _has_subscriptions(self):
+        with self._lock:
+            if self._subscriptions:
+                return True
+            self._thread = None
+            return False
+
+    def dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.events.qsize() < MAX_PENDING_EVENTS:
+                subscription.put(event)
+            else:
+                self.unsubscribe(subscription)
+                subscription.lose()
+
+    def _lose_all(self):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription.lose()
+
+    def _run(self):
+        while self._has_subscriptions():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Lost the connection for the activity streams")
+                # Everything sent while we were not listening is missed
+                self._lose_all()
+                time.sleep(RECONNECT_DELAY)
+
+    def _listen(self):
+        conn = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            with conn.cursor() as curs:
+                curs.execute(f"LISTEN {CHANNEL}")
+            self._listening.set()
+            raw = conn.connection
+            while True:
+                with self._lock:
+                    # Under the lock, so that a new subscription either keeps
+                    # this connection listening, or waits for the next one.
+                    if not self._subscriptions:
+                        self._listening.clear()
+                        break
+                if select.select([raw], [], [], POLL_INTERVAL) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    self.dispatch(json.loads(raw.notifies.pop(0).payload))
+        finally:
+            self._listening.clear()
+            conn.close()
+
+
+listener = ActivityListener()
+
+
+def _format_event(event):
+    lines = []
+    # The browser sends the id of the last history entry it got when it
+    # connects again, so that we can send the ones it missed.
+    if event["type"] == "history":
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _last_event_id(request):
+    # Sent as a header when the browser connects again by itself, and as a
+    # parameter when commitfest.js does it, or to start after the latest
+    # entry on the page.
+    value = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id", "")
+    return int(value) if value.isdigit() else None
+
+
+def _matches(event, filtername):
+    if event["type"] != "history":
+        return True
+    if filtername:
+        return event["event"] in ACTIVITY_FILTERS[filtername][1]
+    return not event["by_cfbot"]
+
+
+async def activity_stream_response(request, cf=None, filtername=None):
+    """Stream new history entries and cfbot status changes, of one commitfest
+    or all of them, as server-sent events
+
+    History entries are limited to the ones that match the activity filter,
+    like on the activity log.
+    """
+    # Subscribe before looking for missed entries, so nothing falls in
+    # between.
+    subscription = await listener.subscribe()
+    last_id = _last_event_id(request)
+
+    def load_replay():
+        try:
+            if not last_id:
+                return []
+            return [
+                dict(a, type="history")
+                for a in reversed(
+                    load_activity(
+                        cf and cf.id,
+                        MAX_REPLAY,
+                        after_id=last_id,
+                        filtername=filtername,
+                    )
+                )
+            ]
+        finally:
+            # The stream stays open for minutes, so don't hold on to a
+            # database connection for it. Tests run in a transaction that
+            # has to stay open.
+            if not connection.in_atomic_block:
+                connection.close()
+
+    try:
+        replay = await sync_to_async(load_replay)()
+    except BaseException:
+        listener.unsubscribe(subscription)
+        raise
+
+    async def stream():
+        try:
+            yield f"retry: {RECONNECT_TIME}\n\n"
+            seen = last_id or 0
+            for event in replay:
+                seen = max(seen, event["id"])
+                yield _format_event(event)
+
+            deadline = time.monotonic() + STREAM_DURATION
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await subscription.get(min(timeout, KEEPALIVE_INTERVAL))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                if cf and event["commitfest_id"] != cf.id:
+                    continue
+                if not _matches(event, filtername):
+                    continue
+                if event["type"] == "history" and event["id"] <= seen:
+                    continue
+                yield _format_event(event)
+        finally:
+            listener.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Don't let nginx buffer the events
+    response["X-Accel-Buffering"] = "no"
+    # The ASGI application can run on another host than the pages, and the
+    # activity is public anyway
+    response["Access-Control-Allow-Origin"] = "*"
+    return response
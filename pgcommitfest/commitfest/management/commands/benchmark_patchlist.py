@@ -0,0 +1,123 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+import os
+import statistics
+import time
+
+from pgcommitfest.commitfest.models import CommitFest, Tag, TargetVersion
+from pgcommitfest.commitfest.views import (
+    PATCHLIST_PAGE_SIZE,
+    patchlist,
+    patchlist_query,
+)
+
+SORTKEYS = [0, 2, -2, 3, -3, 4, -4, 5, -5, 6, -6, 7, -7, 8, -8]
+
+
+class Command(BaseCommand):
+    help = "Time the patch list queries for all orderings and filters, and some combinations of them"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            default="benchuser1",
+            help="User to run as, and to use in the author and reviewer filters",
+        )
+        parser.add_argument(
+            "--cf",
+            type=int,
+            help="Commitfest to list, defaults to the one in progress",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--plans",
+            metavar="DIR",
+            help="Write EXPLAIN (ANALYZE, BUFFERS) output for all cases to DIR",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(
+                f"User {options['user']} not found, did you run seed_benchmark_data?"
+            )
+        if options["cf"]:
+            cf = CommitFest.objects.get(pk=options["cf"])
+        else:
+            cf = CommitFest.objects.get(
+                status=CommitFest.STATUS_INPROGRESS, draft=False
+            )
+
+        if options["plans"]:
+            os.makedirs(options["plans"], exist_ok=True)
+
+        self.stdout.write(f"{'case':<40} {'rows':>6} {'min ms':>8} {'median ms':>10}")
+        for name, personalized, params in self._cases(user):
+            request = RequestFactory().get("/", params)
+            request.user = user
+
+            timings = []
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                patch_list = patchlist(request, cf, personalized=personalized)
+                timings.append((time.perf_counter() - start) * 1000)
+            if patch_list.redirect:
+                raise CommandError(f"Case {name} gave a redirect")
+
+            self.stdout.write(
+                f"{name:<40} {len(patch_list.patches):>6} {min(timings):>8.1f} {statistics.median(timings):>10.1f}"
+            )
+
+            if options["plans"]:
+                query = patchlist_query(request, cf, personalized=personalized)
+                with connection.cursor() as curs:
+                    # Timings and parallel workers are left out, so that only
+                    # actual changes to the plans show up when comparing
+                    # snapshots. How rows get divided over workers differs
+                    # between runs.
+                    curs.execute("SET max_parallel_workers_per_gather = 0")
+                    curs.execute(
+                        f"EXPLAIN (ANALYZE, BUFFERS, COSTS OFF, TIMING OFF, SUMMARY OFF) {query.sql}\nLIMIT {PATCHLIST_PAGE_SIZE + 1}",
+                        query.params,
+                    )
+                    plan = "\n".join(r[0] for r in curs.fetchall())
+                    curs.execute("RESET max_parallel_workers_per_gather")
+                with open(os.path.join(options["plans"], f"{name}.txt"), "w") as f:
+                    f.write(plan + "\n")
+
+    def _cases(self, user):
+        """Return (name, personalized, query parameters) for all cases"""
+        filters = [
+            ("status", {"status": 1}),
+            ("targetversion", {"targetversion": TargetVersion.objects.first().id}),
+            ("targetversion_none", {"targetversion": -2}),
+            ("tag", {"tag": Tag.objects.order_by("id").first().id}),
+            ("tag_multiple", {"tag": [t.id for t in Tag.objects.order_by("id")[:2]]}),
+            ("author", {"author": user.id}),
+            ("author_none", {"author": -2}),
+            ("author_self", {"author": -3}),
+            ("reviewer", {"reviewer": user.id}),
+            ("reviewer_none", {"reviewer": -2}),
+            ("reviewer_self", {"reviewer": -3}),
+            ("text", {"text": "vacuum"}),
+        ]
+        # Filters are usually combined with one of the other orderings, e.g.
+        # the patches that need review with the oldest mail first.
+        combinations = [
+            ("status_sortkey2", {"status": 1, "sortkey": 2}),
+            ("reviewer_none_sortkey-2", {"reviewer": -2, "sortkey": -2}),
+            ("text_sortkey-4", {"text": "vacuum", "sortkey": -4}),
+        ]
+        for prefix, personalized in [("cf", False), ("personalized", True)]:
+            for sortkey in SORTKEYS:
+                yield (
+                    f"{prefix}_sortkey{sortkey}",
+                    personalized,
+                    {"sortkey": sortkey} if sortkey else {},
+                )
+            for name, params in filters + combinations:
+                yield f"{prefix}_{name}", personalized, params
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from pgcommitfest.commitfest.models import CommitFestStatusCount
+
+
+class Command(BaseCommand):
+    help = "Check the precomputed per-commitfest status counts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Rebuild the counts from the patches if they don't match",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            mismatches = CommitFestStatusCount.find_mismatches()
+            for cfid, status, stored, actual in mismatches:
+                self.stdout.write(
+                    f"Commitfest {cfid}, status {status}: count is {stored}, should be {actual}"
+                )
+
+            if not mismatches:
+                self.stdout.write("All status counts are correct")
+            elif options["rebuild"]:
+                CommitFestStatusCount.rebuild_all()
+                self.stdout.write("Rebuilt status counts")
+            else:
+                raise CommandError(
+                    f"{len(mismatches)} status counts are wrong, use --rebuild to fix"
+                )
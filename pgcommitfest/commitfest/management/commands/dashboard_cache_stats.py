@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from pgcommitfest.commitfest.cache import (
+    dashboard_cache_stats,
+    reset_dashboard_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    help = "Show the hit and miss counts of the dashboard cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after showing them",
+        )
+
+    def handle(self, *args, **options):
+        # The counters are kept in the cache itself, so this only shows the
+        # numbers of the web processes when they share a cache with this one,
+        # like memcached does.
+        stats = dashboard_cache_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = f"{stats['hits'] / total:.1%}" if total else "n/a"
+        self.stdout.write(
+            f"Hits: {stats['hits']}, misses: {stats['misses']}, hit ratio: {ratio}"
+        )
+
+        if options["reset"]:
+            reset_dashboard_cache_stats()
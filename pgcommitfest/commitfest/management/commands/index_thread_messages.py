@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.http import Http404
+
+from pgcommitfest.commitfest.ajax import _archivesAPI, record_thread_messages
+from pgcommitfest.commitfest.models import MailThread
+
+
+class Command(BaseCommand):
+    help = "Record the ids of all messages in all mail threads from the archives"
+
+    def handle(self, *args, **options):
+        # Threads of active commitfests get this done by the regular refresh
+        # from the archives, so this is only needed once to also be able to
+        # find patches in closed commitfests by any of their messages.
+        for thread in MailThread.objects.order_by("id").iterator():
+            try:
+                r = _archivesAPI("/message-id.json/%s" % thread.messageid)
+            except Http404:
+                self.stderr.write(f"Thread {thread.messageid} not found in archives")
+                continue
+            record_thread_messages(r, thread)
+
+        self.stdout.write("Recorded the messages of all threads")
@@ -0,0 +1,211 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from pgcommitfest.commitfest.models import CommitFestStatusCount, PatchSummary
+
+# Words that synthetic patch names are made up of, so that text searches
+# match a realistic fraction of the patches.
+WORDS = """add fix improve remove refactor optimize support allow avoid document
+parallel vacuum index btree gin gist brin hash toast wal replication logical
+physical standby checkpoint buffer lock deadlock planner executor partition
+trigger sequence extension function procedure json jsonb xml array range tuple
+heap page visibility freeze analyze statistics catalog syscache relcache
+snapshot transaction subtransaction cursor portal copy psql pg_dump pg_restore
+pg_upgrade pg_basebackup initdb ecpg libpq protocol authentication scram ldap
+ssl collation icu locale unicode regex numeric interval timestamp timezone
+memory context hashjoin mergejoin nestloop sort aggregate window merge upsert
+returning subscription publication slot conflict walsender autovacuum
+bgworker latch signal""".split()
+
+TASK_NAMES = [
+    "Linux - Debian Bookworm - Autoconf",
+    "Linux - Debian Bookworm - Meson",
+    "FreeBSD - Meson",
+    "NetBSD - Meson",
+    "OpenBSD - Meson",
+    "macOS - Sonoma - Meson",
+    "Windows - Server 2019, VS 2019 - Meson & ninja",
+    "FormattingCheck",
+]
+
+
+class Command(BaseCommand):
+    help = "Seed the database with a large synthetic dataset for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--patches", type=int, default=50000)
+        parser.add_argument("--commitfests", type=int, default=40)
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Delete all existing patches and commitfests first",
+        )
+
+    def handle(self, *args, **options):
+        numpatches = options["patches"]
+        numcfs = options["commitfests"]
+        numusers = options["users"]
+        if numcfs < 3 or numusers < 100:
+            raise CommandError("Need at least 3 commitfests and 100 users")
+
+        with transaction.atomic():
+            curs = connection.cursor()
+            if options["reset"]:
+                curs.execute(
+                    "TRUNCATE commitfest_patch, commitfest_commitfest RESTART IDENTITY CASCADE"
+                )
+                curs.execute(
+                    "DELETE FROM commitfest_committer WHERE user_id IN (SELECT id FROM auth_user WHERE username LIKE 'benchuser%')"
+                )
+                curs.execute("DELETE FROM auth_user WHERE username LIKE 'benchuser%'")
+            else:
+                curs.execute(
+                    "SELECT EXISTS (SELECT 1 FROM commitfest_patch) OR EXISTS (SELECT 1 FROM commitfest_commitfest)"
+                )
+                if curs.fetchone()[0]:
+                    raise CommandError(
+                        "Database already contains commitfest data, use --reset to delete it"
+                    )
+
+            params = {
+                "numpatches": numpatches,
+                "numcfs": numcfs,
+                "numusers": numusers,
+                "words": WORDS,
+                "task_names": TASK_NAMES,
+                "userbase": self._next_id(curs, "auth_user"),
+            }
+
+            self.stdout.write("Creating users and commitfests...")
+            curs.execute(
+                """INSERT INTO auth_user (id, password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined)
+SELECT %(userbase)s + g, '!', false, 'benchuser' || g, 'First' || g, 'Last' || g, 'benchuser' || g || '@example.com', false, true, now() - interval '1 year'
+FROM generate_series(1, %(numusers)s) g""",
+                params,
+            )
+            self._reset_sequence(curs, "auth_user")
+            # The first user is the one the benchmarks run as. Make them a
+            # committer, with a fair share of patches in all roles.
+            curs.execute(
+                """INSERT INTO commitfest_committer (user_id, active)
+SELECT %(userbase)s + g, g %% 5 != 0 FROM generate_series(1, 50) g""",
+                params,
+            )
+            curs.execute(
+                """INSERT INTO commitfest_targetversion (version)
+SELECT g::text FROM generate_series(10, 19) g
+ON CONFLICT (version) DO NOTHING"""
+            )
+            # All closed except for the last two, which are in progress and
+            # open.
+            curs.execute(
+                """INSERT INTO commitfest_commitfest (id, name, status, startdate, enddate, draft)
+SELECT g, 'bench-' || g,
+    CASE WHEN g = %(numcfs)s THEN 2 WHEN g = %(numcfs)s - 1 THEN 3 ELSE 4 END,
+    current_date + (g - %(numcfs)s) * 60, current_date + (g - %(numcfs)s) * 60 + 30,
+    false
+FROM generate_series(1, %(numcfs)s) g""",
+                params,
+            )
+            self._reset_sequence(curs, "commitfest_commitfest")
+
+            self.stdout.write(f"Creating {numpatches} patches...")
+            curs.execute(
+                """INSERT INTO commitfest_patch (id, name, wikilink, gitlink, targetversion_id, committer_id, created, modified, lastmail)
+SELECT g,
+    initcap(w[1 + g %% array_length(w, 1)]) || ' ' || w[1 + (g / 7) %% array_length(w, 1)] || ' for ' || w[1 + (g * 31) %% array_length(w, 1)] || ' ' || g,
+    '', '',
+    CASE WHEN g %% 3 = 0 THEN (SELECT id FROM commitfest_targetversion ORDER BY version DESC OFFSET g %% 10 LIMIT 1) END,
+    CASE WHEN g %% 4 = 0 THEN %(userbase)s + 1 + g %% 50 END,
+    now() - (%(numpatches)s - g) * interval '30 minutes',
+    now() - (g %% 1000) * interval '1 hour',
+    CASE WHEN g %% 11 != 0 THEN now() - (g %% 5000) * interval '7 minutes' END
+FROM generate_series(1, %(numpatches)s) g, (SELECT %(words)s::text[] AS w) words""",
+                params,
+            )
+            self._reset_sequence(curs, "commitfest_patch")
+
+            # Patches are added to the commitfests in order of creation, and
+            # were moved through up to three earlier commitfests before
+            # ending up in their current one.
+            curs.execute(
+                """INSERT INTO commitfest_patchoncommitfest (patch_id, commitfest_id, enterdate, leavedate, status)
+SELECT p, cf, now(),
+    CASE WHEN s IN (1, 2, 3) THEN NULL ELSE now() END,
+    s
+FROM generate_series(1, %(numpatches)s) p,
+    LATERAL (SELECT 1 + (p - 1) * %(numcfs)s / %(numpatches)s AS lastcf) l,
+    LATERAL generate_series(GREATEST(1, lastcf - p %% 4), lastcf) cf,
+    LATERAL (SELECT CASE
+        WHEN cf < lastcf THEN 5
+        WHEN lastcf < %(numcfs)s - 1 THEN (ARRAY[1, 4, 4, 4, 4, 4, 6, 7, 8, 8])[1 + p %% 10]
+        WHEN p %% 10 = 9 THEN 8
+        ELSE 1 + p %% 3
+    END AS s) st""",
+                params,
+            )
+            curs.execute(
+                """INSERT INTO commitfest_patch_authors (patch_id, user_id)
+SELECT p, %(userbase)s + 1 + (p * 7 + k * 13) %% %(numusers)s
+FROM generate_series(1, %(numpatches)s) p, generate_series(0, p %% 2) k
+WHERE p %% 20 != 0""",
+                params,
+            )
+            curs.execute(
+                """INSERT INTO commitfest_patch_reviewers (patch_id, user_id)
+SELECT p, %(userbase)s + 1 + (p * 11 + k * 17 + 1) %% %(numusers)s
+FROM generate_series(1, %(numpatches)s) p, generate_series(1, p %% 4) k""",
+                params,
+            )
+            curs.execute(
+                """INSERT INTO commitfest_patch_tags (patch_id, tag_id)
+SELECT p, t.id
+FROM generate_series(1, %(numpatches)s) p,
+    LATERAL (SELECT id FROM commitfest_tag ORDER BY id OFFSET p %% 7 LIMIT p %% 3) t""",
+                params,
+            )
+
+            self.stdout.write("Creating cfbot branches and tasks...")
+            curs.execute(
+                """INSERT INTO commitfest_cfbotbranch (patch_id, branch_id, branch_name, commit_id, apply_url, status, needs_rebase_since, failing_since, created, modified, version, patch_count, first_additions, first_deletions, all_additions, all_deletions)
+SELECT p.id, p.id, 'cf/' || p.id, md5(p.id::text), 'https://example.com/' || p.id,
+    (ARRAY['finished', 'finished', 'failed', 'testing', 'timeout'])[1 + p.id %% 5]::cfbotbranch_status,
+    CASE WHEN p.id %% 7 = 0 THEN now() - (p.id %% 30) * interval '1 day' END,
+    CASE WHEN p.id %% 5 = 2 THEN now() - (p.id %% 20) * interval '1 day' END,
+    now() - (p.id %% 100) * interval '1 hour', now(), 'v' || (1 + p.id %% 9), 1 + p.id %% 5,
+    p.id %% 500, p.id %% 200, p.id %% 5000, p.id %% 2000
+FROM commitfest_patch p
+WHERE p.id %% 10 != 3""",
+                params,
+            )
+            curs.execute(
+                """INSERT INTO commitfest_cfbottask (task_id, task_name, patch_id, branch_id, position, status, created, modified)
+SELECT b.branch_id || '-' || i, (%(task_names)s::text[])[i], b.patch_id, b.branch_id, i,
+    CASE
+        WHEN b.status = 'testing' THEN (ARRAY['CREATED', 'SCHEDULED', 'EXECUTING', 'COMPLETED'])[1 + (b.branch_id + i) %% 4]
+        WHEN b.status = 'failed' AND (b.branch_id + i) %% 3 = 0 THEN 'FAILED'
+        ELSE 'COMPLETED'
+    END::cfbottask_status,
+    b.created, b.modified
+FROM commitfest_cfbotbranch b, generate_series(1, array_length(%(task_names)s::text[], 1)) i""",
+                params,
+            )
+
+            self.stdout.write("Updating denormalized data...")
+            PatchSummary.refresh_all()
+            CommitFestStatusCount.rebuild_all()
+
+        curs.execute("ANALYZE")
+        self.stdout.write(
+            f"Created {numpatches} patches in {numcfs} commitfests, benchmark user is benchuser1"
+        )
+
+    def _next_id(self, curs, table):
+        curs.execute(f"SELECT COALESCE(max(id), 0) FROM {table}")
+        return curs.fetchone()[0]
+
+    def _reset_sequence(self, curs, table):
+        curs.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"
+        )
@@ -0,0 +1,85 @@
+import logging
+import threading
+
+# Some lookups are done several times while handling a single request, from
+# places that don't know about each other: the context processor and the view
+# both need the relevant commitfests, the view, the forms and Patch.move() all
+# need the current commitfest of a patch. Instead of passing the results
+# around, these lookups go through memoized(), which remembers them until the
+# end of the request.
+#
+# The memo only exists while RequestMemoMiddleware is handling a request, so
+# management commands and other long running code always get fresh data. It
+# is kept per thread, so concurrent requests never see each other's data.
+# Writes that change a memoized result must forget() it, which is done by the
+# signal handlers below.
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_MISSING = object()
+
+_stats_lock = threading.Lock()
+_avoided_lookups = 0
+
+
+def memoized(key, compute):
+    memo = getattr(_local, "memo", None)
+    if memo is None:
+        return compute()
+
+    value = memo.get(key, _MISSING)
+    if value is _MISSING:
+        value = memo[key] = compute()
+    else:
+        global _avoided_lookups
+        _local.hits += 1
+        with _stats_lock:
+            _avoided_lookups += 1
+    return value
+
+
+def forget(key):
+    memo = getattr(_local, "memo", None)
+    if memo is not None:
+        memo.pop(key, None)
+
+
+def avoided_lookups():
+    """The number of lookups this process didn't have to repeat"""
+    return _avoided_lookups
+
+
+def reset_avoided_lookups():
+    global _avoided_lookups
+    with _stats_lock:
+        _avoided_lookups = 0
+
+
+class RequestMemoMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.memo = {}
+        _local.hits = 0
+        try:
+            return self.get_response(request)
+        finally:
+            if _local.hits:
+                logger.debug(
+                    "Avoided %d duplicate lookups for %s", _local.hits, request.path
+                )
+            del _local.memo
+
+
+def commitfest_changed(sender, **kwargs):
+    forget("relevant_commitfests")
+
+
+def patch_on_commitfest_changed(sender, instance, **kwargs):
+    forget(("current_patch_on_commitfest", instance.patch_id))
+
+
+def user_email_changed(sender, instance, **kwargs):
+    forget(("user_email", instance.user_id))
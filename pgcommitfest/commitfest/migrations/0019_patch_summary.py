@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:55
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0018_undo_pg19_final_close"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatchSummary",
+            fields=[
+                (
+                    "patch",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="commitfest.patch",
+                    ),
+                ),
+                ("author_names", models.TextField(blank=True, null=True)),
+                ("reviewer_names", models.TextField(blank=True, null=True)),
+                ("committer_name", models.TextField(blank=True, null=True)),
+                ("num_cfs", models.IntegerField(default=0)),
+                (
+                    "tag_ids",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.IntegerField(),
+                        blank=True,
+                        null=True,
+                        size=None,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunSQL(
+            """
+INSERT INTO commitfest_patchsummary (patch_id, author_names, reviewer_names,
+                                     committer_name, num_cfs, tag_ids)
+SELECT p.id,
+    (SELECT string_agg(first_name || ' ' || last_name || ' (' || username || ')', ', ') FROM auth_user INNER JOIN commitfest_patch_authors cpa ON cpa.user_id=auth_user.id WHERE cpa.patch_id=p.id),
+    (SELECT string_agg(first_name || ' ' || last_name || ' (' || username || ')', ', ') FROM auth_user INNER JOIN commitfest_patch_reviewers cpr ON cpr.user_id=auth_user.id WHERE cpr.patch_id=p.id),
+    (SELECT first_name || ' ' || last_name || ' (' || username || ')' FROM auth_user WHERE auth_user.id=p.committer_id),
+    (SELECT count(1) FROM commitfest_patchoncommitfest pcf WHERE pcf.patch_id=p.id),
+    (SELECT array_agg(tag_id) FROM commitfest_patch_tags t WHERE t.patch_id=p.id)
+FROM commitfest_patch p;
+""",
+            reverse_sql="",
+        ),
+    ]
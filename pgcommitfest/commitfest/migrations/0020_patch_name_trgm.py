@@ -0,0 +1,22 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0019_patch_summary"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # Trigram index for substring searches on the patch name. This is on
+        # UPPER(name), because that's what icontains in the ORM generates, so
+        # raw SQL should use UPPER(p.name) LIKE UPPER(...) to make use of it.
+        migrations.RunSQL(
+            """
+            CREATE INDEX patch_name_trgm_idx ON commitfest_patch
+            USING gin (UPPER(name) gin_trgm_ops);
+            """,
+            reverse_sql="DROP INDEX patch_name_trgm_idx",
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0020_patch_name_trgm"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CommitFestStatusCount",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("status", models.IntegerField()),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "commitfest",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="commitfest.commitfest",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("commitfest", "status")},
+            },
+        ),
+        migrations.RunSQL(
+            """
+CREATE FUNCTION commitfest_update_status_count() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE commitfest_commitfeststatuscount SET count = count - 1
+        WHERE commitfest_id = OLD.commitfest_id AND status = OLD.status;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO commitfest_commitfeststatuscount (commitfest_id, status, count)
+        VALUES (NEW.commitfest_id, NEW.status, 1)
+        ON CONFLICT (commitfest_id, status)
+        DO UPDATE SET count = commitfest_commitfeststatuscount.count + 1;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER commitfest_status_count_insdel
+AFTER INSERT OR DELETE ON commitfest_patchoncommitfest
+FOR EACH ROW EXECUTE FUNCTION commitfest_update_status_count();
+
+-- Django saves all columns, so only count actual changes
+CREATE TRIGGER commitfest_status_count_upd
+AFTER UPDATE OF status, commitfest_id ON commitfest_patchoncommitfest
+FOR EACH ROW
+WHEN (OLD.status != NEW.status OR OLD.commitfest_id != NEW.commitfest_id)
+EXECUTE FUNCTION commitfest_update_status_count();
+
+INSERT INTO commitfest_commitfeststatuscount (commitfest_id, status, count)
+SELECT commitfest_id, status, count(*) FROM commitfest_patchoncommitfest
+GROUP BY commitfest_id, status;
+""",
+            reverse_sql="""
+DROP TRIGGER commitfest_status_count_upd ON commitfest_patchoncommitfest;
+DROP TRIGGER commitfest_status_count_insdel ON commitfest_patchoncommitfest;
+DROP FUNCTION commitfest_update_status_count();
+""",
+        ),
+    ]
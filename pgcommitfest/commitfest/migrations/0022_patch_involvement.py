@@ -0,0 +1,146 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0021_commitfest_status_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PatchInvolvement",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.IntegerField(
+                        choices=[(1, "Author"), (2, "Reviewer"), (3, "Committer")]
+                    ),
+                ),
+                (
+                    "patch",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="commitfest.patch",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("user", "patch", "role")},
+            },
+        ),
+        migrations.RunSQL(
+            """
+CREATE FUNCTION commitfest_update_user_involvement() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- The role is passed as the trigger argument, so the same function is
+    -- used for both the authors and the reviewers.
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO commitfest_patchinvolvement (user_id, patch_id, role)
+        SELECT user_id, patch_id, TG_ARGV[0]::integer FROM new_rows
+        ON CONFLICT (user_id, patch_id, role) DO NOTHING;
+    ELSE
+        DELETE FROM commitfest_patchinvolvement i USING old_rows o
+        WHERE i.user_id = o.user_id AND i.patch_id = o.patch_id
+        AND i.role = TG_ARGV[0]::integer;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER commitfest_involvement_author_ins
+AFTER INSERT ON commitfest_patch_authors
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION commitfest_update_user_involvement(1);
+
+CREATE TRIGGER commitfest_involvement_author_del
+AFTER DELETE ON commitfest_patch_authors
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION commitfest_update_user_involvement(1);
+
+CREATE TRIGGER commitfest_involvement_reviewer_ins
+AFTER INSERT ON commitfest_patch_reviewers
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION commitfest_update_user_involvement(2);
+
+CREATE TRIGGER commitfest_involvement_reviewer_del
+AFTER DELETE ON commitfest_patch_reviewers
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION commitfest_update_user_involvement(2);
+
+CREATE FUNCTION commitfest_update_committer_involvement() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.committer_id IS NOT NULL THEN
+        DELETE FROM commitfest_patchinvolvement
+        WHERE user_id = OLD.committer_id AND patch_id = OLD.id AND role = 3;
+    END IF;
+    IF NEW.committer_id IS NOT NULL THEN
+        INSERT INTO commitfest_patchinvolvement (user_id, patch_id, role)
+        VALUES (NEW.committer_id, NEW.id, 3)
+        ON CONFLICT (user_id, patch_id, role) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER commitfest_involvement_committer_ins
+AFTER INSERT ON commitfest_patch
+FOR EACH ROW
+WHEN (NEW.committer_id IS NOT NULL)
+EXECUTE FUNCTION commitfest_update_committer_involvement();
+
+-- Django saves all columns, so only handle actual changes
+CREATE TRIGGER commitfest_involvement_committer_upd
+AFTER UPDATE OF committer_id ON commitfest_patch
+FOR EACH ROW
+WHEN (OLD.committer_id IS DISTINCT FROM NEW.committer_id)
+EXECUTE FUNCTION commitfest_update_committer_involvement();
+
+INSERT INTO commitfest_patchinvolvement (user_id, patch_id, role)
+SELECT user_id, patch_id, 1 FROM commitfest_patch_authors
+UNION ALL
+SELECT user_id, patch_id, 2 FROM commitfest_patch_reviewers
+UNION ALL
+SELECT committer_id, id, 3 FROM commitfest_patch WHERE committer_id IS NOT NULL;
+
+-- The dashboard only shows open patches, and there are only a few of those
+-- compared to all the closed ones.
+CREATE INDEX commitfest_patchoncommitfest_open_patch_idx
+ON commitfest_patchoncommitfest (patch_id)
+WHERE status IN (1, 2, 3);
+""",
+            reverse_sql="""
+DROP INDEX commitfest_patchoncommitfest_open_patch_idx;
+DROP TRIGGER commitfest_involvement_committer_upd ON commitfest_patch;
+DROP TRIGGER commitfest_involvement_committer_ins ON commitfest_patch;
+DROP FUNCTION commitfest_update_committer_involvement();
+DROP TRIGGER commitfest_involvement_reviewer_del ON commitfest_patch_reviewers;
+DROP TRIGGER commitfest_involvement_reviewer_ins ON commitfest_patch_reviewers;
+DROP TRIGGER commitfest_involvement_author_del ON commitfest_patch_authors;
+DROP TRIGGER commitfest_involvement_author_ins ON commitfest_patch_authors;
+DROP FUNCTION commitfest_update_user_involvement();
+""",
+        ),
+    ]
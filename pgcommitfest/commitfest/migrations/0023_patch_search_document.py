@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:52
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0022_patch_involvement"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patchsummary",
+            name="search_document",
+            field=django.contrib.postgres.search.SearchVectorField(
+                blank=True, null=True
+            ),
+        ),
+        # The search document of a patch. Names are weighted highest, then
+        # the thread subjects, then the people and tags, and finally the
+        # annotations. This is used by PatchSummary._REFRESH_SQL, so that
+        # there is only one definition of the document.
+        migrations.RunSQL(
+            """
+            CREATE FUNCTION commitfest_patch_search_document(search_patch_id integer)
+            RETURNS tsvector LANGUAGE sql STABLE AS $$
+            SELECT
+                setweight(to_tsvector('english', p.name), 'A') ||
+                setweight(to_tsvector('english', coalesce((
+                    SELECT string_agg(t.subject || ' ' || t.latestsubject, ' ')
+                    FROM commitfest_mailthread t
+                    INNER JOIN commitfest_mailthread_patches mp ON mp.mailthread_id=t.id
+                    WHERE mp.patch_id=p.id
+                ), '')), 'B') ||
+                setweight(to_tsvector('english', coalesce((
+                    SELECT string_agg(u.first_name || ' ' || u.last_name || ' ' || u.username, ' ')
+                    FROM auth_user u
+                    WHERE u.id IN (
+                        SELECT user_id FROM commitfest_patch_authors WHERE patch_id=p.id
+                        UNION
+                        SELECT user_id FROM commitfest_patch_reviewers WHERE patch_id=p.id
+                    )
+                ), '') || ' ' || coalesce((
+                    SELECT string_agg(tag.name, ' ')
+                    FROM commitfest_tag tag
+                    INNER JOIN commitfest_patch_tags pt ON pt.tag_id=tag.id
+                    WHERE pt.patch_id=p.id
+                ), '')), 'C') ||
+                setweight(to_tsvector('english', coalesce((
+                    SELECT string_agg(a.annotationtext, ' ')
+                    FROM commitfest_mailthreadannotation a
+                    INNER JOIN commitfest_mailthread_patches mp ON mp.mailthread_id=a.mailthread_id
+                    WHERE mp.patch_id=p.id
+                ), '')), 'D')
+            FROM commitfest_patch p
+            WHERE p.id=search_patch_id
+            $$;
+
+            UPDATE commitfest_patchsummary
+            SET search_document = commitfest_patch_search_document(patch_id);
+            """,
+            reverse_sql="DROP FUNCTION commitfest_patch_search_document(integer)",
+        ),
+        migrations.AddIndex(
+            model_name="patchsummary",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_document"], name="patchsummary_search_idx"
+            ),
+        ),
+    ]
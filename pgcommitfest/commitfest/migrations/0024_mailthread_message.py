@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0023_patch_search_document"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MailThreadMessage",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("messageid", models.CharField(max_length=1000, unique=True)),
+                (
+                    "mailthread",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="commitfest.mailthread",
+                    ),
+                ),
+            ],
+        ),
+        # Start out with all the message ids we already know about. The rest
+        # of the messages get added as the threads are refreshed from the
+        # archives, or all at once with the index_thread_messages command.
+        migrations.RunSQL(
+            """
+            INSERT INTO commitfest_mailthreadmessage (mailthread_id, messageid)
+            SELECT id, messageid FROM commitfest_mailthread
+            UNION
+            SELECT id, latestmsgid FROM commitfest_mailthread
+            UNION
+            SELECT mailthread_id, messageid FROM commitfest_mailthreadattachment
+            UNION
+            SELECT mailthread_id, msgid FROM commitfest_mailthreadannotation
+            ON CONFLICT (messageid) DO NOTHING;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0024_mailthread_message"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patchhistory",
+            name="commitfest",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="commitfest.commitfest",
+            ),
+        ),
+        migrations.RunSQL(
+            """
+-- Existing entries get the commitfest the patch had most recently been
+-- added to at the time, or the first one for entries from before that.
+UPDATE commitfest_patchhistory ph SET commitfest_id = COALESCE(
+    (SELECT poc.commitfest_id FROM commitfest_patchoncommitfest poc
+     WHERE poc.patch_id = ph.patch_id AND poc.enterdate <= ph.date
+     ORDER BY poc.enterdate DESC LIMIT 1),
+    (SELECT min(poc.commitfest_id) FROM commitfest_patchoncommitfest poc
+     WHERE poc.patch_id = ph.patch_id)
+);
+""",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name="patchhistory",
+            index=models.Index(
+                fields=["commitfest", "date", "id"], name="patchhistory_cf_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0025_patchhistory_commitfest"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+-- Send new history entries and cfbot status changes to the live activity
+-- streams, see live.py. The notifications are only delivered when the
+-- transaction commits.
+CREATE FUNCTION commitfest_notify_history() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('commitfest_activity', json_build_object(
+        'type', 'history',
+        'id', NEW.id,
+        'date', NEW.date,
+        'by', (SELECT username FROM auth_user WHERE id = NEW.by_id),
+        'what', NEW.what,
+        'patchid', NEW.patch_id,
+        'name', (SELECT name FROM commitfest_patch WHERE id = NEW.patch_id),
+        'commitfest_id', NEW.commitfest_id
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+-- Entries by cfbot aren't shown in the activity log either
+CREATE TRIGGER commitfest_notify_history
+AFTER INSERT ON commitfest_patchhistory
+FOR EACH ROW
+WHEN (NEW.by_id IS NOT NULL)
+EXECUTE FUNCTION commitfest_notify_history();
+
+CREATE FUNCTION commitfest_notify_cfbot() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('commitfest_activity', json_build_object(
+        'type', 'cfbot',
+        'patchid', NEW.patch_id,
+        'name', (SELECT name FROM commitfest_patch WHERE id = NEW.patch_id),
+        'status', NEW.status,
+        'commitfest_id', (
+            SELECT commitfest_id FROM commitfest_patchoncommitfest
+            WHERE patch_id = NEW.patch_id ORDER BY enterdate DESC LIMIT 1
+        )
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER commitfest_notify_cfbot_ins
+AFTER INSERT ON commitfest_cfbotbranch
+FOR EACH ROW
+EXECUTE FUNCTION commitfest_notify_cfbot();
+
+CREATE TRIGGER commitfest_notify_cfbot_upd
+AFTER UPDATE OF status ON commitfest_cfbotbranch
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION commitfest_notify_cfbot();
+""",
+            reverse_sql="""
+DROP TRIGGER commitfest_notify_cfbot_upd ON commitfest_cfbotbranch;
+DROP TRIGGER commitfest_notify_cfbot_ins ON commitfest_cfbotbranch;
+DROP FUNCTION commitfest_notify_cfbot();
+DROP TRIGGER commitfest_notify_history ON commitfest_patchhistory;
+DROP FUNCTION commitfest_notify_history();
+""",
+        ),
+    ]
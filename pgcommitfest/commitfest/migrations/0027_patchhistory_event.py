@@ -0,0 +1,188 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("commitfest", "0026_activity_notify"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="patchhistory",
+            name="data",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="patchhistory",
+            name="event",
+            field=models.IntegerField(
+                choices=[
+                    (0, "Other"),
+                    (1, "Created"),
+                    (2, "Edited"),
+                    (3, "Changed status"),
+                    (4, "Closed"),
+                    (5, "Moved"),
+                    (6, "Posted"),
+                    (7, "Added reviewer"),
+                    (8, "Removed reviewer"),
+                    (9, "Removed all reviewers"),
+                    (10, "Added committer"),
+                    (11, "Removed committer"),
+                    (12, "Attached thread"),
+                    (13, "Detached thread"),
+                    (14, "Added annotation"),
+                    (15, "Deleted annotation"),
+                    (16, "Needs rebase"),
+                    (17, "Rebased"),
+                ],
+                default=0,
+            ),
+        ),
+        migrations.RunSQL(
+            r"""
+-- Find out what existing entries are about from their text. Entries that
+-- don't match anything stay at 0, for other.
+UPDATE commitfest_patchhistory SET event = 1
+WHERE what = 'Created patch record';
+
+UPDATE commitfest_patchhistory
+SET event = 2, data = json_build_object('field', substring(what FROM '^Changed (\w+) to '))
+WHERE what ~ '^Changed \w+ to ';
+
+UPDATE commitfest_patchhistory ph
+SET event = 3, data = json_build_object('status', s.status)
+FROM commitfest_patchstatus s
+WHERE ph.what = 'New status: ' || s.statusstring;
+
+UPDATE commitfest_patchhistory ph
+SET event = 4, data = json_build_object('status', s.status)
+FROM commitfest_patchstatus s
+WHERE ph.what ~ '^Closed in commitfest .* with status: '
+AND substring(ph.what FROM ' with status: (.*)$') = s.statusstring;
+
+UPDATE commitfest_patchhistory ph
+SET event = 5, data = json_build_object('from', f.id, 'to', t.id)
+FROM commitfest_commitfest f, commitfest_commitfest t
+WHERE ph.what = 'Moved from CF ' || f.name || ' to CF ' || t.name;
+
+UPDATE commitfest_patchhistory
+SET event = 6, data = json_build_object(
+    'kind', substring(what FROM '^Posted (\w+) with messageid '),
+    'messageid', substring(what FROM ' with messageid (.*)$'))
+WHERE what ~ '^Posted \w+ with messageid ';
+
+UPDATE commitfest_patchhistory
+SET event = 7, data = json_build_object('user', substring(what FROM '^Added (.*) as reviewer$'))
+WHERE what ~ '^Added .* as reviewer$';
+
+UPDATE commitfest_patchhistory
+SET event = 8, data = json_build_object('user', substring(what FROM '^Removed (.*) from reviewers$'))
+WHERE what ~ '^Removed .* from reviewers$';
+
+UPDATE commitfest_patchhistory SET event = 9
+WHERE what = 'Removed all reviewers';
+
+UPDATE commitfest_patchhistory
+SET event = 10, data = json_build_object('user', substring(what FROM '^Added (.*) as committer$'))
+WHERE what ~ '^Added .* as committer$';
+
+UPDATE commitfest_patchhistory
+SET event = 11, data = json_build_object('user', substring(what FROM '^Removed (.*) from committers$'))
+WHERE what ~ '^Removed .* from committers$';
+
+UPDATE commitfest_patchhistory
+SET event = 12, data = json_build_object('messageid', substring(what FROM '^Attached mail thread (.*)$'))
+WHERE what ~ '^Attached mail thread ';
+
+UPDATE commitfest_patchhistory
+SET event = 13, data = json_build_object('messageid', substring(what FROM '^Detached mail thread (.*)$'))
+WHERE what ~ '^Detached mail thread ';
+
+UPDATE commitfest_patchhistory
+SET event = 14, data = json_build_object('messageid', substring(what FROM '^Added annotation ".*" to (.*)$'))
+WHERE what ~ '^Added annotation ".*" to ';
+
+UPDATE commitfest_patchhistory
+SET event = 15, data = json_build_object('messageid', substring(what FROM '^Deleted annotation ".*" from (.*)$'))
+WHERE what ~ '^Deleted annotation ".*" from ';
+
+UPDATE commitfest_patchhistory SET event = 16
+WHERE what = 'Patch needs rebase';
+
+UPDATE commitfest_patchhistory SET event = 17
+WHERE what = 'Patch does not need rebase anymore';
+
+-- The live activity streams can filter on the event too, and show the
+-- entries by cfbot.
+CREATE OR REPLACE FUNCTION commitfest_notify_history() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('commitfest_activity', json_build_object(
+        'type', 'history',
+        'id', NEW.id,
+        'date', NEW.date,
+        'by', (SELECT username FROM auth_user WHERE id = NEW.by_id),
+        'by_cfbot', NEW.by_cfbot,
+        'what', NEW.what,
+        'event', NEW.event,
+        'patchid', NEW.patch_id,
+        'name', (SELECT name FROM commitfest_patch WHERE id = NEW.patch_id),
+        'commitfest_id', NEW.commitfest_id
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER commitfest_notify_history ON commitfest_patchhistory;
+CREATE TRIGGER commitfest_notify_history
+AFTER INSERT ON commitfest_patchhistory
+FOR EACH ROW
+EXECUTE FUNCTION commitfest_notify_history();
+""",
+            reverse_sql="""
+-- Back to the function of 0026, which doesn't use the event column that is
+-- dropped when going back.
+CREATE OR REPLACE FUNCTION commitfest_notify_history() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('commitfest_activity', json_build_object(
+        'type', 'history',
+        'id', NEW.id,
+        'date', NEW.date,
+        'by', (SELECT username FROM auth_user WHERE id = NEW.by_id),
+        'what', NEW.what,
+        'patchid', NEW.patch_id,
+        'name', (SELECT name FROM commitfest_patch WHERE id = NEW.patch_id),
+        'commitfest_id', NEW.commitfest_id
+    )::text);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER commitfest_notify_history ON commitfest_patchhistory;
+CREATE TRIGGER commitfest_notify_history
+AFTER INSERT ON commitfest_patchhistory
+FOR EACH ROW
+WHEN (NEW.by_id IS NOT NULL)
+EXECUTE FUNCTION commitfest_notify_history();
+""",
+        ),
+        migrations.AddIndex(
+            model_name="patchhistory",
+            index=models.Index(
+                fields=["event", "date", "id"], name="patchhistory_event_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="patchhistory",
+            index=models.Index(
+                fields=["commitfest", "event", "date", "id"],
+                name="patchhistory_cf_event_idx",
+            ),
+        ),
+    ]
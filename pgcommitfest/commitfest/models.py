@@ -1,6 +1,9 @@
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models, transaction
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connection, models, transaction
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
 
@@ -9,6 +12,8 @@ from datetime import datetime, timedelta, timezone
 from pgcommitfest.mailqueue.util import send_template_mail
 from pgcommitfest.userprofile.models import UserProfile
 
+from .cache import invalidate_all_pages, invalidate_patch_pages
+from .memo import memoized
 from .util import DiffableModel
 
 
@@ -303,7 +308,19 @@ class CommitFest(models.Model):
         Luckily checking if a refresh is needed is very cheap, just a few
         comparisons (see _are_relevant_commitfests_up_to_date for details). And
         the actual updates only happen ~once a month.
+
+        The result is memoized for the rest of the request, because the
+        context processor needs it for every page and many views need it too.
         """
+        if refresh and not for_update:
+            return memoized(
+                "relevant_commitfests",
+                lambda: cls._relevant_commitfests(for_update=False, refresh=True),
+            )
+        return cls._relevant_commitfests(for_update=for_update, refresh=refresh)
+
+    @classmethod
+    def _relevant_commitfests(cls, for_update, refresh):
         if refresh and settings.AUTO_CREATE_COMMITFESTS:
             return cls._refresh_relevant_commitfests(for_update=for_update)
 
@@ -409,6 +426,11 @@ class CommitFest(models.Model):
         # If no in-progress, fall back to open regular CommitFest
         return cls.get_open_regular()
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Commitfests are shown in the header of every page
+        invalidate_all_pages()
+
     def __str__(self):
         return self.name
 
@@ -530,15 +552,21 @@ class Patch(models.Model, DiffableModel):
 
     def current_patch_on_commitfest(self):
         # The unique partial index poc_enforce_maxoneoutcome_idx stores the PoC
-        # No caching here (inside the instance) since the caller should just need
-        # the PoC once per request.
-        return get_object_or_404(
-            PatchOnCommitFest, Q(patch=self) & ~Q(status=PatchOnCommitFest.STATUS_MOVED)
+        # This is needed by the views, the forms and move() in the same
+        # request, so it's memoized for the request. Saving any PoC of the
+        # patch forgets it again.
+        return memoized(
+            ("current_patch_on_commitfest", self.id),
+            lambda: get_object_or_404(
+                PatchOnCommitFest,
+                Q(patch=self) & ~Q(status=PatchOnCommitFest.STATUS_MOVED),
+            ),
         )
 
     @property
     def can_remove_all_reviewers(self):
-        return self.tags.filter(name="PGConf.dev").exists()
+        # Goes through all() so that it uses the tags if they're prefetched
+        return any(t.name == "PGConf.dev" for t in self.tags.all())
 
     # Some accessors
     @property
@@ -583,6 +611,12 @@ class Patch(models.Model, DiffableModel):
         else:
             self.lastmail = max(threads, key=lambda t: t.latestmessage).latestmessage
 
+    def update_summary(self):
+        # Recalculate the denormalized data used by the patch lists and the
+        # search. Needs to be called whenever the name, authors, reviewers,
+        # committer, tags, mail threads or commitfests of this patch change.
+        PatchSummary.refresh([self.id])
+
     def move(
         self, from_cf, to_cf, by_user, allow_move_to_in_progress=False, by_cfbot=False
     ):
@@ -626,12 +660,16 @@ class Patch(models.Model, DiffableModel):
         new_poc.save()
         self.set_modified()
         self.save()
+        self.update_summary()
 
         PatchHistory(
             patch=self,
             by=by_user,
             by_cfbot=by_cfbot,
             what=f"Moved from CF {from_cf} to CF {to_cf}",
+            event=PatchHistory.EVENT_MOVED,
+            data={"from": from_cf.id, "to": to_cf.id},
+            commitfest=to_cf,
         ).save_and_notify()
 
         return new_poc
@@ -643,6 +681,142 @@ class Patch(models.Model, DiffableModel):
         verbose_name_plural = "patches"
 
 
+class PatchSummary(models.Model):
+    """Denormalized per-patch data for the patch lists and the search.
+
+    Computing these with correlated subqueries for every row of a big
+    commitfest is expensive, so instead we store them here. They are updated
+    by Patch.update_summary() in all code paths that change the underlying
+    data.
+
+    search_document is the full text search document of the patch. It is
+    built by the commitfest_patch_search_document() SQL function (see
+    migration 0023) from the name, the subjects and annotations of the mail
+    threads, the author and reviewer names and the tag names. So it also has
+    to be refreshed when a thread or annotation changes, see
+    MailThread.update_patch_summaries().
+    """
+
+    patch = models.OneToOneField(
+        Patch, on_delete=models.CASCADE, related_name="summary", primary_key=True
+    )
+    author_names = models.TextField(null=True, blank=True)
+    reviewer_names = models.TextField(null=True, blank=True)
+    committer_name = models.TextField(null=True, blank=True)
+    num_cfs = models.IntegerField(null=False, default=0)
+    tag_ids = ArrayField(models.IntegerField(), null=True, blank=True)
+    search_document = SearchVectorField(null=True, blank=True)
+
+    _REFRESH_SQL = """
+INSERT INTO commitfest_patchsummary (patch_id, author_names, reviewer_names,
+                                     committer_name, num_cfs, tag_ids,
+                                     search_document)
+SELECT p.id,
+    (SELECT string_agg(first_name || ' ' || last_name || ' (' || username || ')', ', ') FROM auth_user INNER JOIN commitfest_patch_authors cpa ON cpa.user_id=auth_user.id WHERE cpa.patch_id=p.id),
+    (SELECT string_agg(first_name || ' ' || last_name || ' (' || username || ')', ', ') FROM auth_user INNER JOIN commitfest_patch_reviewers cpr ON cpr.user_id=auth_user.id WHERE cpr.patch_id=p.id),
+    (SELECT first_name || ' ' || last_name || ' (' || username || ')' FROM auth_user WHERE auth_user.id=p.committer_id),
+    (SELECT count(1) FROM commitfest_patchoncommitfest pcf WHERE pcf.patch_id=p.id),
+    (SELECT array_agg(tag_id) FROM commitfest_patch_tags t WHERE t.patch_id=p.id),
+    commitfest_patch_search_document(p.id)
+FROM commitfest_patch p
+WHERE {where}
+ON CONFLICT (patch_id) DO UPDATE
+    SET author_names = EXCLUDED.author_names,
+        reviewer_names = EXCLUDED.reviewer_names,
+        committer_name = EXCLUDED.committer_name,
+        num_cfs = EXCLUDED.num_cfs,
+        tag_ids = EXCLUDED.tag_ids,
+        search_document = EXCLUDED.search_document
+"""
+
+    @classmethod
+    def refresh(cls, patch_ids):
+        with connection.cursor() as curs:
+            curs.execute(
+                cls._REFRESH_SQL.format(where="p.id = ANY(%(patch_ids)s)"),
+                {"patch_ids": list(patch_ids)},
+            )
+
+    @classmethod
+    def refresh_for_user(cls, user):
+        # Names are included in the summary, so when a user gets renamed all
+        # the patches they are involved in need to be refreshed.
+        with connection.cursor() as curs:
+            curs.execute(
+                cls._REFRESH_SQL.format(
+                    where="p.id IN (SELECT patch_id FROM commitfest_patchinvolvement WHERE user_id=%(user_id)s)"
+                ),
+                {"user_id": user.id},
+            )
+
+    @classmethod
+    def refresh_all(cls):
+        with connection.cursor() as curs:
+            curs.execute(cls._REFRESH_SQL.format(where="true"))
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_document"], name="patchsummary_search_idx"),
+        ]
+
+
+def refresh_user_patch_summaries(sender, **kwargs):
+    PatchSummary.refresh_for_user(kwargs["user"])
+
+
+def create_patch_summary(sender, instance, created, **kwargs):
+    # The patch lists join with the summary, so every patch needs one from
+    # the start, also when it's not created through the views.
+    if created:
+        PatchSummary.refresh([instance.id])
+
+
+def tag_deleting(sender, instance, **kwargs):
+    # The tag is gone from the patches by the time it's deleted, so remember
+    # them for tag_deleted.
+    instance._patch_ids = list(instance.patches.values_list("id", flat=True))
+
+
+def tag_deleted(sender, instance, **kwargs):
+    # The tag ids are part of the summary, and the patch lists can't show
+    # tags that don't exist anymore.
+    PatchSummary.refresh(instance._patch_ids)
+
+
+class PatchInvolvement(models.Model):
+    """Which users are involved in which patches, and how.
+
+    This combines the authors, reviewers and committer of all patches into
+    one table, so that the personalized dashboard can find all patches of a
+    user with a single index scan, instead of checking three different places
+    for every patch. It is maintained by triggers on the underlying tables
+    (see migration 0022), so that it's also correct for changes made through
+    the admin.
+    """
+
+    ROLE_AUTHOR = 1
+    ROLE_REVIEWER = 2
+    ROLE_COMMITTER = 3
+    _ROLE_CHOICES = (
+        (ROLE_AUTHOR, "Author"),
+        (ROLE_REVIEWER, "Reviewer"),
+        (ROLE_COMMITTER, "Committer"),
+    )
+
+    user = models.ForeignKey(User, blank=False, null=False, on_delete=models.CASCADE)
+    patch = models.ForeignKey(Patch, blank=False, null=False, on_delete=models.CASCADE)
+    role = models.IntegerField(blank=False, null=False, choices=_ROLE_CHOICES)
+
+    class Meta:
+        unique_together = (
+            (
+                "user",
+                "patch",
+                "role",
+            ),
+        )
+
+
 class PatchOnCommitFest(models.Model):
     # NOTE! This is also matched by the commitfest_patchstatus table,
     # but we hardcoded it in here simply for performance reasons since
@@ -732,6 +906,7 @@ class PatchOnCommitFest(models.Model):
 
         self.patch.save()
         self.save()
+        invalidate_patch_pages(self.patch)
 
     class Meta:
         unique_together = (
@@ -743,7 +918,105 @@ class PatchOnCommitFest(models.Model):
         ordering = ("-commitfest__startdate",)
 
 
+class CommitFestStatusCount(models.Model):
+    """Number of patches in each status, per commitfest.
+
+    Used for the status summary on the commitfest page, so that it doesn't
+    have to count all patches of the commitfest on every page view. This is
+    maintained by triggers on commitfest_patchoncommitfest (see migration
+    0021), so that it's also correct for changes made through the admin or
+    bulk updates. The check_status_counts management command can be used to
+    verify and rebuild it.
+    """
+
+    commitfest = models.ForeignKey(
+        CommitFest, blank=False, null=False, on_delete=models.CASCADE
+    )
+    status = models.IntegerField(blank=False, null=False)
+    count = models.IntegerField(blank=False, null=False, default=0)
+
+    _ACTUAL_COUNTS_SQL = """
+SELECT commitfest_id, status, count(*) FROM commitfest_patchoncommitfest
+GROUP BY commitfest_id, status
+"""
+
+    @classmethod
+    def find_mismatches(cls):
+        """Return (commitfest_id, status, stored, actual) for all wrong counts"""
+        with connection.cursor() as curs:
+            curs.execute(
+                f"""SELECT commitfest_id, status,
+    COALESCE(sc.count, 0), COALESCE(actual.count, 0)
+FROM commitfest_commitfeststatuscount sc
+FULL OUTER JOIN ({cls._ACTUAL_COUNTS_SQL}) actual USING (commitfest_id, status)
+WHERE COALESCE(sc.count, 0) != COALESCE(actual.count, 0)
+ORDER BY commitfest_id, status"""
+            )
+            return curs.fetchall()
+
+    @classmethod
+    def rebuild_all(cls):
+        with connection.cursor() as curs:
+            # Lock out concurrent status changes, so no trigger updates get
+            # lost between the delete and the recount.
+            curs.execute(
+                "LOCK TABLE commitfest_patchoncommitfest IN SHARE ROW EXCLUSIVE MODE"
+            )
+            curs.execute("DELETE FROM commitfest_commitfeststatuscount")
+            curs.execute(
+                f"""INSERT INTO commitfest_commitfeststatuscount (commitfest_id, status, count)
+{cls._ACTUAL_COUNTS_SQL}"""
+            )
+
+    class Meta:
+        unique_together = (
+            (
+                "commitfest",
+                "status",
+            ),
+        )
+
+
 class PatchHistory(models.Model):
+    EVENT_OTHER = 0
+    EVENT_CREATED = 1
+    EVENT_EDITED = 2
+    EVENT_STATUS = 3
+    EVENT_CLOSED = 4
+    EVENT_MOVED = 5
+    EVENT_POSTED = 6
+    EVENT_REVIEWER_ADDED = 7
+    EVENT_REVIEWER_REMOVED = 8
+    EVENT_REVIEWERS_REMOVED = 9
+    EVENT_COMMITTER_ADDED = 10
+    EVENT_COMMITTER_REMOVED = 11
+    EVENT_THREAD_ATTACHED = 12
+    EVENT_THREAD_DETACHED = 13
+    EVENT_ANNOTATION_ADDED = 14
+    EVENT_ANNOTATION_DELETED = 15
+    EVENT_NEEDS_REBASE = 16
+    EVENT_REBASED = 17
+    _EVENT_CHOICES = (
+        (EVENT_OTHER, "Other"),
+        (EVENT_CREATED, "Created"),
+        (EVENT_EDITED, "Edited"),
+        (EVENT_STATUS, "Changed status"),
+        (EVENT_CLOSED, "Closed"),
+        (EVENT_MOVED, "Moved"),
+        (EVENT_POSTED, "Posted"),
+        (EVENT_REVIEWER_ADDED, "Added reviewer"),
+        (EVENT_REVIEWER_REMOVED, "Removed reviewer"),
+        (EVENT_REVIEWERS_REMOVED, "Removed all reviewers"),
+        (EVENT_COMMITTER_ADDED, "Added committer"),
+        (EVENT_COMMITTER_REMOVED, "Removed committer"),
+        (EVENT_THREAD_ATTACHED, "Attached thread"),
+        (EVENT_THREAD_DETACHED, "Detached thread"),
+        (EVENT_ANNOTATION_ADDED, "Added annotation"),
+        (EVENT_ANNOTATION_DELETED, "Deleted annotation"),
+        (EVENT_NEEDS_REBASE, "Needs rebase"),
+        (EVENT_REBASED, "Rebased"),
+    )
+
     patch = models.ForeignKey(Patch, blank=False, null=False, on_delete=models.CASCADE)
     date = models.DateTimeField(
         blank=False, null=False, auto_now_add=True, db_index=True
@@ -751,6 +1024,18 @@ class PatchHistory(models.Model):
     by = models.ForeignKey(User, blank=True, null=True, on_delete=models.CASCADE)
     by_cfbot = models.BooleanField(null=False, blank=False, default=False)
     what = models.CharField(max_length=500, null=False, blank=False)
+    # What happened, for filtering, with the details that are in the text of
+    # what in data, like the new status or the message id of a thread.
+    event = models.IntegerField(
+        null=False, blank=False, default=EVENT_OTHER, choices=_EVENT_CHOICES
+    )
+    data = models.JSONField(null=False, blank=True, default=dict)
+    # The commitfest the patch was in when this happened. Copied from the
+    # patch when the entry is created, so that the activity log of a
+    # commitfest can be read straight from the index.
+    commitfest = models.ForeignKey(
+        CommitFest, blank=True, null=True, on_delete=models.SET_NULL
+    )
 
     @property
     def by_string(self):
@@ -762,8 +1047,33 @@ class PatchHistory(models.Model):
     def __str__(self):
         return "%s - %s" % (self.patch.name, self.date)
 
+    def save(self, *args, **kwargs):
+        if self.pk is None and self.commitfest_id is None:
+            # The commitfest the patch was added to last is the one it's in
+            self.commitfest_id = (
+                PatchOnCommitFest.objects.filter(patch_id=self.patch_id)
+                .order_by("-enterdate")
+                .values_list("commitfest_id", flat=True)
+                .first()
+            )
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ("-date",)
+        indexes = [
+            models.Index(
+                fields=["commitfest", "date", "id"],
+                name="patchhistory_cf_date_idx",
+            ),
+            models.Index(
+                fields=["event", "date", "id"],
+                name="patchhistory_event_date_idx",
+            ),
+            models.Index(
+                fields=["commitfest", "event", "date", "id"],
+                name="patchhistory_cf_event_idx",
+            ),
+        ]
         constraints = [
             models.CheckConstraint(
                 check=(models.Q(by_cfbot=True) & models.Q(by__isnull=True))
@@ -854,10 +1164,32 @@ class MailThread(models.Model):
     def __str__(self):
         return self.subject
 
+    def update_patch_summaries(self):
+        # The subjects and annotations of a thread are part of the search
+        # document of all patches it's attached to.
+        PatchSummary.refresh(self.patches.values_list("id", flat=True))
+
     class Meta:
         ordering = ("firstmessage",)
 
 
+class MailThreadMessage(models.Model):
+    """All message ids we have seen in a mail thread.
+
+    MailThread only stores the first and the latest message id, but people
+    search for patches by the id of any message in the thread. Keeping them
+    all here means that never needs a call to the archives. They are recorded
+    whenever we get new messages of the thread from the archives, in
+    doAttachThread() and parse_and_add_attachments(). Threads from before
+    that are filled in by the index_thread_messages command.
+    """
+
+    mailthread = models.ForeignKey(
+        MailThread, null=False, blank=False, on_delete=models.CASCADE
+    )
+    messageid = models.CharField(max_length=1000, null=False, blank=False, unique=True)
+
+
 class MailThreadAttachment(models.Model):
     mailthread = models.ForeignKey(
         MailThread, null=False, blank=False, on_delete=models.CASCADE
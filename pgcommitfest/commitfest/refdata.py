@@ -0,0 +1,122 @@
+from django.core.cache import cache
+from django.db import transaction
+
+import collections
+import json
+import threading
+import time
+
+from .cache import invalidate_all_pages
+from .memo import forget, memoized
+from .models import Committer, PatchStatus, Tag, TargetVersion
+
+# Tags, target versions, committers and patch statuses change only a few
+# times a year, but are needed on almost every page. So every process keeps
+# them in memory. Whenever any of them changes, a version number in the
+# shared cache is bumped, which makes all processes load them again on their
+# next use. A request only reads that version number once.
+
+ReferenceData = collections.namedtuple(
+    "ReferenceData",
+    [
+        "tags",
+        "tags_by_id",
+        "tags_json",
+        "target_versions",
+        "committers",
+        "committers_by_user_id",
+        "patch_statuses",
+    ],
+)
+
+_VERSION_KEY = "refdata:version"
+
+_lock = threading.Lock()
+_loaded = (None, None)
+
+
+def _current_version():
+    version = cache.get(_VERSION_KEY)
+    if version is None:
+        # Never set, or evicted from the cache. Start a new version, so that
+        # whatever any process has loaded before doesn't match anymore.
+        cache.add(_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(_VERSION_KEY)
+    return version
+
+
+def _load():
+    tags = list(Tag.objects.all().order_by("name"))
+    committers = list(
+        Committer.objects.filter(active=True)
+        .select_related("user")
+        .order_by("user__first_name", "user__last_name")
+    )
+    return ReferenceData(
+        tags=tags,
+        tags_by_id={t.id: t for t in tags},
+        tags_json=json.dumps(
+            [
+                {
+                    "id": tag.id,
+                    "name": tag.name,
+                    "color": tag.color,
+                    "description": tag.description,
+                }
+                for tag in tags
+            ]
+        ),
+        target_versions=list(TargetVersion.objects.all()),
+        committers=committers,
+        committers_by_user_id={c.user_id: c for c in committers},
+        patch_statuses={s.status: s for s in PatchStatus.objects.all()},
+    )
+
+
+def get_reference_data():
+    """Return the reference data, loading it if it changed
+
+    The returned objects are shared between all requests, so they must not be
+    modified.
+    """
+    global _loaded
+
+    version = memoized("refdata_version", _current_version)
+    loaded_version, data = _loaded
+    if loaded_version == version:
+        return data
+
+    with _lock:
+        loaded_version, data = _loaded
+        if loaded_version != version:
+            # The version is read before loading, so if it changes while we
+            # load, the next call will load again.
+            data = _load()
+            _loaded = (version, data)
+        return data
+
+
+def invalidate_reference_data():
+    """Make all processes reload the reference data, after the current
+    transaction commits"""
+
+    def invalidate():
+        try:
+            cache.incr(_VERSION_KEY)
+        except ValueError:
+            cache.set(_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        forget("refdata_version")
+
+    transaction.on_commit(invalidate)
+
+
+def reference_data_changed(sender, **kwargs):
+    invalidate_reference_data()
+    # Tag names and colors are shown on the cached pages
+    invalidate_all_pages()
+
+
+def committer_data_received(sender, **kwargs):
+    # Committer names are part of the reference data
+    if Committer.objects.filter(user=kwargs["user"]).exists():
+        invalidate_reference_data()
@@ -1,6 +1,7 @@
 """Shared test fixtures for commitfest tests."""
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 
 from datetime import date
 
@@ -10,6 +11,12 @@ from pgcommitfest.commitfest.models import CommitFest
 from pgcommitfest.userprofile.models import UserProfile
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Make sure no cached pages leak between tests."""
+    cache.clear()
+
+
 @pytest.fixture
 def alice():
     """Create test user Alice with a profile (uses default notify_all_author=True)."""
@@ -0,0 +1,186 @@
+from django.core.cache import cache
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from pgcommitfest.commitfest import activity
+from pgcommitfest.commitfest.models import Patch, PatchHistory, PatchOnCommitFest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def patch(commitfests, alice):
+    patch = Patch.objects.create(name="Active patch")
+    patch.authors.add(alice)
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=commitfests["in_progress"],
+        enterdate=datetime.now() - timedelta(days=1),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    return patch
+
+
+def activity_names(response):
+    assert response.status_code == 200
+    return [a["what"] for a in response.context["activity"]]
+
+
+def test_history_records_the_commitfest(client, patch, alice, commitfests):
+    PatchHistory(patch=patch, by=alice, what="Reviewed").save()
+    patch.move(commitfests["in_progress"], commitfests["open"], alice)
+    PatchHistory(patch=patch, by=alice, what="Reviewed again").save()
+
+    assert dict(patch.patchhistory_set.values_list("what", "commitfest")) == {
+        "Reviewed": commitfests["in_progress"].id,
+        f"Moved from CF {commitfests['in_progress']} to CF {commitfests['open']}": commitfests[
+            "open"
+        ].id,
+        "Reviewed again": commitfests["open"].id,
+    }
+
+    response = client.get(f"/{commitfests['in_progress'].id}/activity/")
+    assert activity_names(response) == ["Reviewed"]
+    response = client.get(f"/{commitfests['open'].id}/activity/")
+    assert activity_names(response)[0] == "Reviewed again"
+    response = client.get("/activity/")
+    assert activity_names(response)[0] == "Reviewed again"
+    assert activity_names(response)[-1] == "Reviewed"
+
+
+def test_history_with_known_commitfest_is_a_single_insert(
+    patch, alice, commitfests, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        PatchHistory(
+            patch=patch,
+            by=alice,
+            what="Reviewed",
+            commitfest=commitfests["in_progress"],
+        ).save()
+
+
+def test_older_entries(client, patch, alice, commitfests):
+    date = datetime(2024, 1, 1)
+    PatchHistory.objects.bulk_create(
+        PatchHistory(
+            patch=patch,
+            by=alice,
+            what=f"Change {i}",
+            commitfest=commitfests["in_progress"],
+        )
+        for i in range(150)
+    )
+    # Half of them at the same time, to page through ties on the date
+    for i, h in enumerate(PatchHistory.objects.order_by("id")):
+        h.date = date + timedelta(minutes=max(i, 75))
+        h.save()
+
+    for url in ["/activity/", f"/{commitfests['in_progress'].id}/activity/"]:
+        response = client.get(url)
+        first = activity_names(response)
+        assert len(first) == 100
+        assert first[0] == "Change 149"
+        assert "Older entries" in response.content.decode()
+
+        response = client.get(url + "?" + response.context["next_page_query"])
+        rest = activity_names(response)
+        assert response.context["next_page_query"] is None
+        assert "Older entries" not in response.content.decode()
+        assert sorted(first + rest) == sorted(f"Change {i}" for i in range(150))
+
+
+def test_feed_is_served_from_the_cache(
+    client, patch, alice, commitfests, django_assert_num_queries
+):
+    PatchHistory(patch=patch, by=alice, what="Reviewed").save()
+    url = f"/{commitfests['in_progress'].id}/activity.rss/"
+
+    response = client.get(url)
+    assert response["Content-Type"] == "application/rss+xml; charset=utf-8"
+    assert b"Reviewed" in response.content
+    etag = response["ETag"]
+
+    # The session middleware doesn't need the database without a cookie
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert response.status_code == 200
+    assert response["ETag"] == etag
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+
+def test_feed_rendering_is_debounced(
+    client, patch, alice, commitfests, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        PatchHistory(patch=patch, by=alice, what="First change").save()
+    assert b"First change" in client.get("/activity.rss/").content
+
+    # Rendered right after the first change, so this one has to wait until
+    # the debounce period is over.
+    with django_capture_on_commit_callbacks(execute=True):
+        PatchHistory(patch=patch, by=alice, what="Second change").save()
+    assert b"Second change" not in client.get("/activity.rss/").content
+
+    cache.delete(activity._debounce_key(None, None))
+    assert b"Second change" in client.get("/activity.rss/").content
+
+
+def test_feed_of_unknown_commitfest(client, commitfests):
+    assert client.get("/12345/activity.rss/").status_code == 404
+
+
+def test_activity_filters(client, patch, alice, commitfests):
+    PatchHistory(patch=patch, by=alice, what="Edited").save()
+    PatchHistory(
+        patch=patch,
+        by=alice,
+        what="New status: Waiting on Author",
+        event=PatchHistory.EVENT_STATUS,
+        data={"status": PatchOnCommitFest.STATUS_AUTHOR},
+    ).save()
+    PatchHistory(
+        patch=patch,
+        by_cfbot=True,
+        what="Patch needs rebase",
+        event=PatchHistory.EVENT_NEEDS_REBASE,
+    ).save()
+
+    response = client.get("/activity/")
+    assert activity_names(response) == ["New status: Waiting on Author", "Edited"]
+    response = client.get("/activity/?type=status")
+    assert activity_names(response) == ["New status: Waiting on Author"]
+    assert 'href="/activity.rss/?type=status"' in response.content.decode()
+    response = client.get("/activity/?type=cfbot")
+    assert activity_names(response) == ["Patch needs rebase"]
+    assert response.context["activity"][0]["by"] == "CFbot"
+    # Unknown filters are ignored
+    response = client.get("/activity/?type=nonexistent")
+    assert len(activity_names(response)) == 2
+
+    content = client.get("/activity.rss/?type=status").content
+    assert b"Status changes" in content
+    assert b"Waiting on Author" in content
+    assert b"Edited" not in content
+
+
+def test_patch_actions_record_events(client, patch, alice, commitfests):
+    client.force_login(alice)
+    client.post(f"/patch/{patch.id}/status/author/")
+    patch.move(commitfests["in_progress"], commitfests["open"], alice)
+
+    events = list(patch.patchhistory_set.order_by("id").values_list("event", "data"))
+    assert events == [
+        (
+            PatchHistory.EVENT_STATUS,
+            {"status": PatchOnCommitFest.STATUS_AUTHOR},
+        ),
+        (
+            PatchHistory.EVENT_MOVED,
+            {"from": commitfests["in_progress"].id, "to": commitfests["open"].id},
+        ),
+    ]
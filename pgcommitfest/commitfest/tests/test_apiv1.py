@@ -3,10 +3,13 @@ from datetime import datetime, timezone
 
 import pytest
 
+from pgcommitfest.commitfest import apiv1
 from pgcommitfest.commitfest.models import (
+    CfbotBranch,
     MailThread,
     Patch,
     PatchOnCommitFest,
+    Tag,
 )
 
 pytestmark = pytest.mark.django_db
@@ -112,6 +115,85 @@ def test_commitfest_patches_endpoint_not_found(client, commitfests):
     assert response.status_code == 404
 
 
+def test_commitfest_patchlist_endpoint(client, monkeypatch, open_cf, alice, bob):
+    """Test the /api/v1/commitfests/<id>/patchlist endpoint."""
+    tag = Tag.objects.create(name="API test tag", color="#ff0000")
+    patches = []
+    for i in range(5):
+        patch = Patch.objects.create(name=f"Patch {i}")
+        patch.authors.add(alice if i % 2 else bob)
+        if i == 0:
+            patch.tags.add(tag)
+        PatchOnCommitFest.objects.create(
+            patch=patch,
+            commitfest=open_cf,
+            enterdate=datetime.now(),
+            status=PatchOnCommitFest.STATUS_AUTHOR
+            if i == 3
+            else PatchOnCommitFest.STATUS_REVIEW,
+        )
+        patch.update_summary()
+        patches.append(patch)
+    CfbotBranch.objects.create(
+        patch=patches[0],
+        branch_id=1,
+        branch_name="cf/1",
+        apply_url="https://example.com",
+        status="finished",
+        all_additions=10,
+        all_deletions=5,
+    )
+
+    # Make sure the rows get streamed in multiple chunks
+    monkeypatch.setattr(apiv1, "PATCHLIST_FETCH_SIZE", 2)
+
+    response = client.get(f"/api/v1/commitfests/{open_cf.id}/patchlist")
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "application/json"
+    assert response["Access-Control-Allow-Origin"] == "*"
+    data = json.loads(b"".join(response.streaming_content))
+    assert data["commitfest_id"] == open_cf.id
+    # Open patches first, then by creation date
+    assert [p["id"] for p in data["patches"]] == [p.id for p in patches]
+
+    p0 = data["patches"][0]
+    assert p0["name"] == "Patch 0"
+    assert p0["status"] == PatchOnCommitFest.STATUS_REVIEW
+    assert p0["statusstring"] == "Needs review"
+    assert p0["author_names"] == f"Bob Brown ({bob.username})"
+    assert p0["tag_ids"] == [tag.id]
+    assert p0["cfbot_results"]["all_additions"] == 10
+    assert "sortval_0" not in p0
+
+    # Same filters and orderings as the commitfest page
+    response = client.get(
+        f"/api/v1/commitfests/{open_cf.id}/patchlist",
+        {"author": alice.id, "sortkey": -4},
+    )
+    data = json.loads(b"".join(response.streaming_content))
+    assert [p["id"] for p in data["patches"]] == [patches[3].id, patches[1].id]
+
+    response = client.get(
+        f"/api/v1/commitfests/{open_cf.id}/patchlist",
+        {"status": PatchOnCommitFest.STATUS_AUTHOR},
+    )
+    data = json.loads(b"".join(response.streaming_content))
+    assert [p["id"] for p in data["patches"]] == [patches[3].id]
+
+
+def test_commitfest_patchlist_endpoint_errors(client, commitfests):
+    """Test the patchlist endpoint errors."""
+    response = client.get("/api/v1/commitfests/99999/patchlist")
+    assert response.status_code == 404
+
+    # Filtering on yourself requires a login
+    response = client.get(
+        f"/api/v1/commitfests/{commitfests['open'].id}/patchlist", {"author": "-3"}
+    )
+    assert response.status_code == 401
+
+
 def test_patch_threads_endpoint(client, open_cf, alice):
     """Test the /api/v1/patches/<id>/threads endpoint."""
     patch = Patch.objects.create(name="Test patch")
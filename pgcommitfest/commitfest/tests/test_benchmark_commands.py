@@ -0,0 +1,38 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from io import StringIO
+
+import pytest
+
+from pgcommitfest.commitfest.management.commands.benchmark_patchlist import SORTKEYS
+from pgcommitfest.commitfest.models import CommitFestStatusCount, Patch
+
+pytestmark = pytest.mark.django_db
+
+
+def test_seed_and_benchmark(tmp_path):
+    call_command(
+        "seed_benchmark_data",
+        "--patches=500",
+        "--commitfests=5",
+        "--users=100",
+        stdout=StringIO(),
+    )
+    assert Patch.objects.count() == 500
+    assert CommitFestStatusCount.find_mismatches() == []
+
+    # Refuses to add to existing data
+    with pytest.raises(CommandError):
+        call_command("seed_benchmark_data", "--patches=500", stdout=StringIO())
+
+    out = StringIO()
+    call_command("benchmark_patchlist", "--repeat=1", f"--plans={tmp_path}", stdout=out)
+    assert "personalized_sortkey-8" in out.getvalue()
+    # Every ordering, for both the commitfest page and the dashboard, plus the
+    # filters
+    plans = list(tmp_path.iterdir())
+    assert len(plans) > 2 * len(SORTKEYS)
+    assert "actual rows" in (tmp_path / "cf_sortkey0.txt").read_text()
+    # And filters combined with another ordering
+    assert "p.lastmail" in (tmp_path / "cf_status_sortkey2.txt").read_text()
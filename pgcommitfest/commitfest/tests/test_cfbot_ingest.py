@@ -0,0 +1,203 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest.models import (
+    CfbotBranch,
+    CfbotTask,
+    Patch,
+    PatchHistory,
+    PatchOnCommitFest,
+)
+from pgcommitfest.commitfest.views import cfbot_ingest_batch
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def patches(commitfests, alice):
+    patches = []
+    for i in range(2):
+        patch = Patch.objects.create(name=f"CI patch {i}")
+        patch.authors.add(alice)
+        PatchOnCommitFest.objects.create(
+            patch=patch,
+            commitfest=commitfests["in_progress"],
+            enterdate=datetime.now(),
+            status=PatchOnCommitFest.STATUS_REVIEW,
+        )
+        patches.append(patch)
+    return patches
+
+
+def message(
+    patch,
+    branch_id,
+    status,
+    modified,
+    created="2025-01-01T10:00:00",
+    commit_id="abc123",
+    task=None,
+):
+    message = {
+        "branch_status": {
+            "submission_id": patch if isinstance(patch, int) else patch.id,
+            "branch_id": branch_id,
+            "branch_name": f"cf/{branch_id}",
+            "commit_id": commit_id,
+            "apply_url": "https://example.com",
+            "status": status,
+            "created": created,
+            "modified": modified,
+            "version": "1",
+            "patch_count": 1,
+            "first_additions": 10,
+            "first_deletions": 5,
+            "all_additions": 10,
+            "all_deletions": 5,
+        },
+    }
+    if task:
+        position, task_status, task_modified = task
+        message["task_status"] = {
+            "task_id": f"{branch_id}-{position}",
+            "task_name": f"Task {position}",
+            "position": position,
+            "status": task_status,
+            "created": created,
+            "modified": task_modified,
+        }
+    return message
+
+
+def test_out_of_order_messages(patches):
+    p0, p1 = patches
+    results = cfbot_ingest_batch(
+        [
+            message(p0, 1, "testing", "2025-01-01T10:00:00"),
+            message(p0, 1, "finished", "2025-01-01T12:00:00"),
+            message(p0, 1, "testing", "2025-01-01T11:00:00"),
+            message(p1, 2, "testing", "2025-01-01T10:00:00"),
+            message(999999, 3, "testing", "2025-01-01T10:00:00"),
+        ]
+    )
+
+    assert results == ["stale", "applied", "stale", "applied", "unknown_patch"]
+    assert CfbotBranch.objects.get(pk=p0.id).status == "finished"
+    assert CfbotBranch.objects.get(pk=p1.id).status == "testing"
+
+    # Anything not newer than what we have is ignored in later batches too
+    results = cfbot_ingest_batch(
+        [message(p0, 1, "failed", "2025-01-01T11:30:00")],
+    )
+    assert results == ["stale"]
+    assert CfbotBranch.objects.get(pk=p0.id).status == "finished"
+
+
+def test_newer_branch_replaces_tasks(patches):
+    p0 = patches[0]
+    results = cfbot_ingest_batch(
+        [
+            message(
+                p0,
+                1,
+                "testing",
+                "2025-01-01T10:00:00",
+                task=(0, "EXECUTING", "2025-01-01T10:00:00"),
+            ),
+            message(
+                p0,
+                2,
+                "testing",
+                "2025-01-02T10:00:00",
+                created="2025-01-02T10:00:00",
+                task=(0, "EXECUTING", "2025-01-02T10:00:00"),
+            ),
+            message(
+                p0,
+                2,
+                "testing",
+                "2025-01-02T10:00:00",
+                created="2025-01-02T10:00:00",
+                task=(1, "COMPLETED", "2025-01-02T11:00:00"),
+            ),
+            message(
+                p0,
+                1,
+                "finished",
+                "2025-01-01T12:00:00",
+                task=(0, "COMPLETED", "2025-01-01T12:00:00"),
+            ),
+        ]
+    )
+
+    assert results == ["old_branch", "applied", "applied", "old_branch"]
+    assert CfbotBranch.objects.get(pk=p0.id).branch_id == 2
+    assert sorted(
+        CfbotTask.objects.filter(patch=p0).values_list(
+            "branch_id", "position", "status"
+        )
+    ) == [(2, 0, "EXECUTING"), (2, 1, "COMPLETED")]
+
+
+def test_needs_rebase_and_failing(patches):
+    p0, p1 = patches
+    cfbot_ingest_batch(
+        [
+            message(p0, 1, "testing", "2025-01-01T10:00:00", commit_id=None),
+            message(p0, 1, "failed", "2025-01-01T11:00:00", commit_id=None),
+            message(
+                p1,
+                2,
+                "testing",
+                "2025-01-01T10:00:00",
+                task=(0, "FAILED", "2025-01-01T10:00:00"),
+            ),
+        ]
+    )
+
+    branch = CfbotBranch.objects.get(pk=p0.id)
+    assert branch.needs_rebase_since is not None
+    assert branch.failing_since is not None
+    assert CfbotBranch.objects.get(pk=p1.id).failing_since is not None
+    assert list(PatchHistory.objects.values_list("patch", "event")) == [
+        (p0.id, PatchHistory.EVENT_NEEDS_REBASE)
+    ]
+
+    cfbot_ingest_batch(
+        [
+            message(
+                p0, 2, "testing", "2025-01-02T10:00:00", created="2025-01-02T10:00:00"
+            ),
+            message(
+                p0, 2, "finished", "2025-01-02T11:00:00", created="2025-01-02T10:00:00"
+            ),
+        ]
+    )
+
+    branch = CfbotBranch.objects.get(pk=p0.id)
+    assert branch.needs_rebase_since is None
+    assert branch.failing_since is None
+    assert PatchHistory.objects.filter(
+        patch=p0, event=PatchHistory.EVENT_REBASED, by_cfbot=True
+    ).exists()
+
+
+def test_notify_accepts_a_batch(client, patches, settings):
+    settings.CFBOT_SECRET = "secret"
+    body = {
+        "shared_secret": "secret",
+        "messages": [
+            message(patches[0], 1, "testing", "2025-01-01T10:00:00"),
+            message(999999, 2, "testing", "2025-01-01T10:00:00"),
+        ],
+    }
+
+    response = client.post("/cfbot_notify/", json.dumps(body), "application/json")
+    assert response.status_code == 200
+    assert response.json() == {"results": ["applied", "unknown_patch"]}
+
+    body["shared_secret"] = "wrong"
+    response = client.post("/cfbot_notify/", json.dumps(body), "application/json")
+    assert response.status_code == 403
@@ -0,0 +1,160 @@
+from django.test import RequestFactory
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from pgcommitfest.commitfest.models import (
+    CfbotBranch,
+    Patch,
+    PatchHistory,
+    PatchOnCommitFest,
+)
+from pgcommitfest.commitfest.views import _commitfest_etag, cfbot_ingest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def patch(commitfests, alice):
+    patch = Patch.objects.create(name="Conditional patch")
+    patch.authors.add(alice)
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=commitfests["in_progress"],
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    return patch
+
+
+def cfbot_message(patch, branch_id, status, modified):
+    return {
+        "branch_status": {
+            "submission_id": patch.id,
+            "branch_id": branch_id,
+            "branch_name": f"cf/{patch.id}",
+            "commit_id": "abc123",
+            "apply_url": "https://example.com",
+            "status": status,
+            "created": "2025-01-01T10:00:00",
+            "modified": modified,
+            "version": "1",
+            "patch_count": 1,
+            "first_additions": 10,
+            "first_deletions": 5,
+            "all_additions": 10,
+            "all_deletions": 5,
+        },
+    }
+
+
+def test_patch_page_not_modified(client, patch):
+    response = client.get(f"/patch/{patch.id}/")
+    assert response.status_code == 200
+    etag = response["ETag"]
+
+    response = client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+
+    # Logged in users see a different page, so they get a different ETag
+    client.force_login(patch.authors.get())
+    response = client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_subscribe_changes_etag(client, patch, bob):
+    client.force_login(bob)
+    etag = client.get(f"/patch/{patch.id}/")["ETag"]
+
+    response = client.get(f"/patch/{patch.id}/subscribe/")
+    assert response.status_code == 302
+
+    # The flashed message has to be shown
+    response = client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert "You have been subscribed" in response.content.decode()
+    assert not response.has_header("ETag")
+
+    # And after that the page still differs, because of the button
+    response = client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+    new_etag = response["ETag"]
+    response = client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=new_etag)
+    assert response.status_code == 304
+
+
+def test_patch_move_changes_etags(
+    client, patch, alice, commitfests, django_capture_on_commit_callbacks
+):
+    in_progress_cf = commitfests["in_progress"]
+    open_cf = commitfests["open"]
+    request = RequestFactory().get("/")
+    request.user = alice
+    cf_etags = (
+        _commitfest_etag(request, in_progress_cf.id),
+        _commitfest_etag(request, open_cf.id),
+    )
+    etag = client.get(f"/patch/{patch.id}/")["ETag"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        patch.move(in_progress_cf, open_cf, alice)
+
+    response = client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+    assert _commitfest_etag(request, in_progress_cf.id) != cf_etags[0]
+    assert _commitfest_etag(request, open_cf.id) != cf_etags[1]
+
+
+def test_ci_change_changes_etag(client, patch, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        cfbot_ingest(cfbot_message(patch, 1, "testing", "2025-01-01T10:00:00"))
+    etag = client.get(f"/patch/{patch.id}/")["ETag"]
+    assert client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        cfbot_ingest(cfbot_message(patch, 1, "finished", "2025-01-01T11:00:00"))
+    assert CfbotBranch.objects.get(pk=patch.id).status == "finished"
+
+    response = client.get(f"/patch/{patch.id}/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["ETag"] != etag
+
+
+def test_activity_feed_last_modified(
+    client, patch, alice, commitfests, django_capture_on_commit_callbacks
+):
+    history = PatchHistory(patch=patch, by=alice, what="Created patch record")
+    history.save()
+    PatchHistory.objects.filter(pk=history.pk).update(
+        date=datetime.now() - timedelta(days=1)
+    )
+
+    for url in ["/activity.rss/", f"/{commitfests['in_progress'].id}/activity.rss/"]:
+        response = client.get(url)
+        assert response.status_code == 200
+        last_modified = response["Last-Modified"]
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+    # The feeds are rendered again when the new entry is committed
+    with django_capture_on_commit_callbacks(execute=True):
+        PatchHistory(patch=patch, by=alice, what="Changed status").save()
+    for url in ["/activity.rss/", f"/{commitfests['in_progress'].id}/activity.rss/"]:
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 200
+        assert b"Changed status" in response.content
+
+
+def test_activity_page_not_modified(client, patch, alice, commitfests):
+    PatchHistory(patch=patch, by=alice, what="Created patch record").save()
+    etag = client.get("/activity/")["ETag"]
+    assert client.get("/activity/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    PatchHistory(patch=patch, by=alice, what="Changed status").save()
+    assert client.get("/activity/", HTTP_IF_NONE_MATCH=etag).status_code == 200
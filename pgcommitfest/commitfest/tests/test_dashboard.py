@@ -0,0 +1,123 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404
+from django.test import RequestFactory
+
+import json
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest import views
+from pgcommitfest.commitfest.cache import dashboard_version
+from pgcommitfest.commitfest.models import Patch, PatchOnCommitFest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def dashboard_patches(open_cf, in_progress_cf, alice, bob):
+    def create_patch(name, status):
+        patch = Patch.objects.create(name=name)
+        PatchOnCommitFest.objects.create(
+            patch=patch,
+            commitfest=in_progress_cf,
+            enterdate=datetime.now(),
+            status=status,
+        )
+        return patch
+
+    needs_changes = create_patch("Needs changes", PatchOnCommitFest.STATUS_AUTHOR)
+    needs_changes.authors.add(alice)
+    for i in range(3):
+        to_review = create_patch(f"To review {i}", PatchOnCommitFest.STATUS_REVIEW)
+        to_review.authors.add(bob)
+        to_review.reviewers.add(alice)
+
+
+def get_section(view, user, *args, headers=None, **params):
+    request = RequestFactory().get("/", params, headers=headers)
+    request.user = user
+    return view(request, *args)
+
+
+def test_section_contains_only_its_group(dashboard_patches, alice):
+    response = get_section(views.dashboard_section, alice, "review")
+    html = json.loads(response.content)["html"]
+
+    assert "Patches that are ready for your review" in html
+    assert html.count("To review") == 3
+    assert "Needs changes" not in html
+    assert "More patches" not in html
+
+    response = get_section(views.dashboard_section, alice, "blocked")
+    assert "<tr>" not in json.loads(response.content)["html"]
+
+
+def test_section_links_to_the_rest(dashboard_patches, alice, monkeypatch):
+    monkeypatch.setattr(views, "PATCHLIST_PAGE_SIZE", 2)
+
+    response = get_section(views.dashboard_section, alice, "review", text="review")
+    html = json.loads(response.content)["html"]
+
+    assert html.count("To review") == 2
+    assert 'href="/?text=review&amp;cursor=' in html
+
+
+def test_section_filters(dashboard_patches, alice):
+    response = get_section(views.dashboard_section, alice, "review", text="1")
+    html = json.loads(response.content)["html"]
+
+    assert "To review 1" in html
+    assert "To review 0" not in html
+
+
+def test_statussummary(dashboard_patches, alice):
+    response = get_section(views.dashboard_statussummary, alice)
+    html = json.loads(response.content)["html"]
+
+    assert '<a href="?status=1">Needs review</a>: 3.' in html
+    assert '<a href="?status=2">Waiting on Author</a>: 1.' in html
+
+
+def test_sections_require_login(dashboard_patches):
+    response = get_section(views.dashboard_section, AnonymousUser(), "review")
+    assert response.status_code == 401
+    response = get_section(views.dashboard_statussummary, AnonymousUser())
+    assert response.status_code == 401
+
+
+def test_unknown_section(alice):
+    with pytest.raises(Http404):
+        get_section(views.dashboard_section, alice, "nonexistent")
+
+
+def test_sections_detect_changes(
+    dashboard_patches, alice, django_capture_on_commit_callbacks
+):
+    request = RequestFactory().get("/")
+    request.user = alice
+    version = dashboard_version(request)
+    headers = {"X-Dashboard-Version": version}
+
+    response = get_section(views.dashboard_section, alice, "review", headers=headers)
+    assert response.status_code == 200
+    response = get_section(views.dashboard_statussummary, alice, headers=headers)
+    assert response.status_code == 200
+
+    # After a change the page has to load all sections again
+    with django_capture_on_commit_callbacks(execute=True):
+        poc = PatchOnCommitFest.objects.get(patch__name="To review 0")
+        poc.set_status(PatchOnCommitFest.STATUS_AUTHOR)
+    for view, args in [
+        (views.dashboard_section, ["review"]),
+        (views.dashboard_statussummary, []),
+    ]:
+        response = get_section(view, alice, *args, headers=headers)
+        assert response.status_code == 409
+        new_version = json.loads(response.content)["version"]
+        assert new_version != version
+
+        response = get_section(
+            view, alice, *args, headers={"X-Dashboard-Version": new_version}
+        )
+        assert response.status_code == 200
@@ -0,0 +1,100 @@
+from django.core.management import call_command
+from django.test import RequestFactory
+
+import json
+from datetime import datetime
+from io import StringIO
+
+import pytest
+
+from pgcommitfest.commitfest import views
+from pgcommitfest.commitfest.cache import (
+    _get_versions,
+    dashboard_cache_stats,
+    invalidate_patch_pages,
+)
+from pgcommitfest.commitfest.models import (
+    Patch,
+    PatchHistory,
+    PatchOnCommitFest,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def patch(in_progress_cf, alice, bob):
+    patch = Patch.objects.create(name="Cached patch")
+    patch.authors.add(bob)
+    patch.reviewers.add(alice)
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=in_progress_cf,
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    return patch
+
+
+def get_review_section(user):
+    request = RequestFactory().get("/")
+    request.user = user
+    return json.loads(views.dashboard_section(request, "review").content)["html"]
+
+
+def user_version(user):
+    return _get_versions([f"user:{user.id}"])[0]
+
+
+def test_dashboard_is_cached_until_patch_changes(
+    patch, alice, bob, django_capture_on_commit_callbacks
+):
+    assert "Cached patch" in get_review_section(alice)
+    assert dashboard_cache_stats() == {"hits": 0, "misses": 1}
+
+    patch.name = "Renamed patch"
+    patch.save()
+    patch.update_summary()
+    assert "Cached patch" in get_review_section(alice)
+    assert dashboard_cache_stats() == {"hits": 1, "misses": 1}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        PatchHistory(patch=patch, by=bob, what="Renamed patch").save()
+        invalidate_patch_pages(patch)
+
+    assert "Renamed patch" in get_review_section(alice)
+    assert dashboard_cache_stats() == {"hits": 1, "misses": 2}
+
+
+def test_only_involved_users_are_invalidated(
+    patch, alice, bob, charlie, django_capture_on_commit_callbacks
+):
+    versions = {u: user_version(u) for u in (alice, bob, charlie)}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        patch.patchoncommitfest_set.get().set_status(PatchOnCommitFest.STATUS_AUTHOR)
+
+    assert user_version(alice) != versions[alice]
+    assert user_version(bob) != versions[bob]
+    assert user_version(charlie) == versions[charlie]
+
+
+def test_removed_reviewer_is_invalidated(
+    patch, alice, django_capture_on_commit_callbacks
+):
+    assert "Cached patch" in get_review_section(alice)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        patch.reviewers.remove(alice)
+
+    assert "Cached patch" not in get_review_section(alice)
+
+
+def test_dashboard_cache_stats_command(patch, alice):
+    get_review_section(alice)
+    get_review_section(alice)
+
+    out = StringIO()
+    call_command("dashboard_cache_stats", "--reset", stdout=out)
+    assert out.getvalue() == "Hits: 1, misses: 1, hit ratio: 50.0%\n"
+    assert dashboard_cache_stats() == {"hits": 0, "misses": 0}
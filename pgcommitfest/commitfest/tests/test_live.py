@@ -0,0 +1,195 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import AsyncClient
+
+import json
+from datetime import datetime
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from pgcommitfest.commitfest import live
+from pgcommitfest.commitfest.models import Patch, PatchHistory, PatchOnCommitFest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def stream_url(settings):
+    settings.ACTIVITY_STREAM_URL = ""
+
+
+@pytest.fixture
+def listener(monkeypatch):
+    """A listener that doesn't LISTEN, events are dispatched by the test"""
+    monkeypatch.setattr(
+        live.ActivityListener, "_run", lambda self: self._listening.set()
+    )
+    listener = live.ActivityListener()
+    monkeypatch.setattr(live, "listener", listener)
+    return listener
+
+
+@pytest.fixture
+def patch(commitfests, alice):
+    patch = Patch.objects.create(name="Live patch")
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=commitfests["open"],
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    return patch
+
+
+def history_event(id, commitfest_id, what="Changed"):
+    return {
+        "type": "history",
+        "id": id,
+        "date": "2025-01-01T10:00:00",
+        "by": "alice",
+        "by_cfbot": False,
+        "what": what,
+        "event": PatchHistory.EVENT_STATUS,
+        "patchid": 1,
+        "name": "Live patch",
+        "commitfest_id": commitfest_id,
+    }
+
+
+@async_to_sync
+async def stream(listener, url, events=(), **headers):
+    """Request a stream, dispatch the events to it, and return what it sent"""
+    response = await AsyncClient().get(url, headers=headers)
+    for event in events:
+        listener.dispatch(event)
+    # Everything has been dispatched, so end the streams
+    for subscription in list(listener._subscriptions):
+        subscription.lose()
+    assert response["Content-Type"] == "text/event-stream"
+    content = "".join([c.decode() async for c in response.streaming_content])
+    assert content.startswith("retry: 5000\n\n")
+    events = []
+    for block in content.split("\n\n")[1:-1]:
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_of_a_commitfest(listener, commitfests):
+    cfid = commitfests["open"].id
+    events = stream(
+        listener,
+        f"/{cfid}/activity/stream/",
+        [
+            history_event(10, commitfests["in_progress"].id),
+            history_event(11, cfid),
+            {"type": "cfbot", "patchid": 1, "commitfest_id": cfid},
+        ],
+    )
+    assert [(id, event) for id, event, _ in events] == [
+        ("11", "history"),
+        (None, "cfbot"),
+    ]
+    assert events[0][2]["what"] == "Changed"
+    assert not listener._subscriptions
+
+
+def test_reconnect_sends_missed_entries(listener, patch, alice):
+    entries = [
+        PatchHistory(patch=patch, by=alice, what=f"Change {i}") for i in range(3)
+    ]
+    for h in entries:
+        h.save()
+
+    events = stream(
+        listener,
+        "/activity/stream/",
+        [
+            # Sent again by the listener, after it was already read from the
+            # table
+            history_event(entries[2].id, entries[2].commitfest_id),
+            history_event(entries[2].id + 1, None, "Newer change"),
+        ],
+        last_event_id=str(entries[0].id),
+    )
+    assert [(id, data["what"]) for id, _, data in events] == [
+        (str(entries[1].id), "Change 1"),
+        (str(entries[2].id), "Change 2"),
+        (str(entries[2].id + 1), "Newer change"),
+    ]
+
+
+def test_slow_clients_are_dropped(listener):
+    subscription = async_to_sync(listener.subscribe)()
+    for i in range(live.MAX_PENDING_EVENTS + 1):
+        listener.dispatch(history_event(i, None))
+    assert subscription.lost
+    assert subscription not in listener._subscriptions
+
+
+def test_listener_receives_notifications(monkeypatch):
+    monkeypatch.setattr(live, "POLL_INTERVAL", 0.1)
+    listener = live.ActivityListener()
+    subscription = async_to_sync(listener.subscribe)()
+    assert not subscription.lost
+
+    # It is listening as soon as it is subscribed, so this isn't missed.
+    # Notify from another connection, since this test's transaction never
+    # commits.
+    notifier = connections.create_connection(DEFAULT_DB_ALIAS)
+    try:
+        with notifier.cursor() as curs:
+            curs.execute(
+                "SELECT pg_notify(%s, %s)",
+                [live.CHANNEL, json.dumps({"type": "cfbot", "patchid": 1})],
+            )
+    finally:
+        notifier.close()
+    assert subscription.events.get(timeout=5) == {"type": "cfbot", "patchid": 1}
+
+    thread = listener._thread
+    listener.unsubscribe(subscription)
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert listener._thread is None
+
+
+def test_stream_follows_the_activity_filter(listener, commitfests):
+    cfbot_entry = dict(
+        history_event(1, None),
+        by_cfbot=True,
+        event=PatchHistory.EVENT_NEEDS_REBASE,
+    )
+    edit = dict(history_event(2, None), event=PatchHistory.EVENT_EDITED)
+
+    events = (cfbot_entry, edit, history_event(3, None))
+    assert [id for id, _, _ in stream(listener, "/activity/stream/", events)] == [
+        "2",
+        "3",
+    ]
+    assert [
+        id for id, _, _ in stream(listener, "/activity/stream/?type=status", events)
+    ] == ["3"]
+
+
+def test_streams_are_off_by_default(client, settings, commitfests):
+    settings.ACTIVITY_STREAM_URL = None
+    assert "activity-stream" not in client.get("/activity/").content.decode()
+
+    settings.ACTIVITY_STREAM_URL = "http://localhost:8008"
+    assert 'data-url="http://localhost:8008/activity/stream/"' in (
+        client.get("/activity/").content.decode()
+    )
+
+
+def test_streams_are_not_served_by_wsgi(client, commitfests):
+    # That would keep a worker busy for as long as the page is open
+    assert client.get("/activity/stream/").status_code == 404
+
+
+def test_subscribe_gives_up_without_connection(monkeypatch):
+    monkeypatch.setattr(live, "LISTEN_TIMEOUT", 0.1)
+    monkeypatch.setattr(live.ActivityListener, "_run", lambda self: None)
+    listener = live.ActivityListener()
+    subscription = async_to_sync(listener.subscribe)()
+    assert subscription.lost
@@ -0,0 +1,111 @@
+from django.test import RequestFactory
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest.memo import (
+    RequestMemoMiddleware,
+    avoided_lookups,
+    memoized,
+    reset_avoided_lookups,
+)
+from pgcommitfest.commitfest.models import CommitFest, Patch, PatchOnCommitFest
+from pgcommitfest.userprofile.models import UserExtraEmail, UserProfile
+from pgcommitfest.userprofile.util import UserWrapper
+
+pytestmark = pytest.mark.django_db
+
+
+def in_request(func):
+    """Run func the same way as a view, with the memo active"""
+    middleware = RequestMemoMiddleware(lambda request: func())
+    return middleware(RequestFactory().get("/"))
+
+
+def test_memo_only_exists_during_a_request():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert memoized("key", compute) == 1
+    assert memoized("key", compute) == 2
+
+    def twice():
+        return memoized("key", compute), memoized("key", compute)
+
+    assert in_request(twice) == (3, 3)
+    # A new request starts out empty
+    assert in_request(twice) == (4, 4)
+
+
+def test_memo_is_per_thread():
+    def other_thread():
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(memoized("key", lambda: "other"))
+        )
+        thread.start()
+        thread.join()
+        return memoized("key", lambda: "this"), results[0]
+
+    assert in_request(other_thread) == ("this", "other")
+
+
+def test_relevant_commitfests_are_looked_up_once(
+    commitfests, django_assert_num_queries
+):
+    reset_avoided_lookups()
+
+    def lookup_twice():
+        with django_assert_num_queries(5):
+            first = CommitFest.relevant_commitfests()
+            second = CommitFest.relevant_commitfests()
+        assert first is second
+
+    in_request(lookup_twice)
+    assert avoided_lookups() == 1
+
+
+def test_current_patch_on_commitfest_is_forgotten_after_move(
+    commitfests, alice, django_assert_num_queries
+):
+    patch = Patch.objects.create(name="Moving patch")
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=commitfests["in_progress"],
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+
+    def move():
+        cf = patch.current_commitfest()
+        with django_assert_num_queries(0):
+            assert patch.current_commitfest() == cf
+        patch.move(cf, commitfests["open"], alice)
+        return patch.current_commitfest()
+
+    assert in_request(move) == commitfests["open"]
+
+
+def test_user_email_is_forgotten_when_changed(alice):
+    profile = UserProfile.objects.get(user=alice)
+    extra = UserExtraEmail.objects.create(user=alice, email="alice@work.example")
+
+    def emails():
+        results = [UserWrapper(alice).email]
+        profile.selectedemail = extra
+        profile.save()
+        results.append(UserWrapper(alice).email)
+        extra.delete()
+        results.append(UserWrapper(alice).email)
+        return results
+
+    assert in_request(emails) == [
+        "alice@example.com",
+        "alice@work.example",
+        "alice@example.com",
+    ]
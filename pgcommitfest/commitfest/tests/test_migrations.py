@@ -0,0 +1,34 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+import pytest
+
+from pgcommitfest.commitfest.models import Patch
+
+pytestmark = pytest.mark.django_db
+
+
+def migrate(target):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate([("commitfest", target)])
+
+
+def test_history_insert_after_reverting_event(alice):
+    patch = Patch.objects.create(name="Migrated patch")
+
+    migrate("0026_activity_notify")
+    try:
+        with connection.cursor() as curs:
+            # The notify trigger must not use the dropped event column
+            curs.execute(
+                """INSERT INTO commitfest_patchhistory
+                    (patch_id, date, by_id, by_cfbot, what)
+                VALUES (%s, now(), %s, false, 'Created patch record')""",
+                [patch.id, alice.id],
+            )
+            # Check the foreign keys now, so that the table can be altered
+            # again
+            curs.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    finally:
+        migrate("0027_patchhistory_event")
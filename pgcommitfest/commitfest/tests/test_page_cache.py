@@ -0,0 +1,95 @@
+from django.test import Client
+
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest.cache import _get_versions, _page_cache_key
+from pgcommitfest.commitfest.models import (
+    Patch,
+    PatchHistory,
+    PatchOnCommitFest,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def patch(commitfests, alice):
+    patch = Patch.objects.create(name="Cached patch")
+    patch.authors.add(alice)
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=commitfests["open"],
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    return patch
+
+
+def test_anonymous_patch_page_is_cached(client, patch, django_assert_num_queries):
+    response = client.get(f"/patch/{patch.id}/")
+    assert response.status_code == 200
+
+    with django_assert_num_queries(0):
+        cached = client.get(f"/patch/{patch.id}/")
+    assert cached.content == response.content
+
+
+def test_patch_history_does_not_invalidate_cache(
+    patch, alice, django_capture_on_commit_callbacks
+):
+    versions = _get_versions([f"patch:{patch.id}"])
+
+    # Invalidating is up to the code making the change, which knows whether
+    # it already did.
+    with django_capture_on_commit_callbacks(execute=True):
+        PatchHistory(patch=patch, by=alice, what="Edited patch").save()
+    assert _get_versions([f"patch:{patch.id}"]) == versions
+
+
+def test_reviewer_change_invalidates_cache(
+    client, patch, bob, commitfests, django_capture_on_commit_callbacks
+):
+    cf_versions = _get_versions([f"cf:{commitfests['open'].id}"])
+    response = client.get(f"/patch/{patch.id}/")
+    assert b"Bob Brown" not in response.content
+
+    reviewer = Client()
+    reviewer.force_login(bob)
+    with django_capture_on_commit_callbacks(execute=True):
+        reviewer.get(f"/patch/{patch.id}/reviewer/become/")
+
+    response = client.get(f"/patch/{patch.id}/")
+    assert b"Bob Brown" in response.content
+    assert _get_versions([f"cf:{commitfests['open'].id}"]) != cf_versions
+
+
+def test_status_change_invalidates_cache(
+    client, patch, django_capture_on_commit_callbacks
+):
+    client.get(f"/patch/{patch.id}/")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        patch.patchoncommitfest_set.get().set_status(PatchOnCommitFest.STATUS_AUTHOR)
+
+    response = client.get(f"/patch/{patch.id}/")
+    assert b"Waiting on Author" in response.content
+
+
+def test_logged_in_users_are_not_cached(client, patch, alice):
+    response = client.get(f"/patch/{patch.id}/")
+    assert b"Logged in as" not in response.content
+
+    client.force_login(alice)
+    response = client.get(f"/patch/{patch.id}/")
+    assert b"Logged in as alice" in response.content
+
+
+def test_filter_parameter_order_does_not_matter(rf):
+    a = rf.get("/1/?tag=2&tag=1&status=3")
+    b = rf.get("/1/?status=3&tag=1&tag=2")
+    c = rf.get("/1/?status=3&tag=1")
+    assert _page_cache_key(a, [1, 2]) == _page_cache_key(b, [1, 2])
+    assert _page_cache_key(a, [1, 2]) != _page_cache_key(c, [1, 2])
+    assert _page_cache_key(a, [1, 2]) != _page_cache_key(a, [1, 3])
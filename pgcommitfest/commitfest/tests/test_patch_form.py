@@ -0,0 +1,84 @@
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest.models import Patch, PatchOnCommitFest, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+def test_edit_records_changes_in_history(client, alice, bob, open_cf):
+    patch = Patch.objects.create(name="Old name")
+    patch.authors.add(alice)
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=open_cf,
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+
+    client.force_login(alice)
+    response = client.post(
+        f"/patch/{patch.id}/edit/",
+        {
+            "name": "New name",
+            "authors": [alice.id, bob.id],
+            "wikilink": "",
+            "gitlink": "",
+        },
+    )
+    assert response.status_code == 302
+
+    history = sorted(patch.history.values_list("what", flat=True))
+    assert len(history) == 2
+    assert history[0].startswith("Changed authors to ")
+    assert "Bob Brown (b)" in history[0]
+    assert history[1] == "Changed name to New name"
+
+
+def test_edit_records_reviewer_and_tag_changes(client, alice, bob, open_cf):
+    tag = Tag.objects.create(name="Form tag", color="#000000")
+    patch = Patch.objects.create(name="Patch")
+    patch.authors.add(alice)
+    # Reviewers can only be edited on closed patches
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=open_cf,
+        enterdate=datetime.now(),
+        leavedate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_COMMITTED,
+    )
+
+    client.force_login(alice)
+    response = client.post(
+        f"/patch/{patch.id}/edit/",
+        {
+            "name": "Patch",
+            "authors": [alice.id],
+            "reviewers": [bob.id],
+            "tags": [tag.id],
+            "wikilink": "",
+            "gitlink": "",
+        },
+    )
+    assert response.status_code == 302
+
+    history = sorted(patch.history.values_list("what", flat=True))
+    assert len(history) == 2
+    assert history[0].startswith("Changed reviewers to ")
+    assert "Bob Brown (b)" in history[0]
+    assert history[1].startswith("Changed tags to ")
+    assert "Form tag" in history[1]
+
+
+def test_other_saves_skip_many_to_many_fields(alice, django_assert_num_queries):
+    patch = Patch.objects.create(name="Patch")
+    patch.authors.add(alice)
+
+    # Only loading and updating the patch itself, not its authors, reviewers,
+    # tags and so on
+    with django_assert_num_queries(2):
+        patch = Patch.objects.get(pk=patch.pk)
+        patch.name = "Renamed"
+        patch.save()
+    assert patch.diff == {"name": ("Patch", "Renamed")}
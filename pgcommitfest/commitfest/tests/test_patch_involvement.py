@@ -0,0 +1,94 @@
+from django.test import RequestFactory
+
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest import views
+from pgcommitfest.commitfest.models import (
+    Committer,
+    Patch,
+    PatchInvolvement,
+    PatchOnCommitFest,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def involvement(patch):
+    return set(
+        PatchInvolvement.objects.filter(patch=patch).values_list("user_id", "role")
+    )
+
+
+def test_involvement_follows_patch_changes(alice, bob, charlie):
+    bob_committer = Committer.objects.create(user=bob)
+    charlie_committer = Committer.objects.create(user=charlie)
+
+    patch = Patch.objects.create(name="Test patch", committer=bob_committer)
+    assert involvement(patch) == {(bob.id, PatchInvolvement.ROLE_COMMITTER)}
+
+    patch.authors.add(alice, charlie)
+    patch.reviewers.add(alice)
+    assert involvement(patch) == {
+        (alice.id, PatchInvolvement.ROLE_AUTHOR),
+        (alice.id, PatchInvolvement.ROLE_REVIEWER),
+        (bob.id, PatchInvolvement.ROLE_COMMITTER),
+        (charlie.id, PatchInvolvement.ROLE_AUTHOR),
+    }
+
+    patch.authors.remove(charlie)
+    patch.reviewers.clear()
+    patch.committer = charlie_committer
+    patch.save()
+    assert involvement(patch) == {
+        (alice.id, PatchInvolvement.ROLE_AUTHOR),
+        (charlie.id, PatchInvolvement.ROLE_COMMITTER),
+    }
+
+    patch.committer = None
+    patch.save()
+    assert involvement(patch) == {(alice.id, PatchInvolvement.ROLE_AUTHOR)}
+
+    patch.delete()
+    assert not PatchInvolvement.objects.exists()
+
+
+def test_dashboard_lists_involved_open_patches(in_progress_cf, alice, bob):
+    def create_patch(name, status=PatchOnCommitFest.STATUS_REVIEW):
+        patch = Patch.objects.create(name=name)
+        PatchOnCommitFest.objects.create(
+            patch=patch,
+            commitfest=in_progress_cf,
+            enterdate=datetime.now(),
+            leavedate=None
+            if status in PatchOnCommitFest.OPEN_STATUSES
+            else datetime.now(),
+            status=status,
+        )
+        return patch
+
+    authored = create_patch("Authored")
+    authored.authors.add(alice)
+    reviewing = create_patch("Reviewing")
+    reviewing.authors.add(bob)
+    reviewing.reviewers.add(alice)
+    # Both an author and a reviewer, which must still show up only once
+    both = create_patch("Both", status=PatchOnCommitFest.STATUS_AUTHOR)
+    both.authors.add(alice)
+    both.reviewers.add(alice)
+    closed = create_patch("Closed", status=PatchOnCommitFest.STATUS_COMMITTED)
+    closed.authors.add(alice)
+    other = create_patch("Other")
+    other.authors.add(bob)
+
+    request = RequestFactory().get("/")
+    request.user = alice
+    patch_list = views.patchlist(request, in_progress_cf, personalized=True)
+
+    groups = {p["name"]: p["group_name"] for p in patch_list.patches}
+    assert groups == {
+        "Authored": "Blocked on others",
+        "Reviewing": "Patches that are ready for your review",
+        "Both": "Your patches that need changes from you",
+    }
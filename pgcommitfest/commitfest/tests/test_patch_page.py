@@ -0,0 +1,140 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from pgcommitfest.commitfest.models import (
+    MailThread,
+    MailThreadAnnotation,
+    MailThreadAttachment,
+    Patch,
+    PatchHistory,
+    PatchOnCommitFest,
+    Tag,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def create_patch(cf, alice, bob, num_threads):
+    patch = Patch.objects.create(name="Busy patch")
+    patch.authors.add(alice)
+    patch.reviewers.add(bob)
+    patch.tags.add(Tag.objects.get(name="Performance"))
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=cf,
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    date = datetime(2024, 1, 1)
+    for t in range(num_threads):
+        thread = MailThread.objects.create(
+            messageid=f"thread{t}-{patch.id}@example.com",
+            subject=f"Thread {t}",
+            firstmessage=date,
+            firstauthor="a@example.com",
+            latestmessage=date,
+            latestauthor="a@example.com",
+            latestsubject=f"Thread {t}",
+            latestmsgid=f"thread{t}-{patch.id}@example.com",
+        )
+        patch.mailthread_set.add(thread)
+        for a in range(num_threads):
+            MailThreadAttachment.objects.create(
+                mailthread=thread,
+                messageid=f"att{a}-{thread.id}@example.com",
+                attachmentid=a,
+                filename=f"v{a}-0001-fix.patch",
+                date=date + timedelta(days=a),
+                author="a@example.com",
+            )
+            MailThreadAnnotation.objects.create(
+                mailthread=thread,
+                user=alice,
+                msgid=f"att{a}-{thread.id}@example.com",
+                annotationtext=f"Annotation {a}",
+                mailsubject=f"Thread {t}",
+                maildate=date,
+                mailauthor="a@example.com",
+            )
+    for i in range(num_threads * 3):
+        PatchHistory(patch=patch, by=alice, what=f"Change {i}").save()
+    return patch
+
+
+def count_page_queries(client, patch):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(f"/patch/{patch.id}/")
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_patch_page_query_count_is_fixed(
+    client, alice, bob, commitfests, django_assert_max_num_queries
+):
+    small = create_patch(commitfests["open"], alice, bob, num_threads=1)
+    big = create_patch(commitfests["open"], alice, bob, num_threads=4)
+
+    client.force_login(alice)
+    # Load the reference data first
+    count_page_queries(client, small)
+    assert count_page_queries(client, small) == count_page_queries(client, big)
+
+    # The ETag, session and user, the patch and its 10 relations, the
+    # subscription, the user profile and the commitfests for the menu
+    with django_assert_max_num_queries(20):
+        response = client.get(f"/patch/{big.id}/")
+    content = response.content.decode()
+    assert content.count("Annotation 3") == 4
+    # Once as the latest attachment, once in the list, each in a link
+    assert content.count("v3-0001-fix.patch") == 16
+    assert "Change 11" in content
+    assert "Bob Brown (b)" in content
+
+
+def test_patch_page_shows_first_page_of_history(client, alice, bob, commitfests):
+    patch = create_patch(commitfests["open"], alice, bob, num_threads=10)
+
+    content = client.get(f"/patch/{patch.id}/").content.decode()
+    assert "Change 29" in content
+    assert "Change 10<" in content
+    assert "Change 9<" not in content
+    assert "Show older entries" in content
+    # Of each thread the latest 5 attachments are shown
+    assert "v5-0001-fix.patch" in content
+    assert "v4-0001-fix.patch" not in content
+    assert content.count("Show older attachments") == 10
+
+    url = f"/patch/{patch.id}/history/"
+    seen = []
+    while url:
+        data = client.get(url).json()
+        seen.extend(
+            int(line.split("Change ")[1].split("<")[0])
+            for line in data["html"].splitlines()
+            if "Change " in line
+        )
+        url = data["next"]
+    assert seen == list(range(29, -1, -1))
+
+
+def test_patch_attachments_endpoint(client, alice, bob, commitfests):
+    patch = create_patch(commitfests["open"], alice, bob, num_threads=7)
+    thread = patch.mailthread_set.first()
+
+    data = client.get(f"/patch/{patch.id}/thread/{thread.id}/attachments/").json()
+    assert "v6-0001-fix.patch" in data["html"]
+    assert "v1-0001-fix.patch" not in data["html"]
+
+    data = client.get(data["next"]).json()
+    assert "v1-0001-fix.patch" in data["html"]
+    assert "v0-0001-fix.patch" in data["html"]
+    assert "v2-0001-fix.patch" not in data["html"]
+    assert data["next"] is None
+
+    other = create_patch(commitfests["open"], alice, bob, num_threads=1)
+    response = client.get(f"/patch/{other.id}/thread/{thread.id}/attachments/")
+    assert response.status_code == 404
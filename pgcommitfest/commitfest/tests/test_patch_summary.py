@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest.models import (
+    Patch,
+    PatchOnCommitFest,
+    PatchSummary,
+    Tag,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def create_patch(cf, name="Test patch"):
+    patch = Patch.objects.create(name=name)
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=cf,
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    return patch
+
+
+def test_update_summary(open_cf, alice, bob):
+    patch = create_patch(open_cf)
+    patch.authors.add(alice)
+    patch.reviewers.add(bob)
+    patch.update_summary()
+
+    summary = PatchSummary.objects.get(patch=patch)
+    assert summary.author_names == "Alice Anderson (alice)"
+    assert summary.reviewer_names == "Bob Brown (b)"
+    assert summary.committer_name is None
+    assert summary.num_cfs == 1
+    assert summary.tag_ids is None
+
+
+def test_summary_follows_reviewer_changes(client, open_cf, alice, bob):
+    patch = create_patch(open_cf)
+    patch.authors.add(alice)
+    patch.update_summary()
+
+    client.force_login(bob)
+    response = client.get(f"/patch/{patch.id}/reviewer/become/")
+    assert response.status_code == 302
+    assert PatchSummary.objects.get(patch=patch).reviewer_names == "Bob Brown (b)"
+
+
+def test_summary_follows_move(open_cf, in_progress_cf, alice):
+    patch = create_patch(in_progress_cf)
+    patch.update_summary()
+    assert PatchSummary.objects.get(patch=patch).num_cfs == 1
+
+    patch.move(in_progress_cf, open_cf, alice)
+    assert PatchSummary.objects.get(patch=patch).num_cfs == 2
+
+
+def test_new_patch_has_summary(alice):
+    patch = Patch.objects.create(name="Created without the views")
+    assert PatchSummary.objects.filter(patch=patch).exists()
+
+
+def test_summary_follows_tag_deletion(client, commitfests, alice):
+    tag = Tag.objects.create(name="Short-lived", color="#ff0000")
+    patches = [create_patch(commitfests["open"], f"Tagged patch {i}") for i in range(2)]
+    for patch in patches:
+        patch.tags.add(tag)
+        patch.update_summary()
+    assert PatchSummary.objects.get(patch=patches[0]).tag_ids == [tag.id]
+
+    tag.delete()
+    assert PatchSummary.objects.get(patch=patches[0]).tag_ids is None
+
+    client.force_login(alice)
+    response = client.get("/search/", {"searchterm": "tagged"})
+    assert response.status_code == 200
+    assert len(response.context["patches"]) == 2
@@ -0,0 +1,173 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from pgcommitfest.commitfest import views
+from pgcommitfest.commitfest.models import (
+    CfbotBranch,
+    Patch,
+    PatchOnCommitFest,
+)
+
+pytestmark = pytest.mark.django_db
+
+SORTKEYS = [0, 2, -2, 3, -3, 4, -4, 5, -5, 6, -6, 7, -7, 8, -8]
+
+
+@pytest.fixture
+def patches(open_cf, in_progress_cf, alice, bob):
+    """A set of patches with plenty of duplicate and NULL sort values"""
+    base = datetime(2025, 1, 10, 12, 0)
+    result = []
+    for i in range(9):
+        patch = Patch.objects.create(
+            name=f"Patch {i % 4}",
+            lastmail=base + timedelta(days=i % 3) if i % 4 else None,
+        )
+        if i % 2:
+            patch.authors.add(alice)
+        else:
+            patch.reviewers.add(alice)
+            patch.authors.add(bob)
+        cf = open_cf if i % 3 else in_progress_cf
+        PatchOnCommitFest.objects.create(
+            patch=patch,
+            commitfest=cf,
+            enterdate=base,
+            leavedate=base if i == 4 else None,
+            status=PatchOnCommitFest.STATUS_COMMITTED
+            if i == 4
+            else PatchOnCommitFest.STATUS_REVIEW,
+        )
+        if i % 3 == 1:
+            CfbotBranch.objects.create(
+                patch=patch,
+                branch_id=i,
+                branch_name=f"cf/{patch.id}",
+                apply_url="https://example.com",
+                status="finished",
+                failing_since=base if i % 2 else None,
+                all_additions=i % 2,
+                all_deletions=1,
+            )
+        result.append(patch)
+    return result
+
+
+def get_all_pages(request_user, cf, params, personalized=False):
+    rf = RequestFactory()
+    ids = []
+    pages = 0
+    cursor = None
+    while True:
+        query = dict(params)
+        if cursor:
+            query["cursor"] = cursor
+        request = rf.get("/", query)
+        request.user = request_user
+        patch_list = views.patchlist(request, cf, personalized=personalized)
+        assert not patch_list.redirect
+        ids.extend(p["id"] for p in patch_list.patches)
+        pages += 1
+        cursor = patch_list.next_cursor
+        if not cursor:
+            return ids, pages
+
+
+@pytest.mark.parametrize("sortkey", SORTKEYS)
+def test_pages_match_full_list(monkeypatch, patches, open_cf, sortkey):
+    params = {"sortkey": sortkey} if sortkey else {}
+    full, pages = get_all_pages(AnonymousUser(), open_cf, params)
+    assert pages == 1
+    assert sorted(full) == sorted(
+        p.id for p in patches if p.patchoncommitfest_set.get().commitfest == open_cf
+    )
+
+    monkeypatch.setattr(views, "PATCHLIST_PAGE_SIZE", 2)
+    paged, pages = get_all_pages(AnonymousUser(), open_cf, params)
+    assert paged == full
+    assert pages == 3
+
+
+@pytest.mark.parametrize("sortkey", SORTKEYS)
+def test_personalized_pages_match_full_list(
+    monkeypatch, patches, in_progress_cf, alice, sortkey
+):
+    params = {"sortkey": sortkey} if sortkey else {}
+    full, _ = get_all_pages(alice, in_progress_cf, params, personalized=True)
+    assert len(full) == 8
+
+    monkeypatch.setattr(views, "PATCHLIST_PAGE_SIZE", 3)
+    paged, pages = get_all_pages(alice, in_progress_cf, params, personalized=True)
+    assert paged == full
+    assert pages == 3
+
+
+def test_invalid_cursor_gives_first_page(monkeypatch, patches, open_cf):
+    monkeypatch.setattr(views, "PATCHLIST_PAGE_SIZE", 2)
+    rf = RequestFactory()
+
+    request = rf.get("/")
+    request.user = AnonymousUser()
+    first_page = views.patchlist(request, open_cf)
+
+    for cursor in ["garbage", first_page.next_cursor[:-4], "W10="]:
+        request = rf.get("/", {"cursor": cursor})
+        request.user = AnonymousUser()
+        patch_list = views.patchlist(request, open_cf)
+        assert not patch_list.redirect
+        assert patch_list.patches == first_page.patches
+
+    # A cursor for a different ordering is ignored too
+    request = rf.get("/", {"sortkey": 4, "cursor": first_page.next_cursor})
+    request.user = AnonymousUser()
+    patch_list = views.patchlist(request, open_cf)
+    assert [p["id"] for p in patch_list.patches] == [
+        p.id for p in patches if p.patchoncommitfest_set.get().commitfest == open_cf
+    ][:2]
+
+
+@pytest.mark.parametrize(
+    "sortkey,values",
+    [
+        (0, [True, "not a date", 1]),
+        (0, [True, 5, 1]),
+        (0, [True, "2025-01-10T12:00:00", "1"]),
+        (0, [1, "2025-01-10T12:00:00", 1]),
+        (5, [True, "Patch\x00", "2025-01-10T12:00:00", 1]),
+    ],
+)
+def test_tampered_cursor_gives_first_page(
+    monkeypatch, patches, open_cf, sortkey, values
+):
+    monkeypatch.setattr(views, "PATCHLIST_PAGE_SIZE", 2)
+    rf = RequestFactory()
+
+    params = {"sortkey": sortkey} if sortkey else {}
+    request = rf.get("/", params)
+    request.user = AnonymousUser()
+    first_page = views.patchlist(request, open_cf)
+    assert first_page.patches
+
+    cursor = views._encode_cursor(sortkey, values)
+    request = rf.get("/", {**params, "cursor": cursor})
+    request.user = AnonymousUser()
+    assert views.patchlist(request, open_cf).patches == first_page.patches
+
+
+def test_open_patch_ids_cover_all_pages(monkeypatch, patches, open_cf, alice):
+    monkeypatch.setattr(views, "PATCHLIST_PAGE_SIZE", 2)
+    alice.is_staff = True
+    request = RequestFactory().get("/")
+    request.user = alice
+    patch_list = views.patchlist(request, open_cf)
+    assert len(patch_list.patches) == 2
+    assert patch_list.open_patch_ids == [
+        p.id
+        for p in patches
+        if p.patchoncommitfest_set.get().commitfest == open_cf
+        and p.patchoncommitfest_set.get().is_open
+    ]
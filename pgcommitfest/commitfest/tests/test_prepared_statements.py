@@ -0,0 +1,151 @@
+from django.contrib.auth.models import AnonymousUser
+from django.db import DatabaseError, connection, transaction
+from django.test import RequestFactory
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest import util
+from pgcommitfest.commitfest.models import Patch, PatchOnCommitFest, Tag
+from pgcommitfest.commitfest.views import patchlist
+
+pytestmark = pytest.mark.django_db
+
+
+def prepared_statements():
+    with connection.cursor() as curs:
+        curs.execute("SELECT name FROM pg_prepared_statements")
+        return {r[0] for r in curs.fetchall()}
+
+
+@pytest.fixture(autouse=True)
+def deallocate():
+    # Prepared statements survive the rollback of the test transaction
+    with connection.cursor() as curs:
+        curs.execute("DEALLOCATE ALL")
+    util._prepared_statements.clear()
+
+
+def test_execute_prepared():
+    sql = "SELECT %(a)s::int + %(b)s::int, %(a)s::int, '100%%'"
+    with connection.cursor() as curs:
+        util.execute_prepared(curs, sql, {"a": 1, "b": 2, "unused": 3})
+        assert curs.fetchall() == [(3, 1, "100%")]
+        names = prepared_statements()
+        assert len(names) == 1
+
+        util.execute_prepared(curs, sql, {"a": 5, "b": 6})
+        assert curs.fetchall() == [(11, 5, "100%")]
+        assert prepared_statements() == names
+
+        # On a new connection the statement gets prepared again
+        util._prepared_statements.clear()
+        curs.execute("DEALLOCATE ALL")
+        util.execute_prepared(curs, sql, {"a": 1, "b": 1})
+        assert curs.fetchall() == [(2, 1, "100%")]
+        assert prepared_statements() == names
+
+
+def test_execute_prepared_is_a_single_query(django_assert_num_queries):
+    sql = "SELECT %(a)s::int + 1"
+    # Preparing it in a transaction takes a savepoint
+    with django_assert_num_queries(4), connection.cursor() as curs:
+        util.execute_prepared(curs, sql, {"a": 1})
+    with django_assert_num_queries(1), connection.cursor() as curs:
+        util.execute_prepared(curs, sql, {"a": 2})
+        assert curs.fetchall() == [(3,)]
+
+
+def test_execute_prepared_falls_back_when_statement_is_gone():
+    sql = "SELECT %(a)s::int * 2"
+
+    def in_autocommit():
+        try:
+            with connection.cursor() as curs:
+                util.execute_prepared(curs, sql, {"a": 1})
+                curs.fetchall()
+                # Like a connection pooler handing out a different session
+                curs.execute("DEALLOCATE ALL")
+
+                util.execute_prepared(curs, sql, {"a": 2})
+                results.append(curs.fetchall())
+                util.execute_prepared(curs, sql, {"a": 3})
+                results.append(curs.fetchall())
+                results.append(len(prepared_statements()))
+        finally:
+            connection.close()
+
+    # On a connection of its own, which is in autocommit mode, unlike the one
+    # of the test
+    results = []
+    thread = threading.Thread(target=in_autocommit)
+    thread.start()
+    thread.join()
+    assert results == [[(4,)], [(6,)], 1]
+
+
+def test_execute_prepared_in_transaction_when_statement_is_gone():
+    sql = "SELECT %(a)s::int * 2"
+    with connection.cursor() as curs:
+        util.execute_prepared(curs, sql, {"a": 1})
+        curs.fetchall()
+        curs.execute("DEALLOCATE ALL")
+
+        # The transaction is lost, but the next one prepares it again
+        with pytest.raises(DatabaseError), transaction.atomic():
+            util.execute_prepared(curs, sql, {"a": 2})
+        util.execute_prepared(curs, sql, {"a": 3})
+        assert curs.fetchall() == [(6,)]
+        assert len(prepared_statements()) == 1
+
+
+def test_execute_prepared_can_be_turned_off(settings):
+    settings.PREPARED_STATEMENTS = False
+    with connection.cursor() as curs:
+        util.execute_prepared(curs, "SELECT %(a)s::int", {"a": 1})
+        assert curs.fetchall() == [(1,)]
+    assert prepared_statements() == set()
+
+
+def test_execute_prepared_reuses_statement_prepared_elsewhere():
+    sql = "SELECT %(a)s::int * 3"
+    with connection.cursor() as curs:
+        util.execute_prepared(curs, sql, {"a": 1})
+        curs.fetchall()
+        # Like a connection pooler handing out a session in which another
+        # client already prepared the same query
+        util._prepared_statements.clear()
+
+        util.execute_prepared(curs, sql, {"a": 2})
+        assert curs.fetchall() == [(6,)]
+        # The transaction is still usable
+        curs.execute("SELECT 1")
+
+        util.execute_prepared(curs, sql, {"a": 3})
+        assert curs.fetchall() == [(9,)]
+        assert len(prepared_statements()) == 1
+        assert len(util._prepared_statements[curs.db.connection]) == 1
+
+
+def test_patchlist_tag_filter_reuses_statement(open_cf):
+    tags = [Tag.objects.create(name=f"Prepared {i}", color="#000000") for i in range(2)]
+    patches = []
+    for tag in tags:
+        patch = Patch.objects.create(name=f"Patch with {tag.name}")
+        patch.tags.add(tag)
+        PatchOnCommitFest.objects.create(
+            patch=patch,
+            commitfest=open_cf,
+            enterdate=datetime.now(),
+            status=PatchOnCommitFest.STATUS_REVIEW,
+        )
+        patches.append(patch)
+
+    for tag, patch in zip(tags, patches):
+        request = RequestFactory().get("/", {"tag": tag.id})
+        request.user = AnonymousUser()
+        assert [p["id"] for p in patchlist(request, open_cf).patches] == [patch.id]
+    # Different tags use the same statement
+    assert len(prepared_statements()) == 1
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.test import RequestFactory
+
+import pytest
+
+from pgcommitfest.commitfest import refdata
+from pgcommitfest.commitfest.forms import CommitFestFilterForm
+from pgcommitfest.commitfest.memo import RequestMemoMiddleware
+from pgcommitfest.commitfest.models import Committer, Tag, TargetVersion
+from pgcommitfest.commitfest.refdata import get_reference_data
+
+pytestmark = pytest.mark.django_db
+
+
+def test_reference_data_is_cached(django_assert_num_queries, open_cf):
+    get_reference_data()
+    with django_assert_num_queries(0):
+        data = get_reference_data()
+        CommitFestFilterForm({}, commitfest=open_cf)
+    assert [t.name for t in data.tags] == sorted(t.name for t in Tag.objects.all())
+
+
+def test_reference_data_invalidated_on_save(alice, django_capture_on_commit_callbacks):
+    get_reference_data()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        tag = Tag.objects.create(name="Refdata tag", color="#123456")
+        TargetVersion.objects.create(version="99")
+        Committer.objects.create(user=alice)
+    data = get_reference_data()
+    assert data.tags_by_id[tag.id].color == "#123456"
+    assert "99" in [v.version for v in data.target_versions]
+    assert data.committers_by_user_id[alice.id].user == alice
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Committer.objects.filter(user=alice).update(active=False)
+        Committer.objects.get(user=alice).save()
+        tag.delete()
+    data = get_reference_data()
+    assert tag.id not in data.tags_by_id
+    assert alice.id not in data.committers_by_user_id
+
+
+def test_reference_data_reloaded_after_cache_eviction(django_assert_num_queries, alice):
+    get_reference_data()
+    Committer.objects.create(user=alice)
+    cache.clear()
+    assert alice.id in get_reference_data().committers_by_user_id
+
+
+def test_version_read_once_per_request(
+    monkeypatch, alice, django_capture_on_commit_callbacks
+):
+    reads = []
+    current_version = refdata._current_version
+    monkeypatch.setattr(
+        refdata,
+        "_current_version",
+        lambda: reads.append(1) or current_version(),
+    )
+
+    def view(request):
+        get_reference_data()
+        get_reference_data()
+        with django_capture_on_commit_callbacks(execute=True):
+            Committer.objects.create(user=alice)
+        return get_reference_data()
+
+    data = RequestMemoMiddleware(view)(RequestFactory().get("/"))
+    # Once at the start, and once more after the change
+    assert len(reads) == 2
+    assert alice.id in data.committers_by_user_id
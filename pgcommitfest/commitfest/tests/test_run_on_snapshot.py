@@ -0,0 +1,61 @@
+from django.db import connection
+
+import threading
+
+import pytest
+
+from pgcommitfest.commitfest.models import Topic
+from pgcommitfest.commitfest.util import run_on_snapshot
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def parallel_query_workers(settings):
+    settings.PARALLEL_QUERY_WORKERS = 2
+
+
+def count_topics():
+    return threading.current_thread(), Topic.objects.count()
+
+
+def in_other_connection(func):
+    """Run func in another thread, so that it commits on its own connection"""
+
+    def run():
+        try:
+            func()
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+
+
+def test_queries_share_the_snapshot():
+    # The workers can only see committed data, so this test must not write
+    # anything in its own transaction.
+    connection.cursor().execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+    before = Topic.objects.count()
+
+    # Committed after our snapshot was taken, so none of the queries must
+    # see it.
+    in_other_connection(lambda: Topic.objects.create(topic="Concurrent"))
+    try:
+        results = run_on_snapshot(count_topics, count_topics, count_topics)
+    finally:
+        in_other_connection(lambda: Topic.objects.filter(topic="Concurrent").delete())
+
+    assert [count for _, count in results] == [before] * 3
+    threads = [t for t, _ in results]
+    assert threads[0] == threading.current_thread()
+    assert threading.current_thread() not in threads[1:]
+
+
+def test_runs_sequentially_after_writes():
+    Topic.objects.create(topic="Uncommitted")
+
+    results = run_on_snapshot(count_topics, count_topics)
+
+    assert results == [(threading.current_thread(), Topic.objects.count())] * 2
@@ -0,0 +1,307 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import QueryDict
+from django.test import RequestFactory
+
+from datetime import datetime
+from unittest.mock import patch as mock_patch
+
+import pytest
+
+from pgcommitfest.commitfest import views
+from pgcommitfest.commitfest.ajax import doAttachThread, refresh_single_thread
+from pgcommitfest.commitfest.models import (
+    MailThread,
+    MailThreadAnnotation,
+    Patch,
+    PatchOnCommitFest,
+    Tag,
+)
+from pgcommitfest.commitfest.views import patchlist
+
+pytestmark = pytest.mark.django_db
+
+
+def create_patch(cf, name):
+    patch = Patch.objects.create(name=name)
+    PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=cf,
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+    return patch
+
+
+def test_global_search_orders_by_relevance(client, alice, commitfests):
+    open_cf = commitfests["open"]
+    long_name = create_patch(
+        open_cf, "Teach autovacuum to skip pages that were recently frozen"
+    )
+    other = create_patch(open_cf, "Parallel index creation")
+    exact = create_patch(open_cf, "VACUUM")
+    close = create_patch(open_cf, "Fix vacuum")
+
+    client.force_login(alice)
+    response = client.get("/search/", {"searchterm": "vacuum"})
+    assert response.status_code == 200
+    patches = list(response.context["patches"])
+    assert patches == [exact, close, long_name]
+    assert other not in patches
+
+
+def search(client, searchterm, **params):
+    """Return the patches found by the global search, following the redirect
+    for a single result"""
+    response = client.get("/search/", {"searchterm": searchterm, **params})
+    if response.status_code == 302:
+        return [Patch.objects.get(pk=response.url.split("/")[2])]
+    assert response.status_code == 200
+    return list(response.context["patches"])
+
+
+def create_thread(messageid, subject):
+    date = datetime(2024, 1, 1)
+    return MailThread.objects.create(
+        messageid=messageid,
+        subject=subject,
+        firstmessage=date,
+        firstauthor="a@example.com",
+        latestmessage=date,
+        latestauthor="a@example.com",
+        latestsubject=subject,
+        latestmsgid=messageid,
+    )
+
+
+def test_global_search_matches_related_text(client, alice, bob, commitfests):
+    open_cf = commitfests["open"]
+    patch = create_patch(open_cf, "Improve planner estimates")
+    create_patch(open_cf, "Unrelated patch")
+    patch.authors.add(bob)
+    patch.tags.add(Tag.objects.get(name="Performance"))
+    thread = create_thread("thread@example.com", "Skewed join selectivity")
+    patch.mailthread_set.add(thread)
+    patch.update_summary()
+    MailThreadAnnotation.objects.create(
+        mailthread=thread,
+        user=alice,
+        msgid="thread@example.com",
+        annotationtext="Benchmark with histograms attached",
+        mailsubject="Skewed join selectivity",
+        maildate=datetime(2024, 1, 1),
+        mailauthor="a@example.com",
+    )
+    thread.update_patch_summaries()
+
+    client.force_login(alice)
+    assert search(client, "selectivity") == [patch]
+    assert search(client, "Brown") == [patch]
+    assert search(client, "performance") == [patch]
+    assert search(client, "histogram") == [patch]
+    # Substrings of the name are still found
+    assert search(client, "estim") == [patch]
+
+
+def test_search_document_follows_thread_refresh(client, alice, commitfests):
+    patch = create_patch(commitfests["open"], "Some patch")
+    create_patch(commitfests["open"], "Other patch")
+    thread = create_thread("old@example.com", "Original subject")
+    patch.mailthread_set.add(thread)
+    patch.update_summary()
+
+    client.force_login(alice)
+    assert search(client, "checkpointer") == []
+
+    api_response = [
+        {
+            "msgid": "old@example.com",
+            "date": datetime(2024, 1, 1),
+            "from": "a",
+            "subj": "Original subject",
+            "atts": [],
+        },
+        {
+            "msgid": "new@example.com",
+            "date": datetime(2024, 6, 15),
+            "from": "b",
+            "subj": "Re: Original subject, now about the checkpointer",
+            "atts": [],
+        },
+    ]
+    with mock_patch(
+        "pgcommitfest.commitfest.ajax._archivesAPI", return_value=api_response
+    ):
+        refresh_single_thread(thread)
+
+    assert search(client, "checkpointer") == [patch]
+
+
+def test_global_search_is_paginated(client, alice, commitfests, monkeypatch):
+    monkeypatch.setattr(views, "SEARCH_PAGE_SIZE", 2)
+    open_cf = commitfests["open"]
+    patches = [create_patch(open_cf, f"Vacuum patch {i}") for i in range(3)]
+
+    client.force_login(alice)
+    response = client.get("/search/", {"searchterm": "vacuum", "sortkey": "4"})
+    assert list(response.context["patches"]) == patches[:2]
+    assert response.context["previous_page_query"] is None
+    assert "Found 3 patches" in response.content.decode()
+
+    response = client.get("/search/?" + response.context["next_page_query"])
+    assert list(response.context["patches"]) == patches[2:]
+    assert response.context["next_page_query"] is None
+
+
+def test_global_search_query_count(
+    client, alice, bob, commitfests, django_assert_num_queries
+):
+    open_cf = commitfests["open"]
+    performance = Tag.objects.get(name="Performance")
+    for i in range(5):
+        patch = create_patch(open_cf, f"Vacuum patch {i}")
+        patch.authors.add(alice)
+        patch.reviewers.add(bob)
+        patch.tags.add(performance)
+        patch.update_summary()
+
+    client.force_login(alice)
+    search(client, "vacuum")
+    # Session, user, count, the page of patches, its authors, reviewers and
+    # commitfests, the user profile and the 5 queries of the commitfest menu.
+    # This must not grow with the number of results.
+    with django_assert_num_queries(13):
+        patches = search(client, "vacuum")
+    assert len(patches) == 5
+
+    # Filtering is done in the same query, only the form needs to look up
+    # the selected author.
+    with django_assert_num_queries(14):
+        patches = search(
+            client, "vacuum", tag=str(performance.id), author=str(alice.id)
+        )
+    assert len(patches) == 5
+
+
+def test_global_search_results_are_capped(client, alice, commitfests, monkeypatch):
+    monkeypatch.setattr(views, "SEARCH_MAX_RESULTS", 2)
+    for i in range(3):
+        create_patch(commitfests["open"], f"Vacuum patch {i}")
+
+    client.force_login(alice)
+    response = client.get("/search/", {"searchterm": "vacuum"})
+    assert len(response.context["patches"]) == 2
+    assert response.context["truncated"]
+
+
+def test_global_search_pages_have_a_stable_order(
+    client, alice, commitfests, monkeypatch
+):
+    monkeypatch.setattr(views, "SEARCH_PAGE_SIZE", 2)
+    # All with the same name, so only the id tells them apart
+    patches = [create_patch(commitfests["open"], "Vacuum patch") for i in range(5)]
+
+    client.force_login(alice)
+    found = []
+    query = {"searchterm": "vacuum", "sortkey": "5"}
+    while query:
+        response = client.get("/search/", query)
+        found.extend(response.context["patches"])
+        query = response.context["next_page_query"]
+        query = query and QueryDict(query)
+    assert found == patches
+
+
+def test_global_search_cap_keeps_the_best_matches(
+    client, alice, commitfests, monkeypatch
+):
+    monkeypatch.setattr(views, "SEARCH_MAX_RESULTS", 2)
+    open_cf = commitfests["open"]
+    exact = create_patch(open_cf, "VACUUM")
+    close = create_patch(open_cf, "Fix vacuum")
+    create_patch(open_cf, "Teach autovacuum to skip pages that were recently frozen")
+
+    client.force_login(alice)
+    # Sorted by name, but still only the best matches
+    assert search(client, "vacuum", sortkey="5") == [close, exact]
+    assert search(client, "vacuum", sortkey="-4") == [close, exact]
+
+
+def test_global_search_invalid_sortkey(client, alice, commitfests):
+    for i in range(2):
+        create_patch(commitfests["open"], f"Vacuum patch {i}")
+
+    client.force_login(alice)
+    response = client.get("/search/", {"searchterm": "vacuum", "sortkey": "x"})
+    assert response.status_code == 200
+    assert response.context["sortkey"] == 1
+
+
+def thread_messages(messageids):
+    return [
+        {
+            "msgid": messageid,
+            "date": datetime(2024, 1, i + 1),
+            "from": "a",
+            "subj": "Original subject",
+            "atts": [],
+        }
+        for i, messageid in enumerate(messageids)
+    ]
+
+
+def test_search_by_any_message_id_of_the_thread(
+    client, alice, commitfests, django_assert_num_queries
+):
+    patch = create_patch(commitfests["open"], "Some patch")
+    create_patch(commitfests["open"], "Other patch")
+    thread = create_thread("first@example.com", "Original subject")
+    thread.latestmsgid = "second@example.com"
+    thread.save()
+    patch.mailthread_set.add(thread)
+
+    # A new message in the thread, so its messages get recorded
+    api_response = thread_messages(
+        ["first@example.com", "second@example.com", "third@example.com"]
+    )
+    with mock_patch(
+        "pgcommitfest.commitfest.ajax._archivesAPI", return_value=api_response
+    ):
+        refresh_single_thread(thread)
+        # Nothing new anymore, so nothing to write
+        with django_assert_num_queries(0):
+            refresh_single_thread(thread)
+
+    client.force_login(alice)
+    with mock_patch(
+        "pgcommitfest.commitfest.ajax._archivesAPI",
+        side_effect=AssertionError("archives must not be called"),
+    ):
+        assert search(client, "<second@example.com>") == [patch]
+        assert search(client, "unknown@example.com") == []
+
+
+def test_attaching_a_known_thread_records_its_messages(alice, commitfests):
+    cf = commitfests["open"]
+    first = create_patch(cf, "First patch")
+    second = create_patch(cf, "Second patch")
+    with mock_patch(
+        "pgcommitfest.commitfest.ajax._archivesAPI",
+        return_value=thread_messages(["first@example.com"]),
+    ):
+        doAttachThread(cf, first, "first@example.com", alice)
+    with mock_patch(
+        "pgcommitfest.commitfest.ajax._archivesAPI",
+        return_value=thread_messages(["first@example.com", "reply@example.com"]),
+    ):
+        doAttachThread(cf, second, "reply@example.com", alice)
+
+    assert list(views.patches_by_messageid("reply@example.com")) == [first, second]
+
+
+def test_patchlist_text_filter_is_case_insensitive(open_cf):
+    patch = create_patch(open_cf, "Add Support for JSON_TABLE")
+    create_patch(open_cf, "Something else")
+
+    request = RequestFactory().get("/", {"text": "json_table"})
+    request.user = AnonymousUser()
+    assert [p["id"] for p in patchlist(request, open_cf).patches] == [patch.id]
@@ -0,0 +1,126 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+
+from datetime import datetime
+
+import pytest
+
+from pgcommitfest.commitfest.models import (
+    CommitFestStatusCount,
+    Patch,
+    PatchOnCommitFest,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def counts(cf):
+    return dict(
+        CommitFestStatusCount.objects.filter(commitfest=cf, count__gt=0).values_list(
+            "status", "count"
+        )
+    )
+
+
+def create_patch(cf, name):
+    patch = Patch.objects.create(name=name)
+    return PatchOnCommitFest.objects.create(
+        patch=patch,
+        commitfest=cf,
+        enterdate=datetime.now(),
+        status=PatchOnCommitFest.STATUS_REVIEW,
+    )
+
+
+def test_counts_follow_status_changes(open_cf, in_progress_cf, alice):
+    poc1 = create_patch(in_progress_cf, "Patch 1")
+    create_patch(in_progress_cf, "Patch 2")
+    assert counts(in_progress_cf) == {PatchOnCommitFest.STATUS_REVIEW: 2}
+
+    poc1.set_status(PatchOnCommitFest.STATUS_AUTHOR)
+    assert counts(in_progress_cf) == {
+        PatchOnCommitFest.STATUS_REVIEW: 1,
+        PatchOnCommitFest.STATUS_AUTHOR: 1,
+    }
+
+    # Saving without changing the status doesn't change the counts
+    poc1.save()
+    assert counts(in_progress_cf)[PatchOnCommitFest.STATUS_AUTHOR] == 1
+
+    poc1.patch.move(in_progress_cf, open_cf, alice)
+    assert counts(in_progress_cf) == {
+        PatchOnCommitFest.STATUS_REVIEW: 1,
+        PatchOnCommitFest.STATUS_MOVED: 1,
+    }
+    assert counts(open_cf) == {PatchOnCommitFest.STATUS_AUTHOR: 1}
+
+    poc1.patch.delete()
+    assert counts(in_progress_cf) == {PatchOnCommitFest.STATUS_REVIEW: 1}
+    assert counts(open_cf) == {}
+
+
+def test_check_status_counts_command(open_cf):
+    create_patch(open_cf, "Patch 1")
+    call_command("check_status_counts")
+
+    CommitFestStatusCount.objects.filter(commitfest=open_cf).update(count=5)
+    with pytest.raises(CommandError):
+        call_command("check_status_counts")
+
+    call_command("check_status_counts", "--rebuild")
+    assert counts(open_cf) == {PatchOnCommitFest.STATUS_REVIEW: 1}
+    call_command("check_status_counts")
+
+
+def page_counts(client, cf):
+    response = client.get(f"/{cf.id}/")
+    assert response.status_code == 200
+    return {title: num for _, title, num in response.context["statussummary"]}
+
+
+@pytest.fixture(scope="module")
+def restore_migration_data(django_db_setup, django_db_blocker):
+    """Load the data that the migrations created, like the patch statuses,
+    again after a transactional test flushed it
+
+    Otherwise the tests after it, and with --reuse-db the next runs too, would
+    find the tables empty.
+    """
+    yield
+    with django_db_blocker.unblock():
+        connection.creation.deserialize_db_from_string(
+            connection._test_serialized_contents
+        )
+
+
+# The commitfest page sets the isolation level of its transaction, which has
+# to be the first statement in it, so this can't run inside the transaction
+# of a regular test.
+@pytest.mark.django_db(transaction=True, serialized_rollback=True)
+def test_commitfest_page_shows_counts(
+    restore_migration_data, client, commitfests, alice
+):
+    open_cf = commitfests["open"]
+    in_progress_cf = commitfests["in_progress"]
+    poc1 = create_patch(in_progress_cf, "Patch 1")
+    create_patch(in_progress_cf, "Patch 2")
+    assert page_counts(client, in_progress_cf) == {"Needs review": 2, "Total": 2}
+
+    poc1.set_status(PatchOnCommitFest.STATUS_AUTHOR)
+    assert page_counts(client, in_progress_cf) == {
+        "Needs review": 1,
+        "Waiting on Author": 1,
+        "Total": 2,
+    }
+
+    poc1.patch.move(in_progress_cf, open_cf, alice)
+    assert page_counts(client, in_progress_cf) == {
+        "Needs review": 1,
+        "Moved to next CF": 1,
+        "Total": 2,
+    }
+    assert page_counts(client, open_cf) == {"Waiting on Author": 1, "Total": 1}
+
+    response = client.get(f"/{open_cf.id}/")
+    assert '<a href="?status=2">Waiting on Author</a>: 1.' in response.content.decode()
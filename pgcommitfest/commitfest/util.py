@@ -1,14 +1,48 @@
 import django.db.models.fields.related
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
 from django.forms.models import model_to_dict
 
+import concurrent.futures
+import functools
+import hashlib
+import re
+import threading
+import weakref
+
+import psycopg2.errors
+
+# Maximum number of prepared statements to keep per database connection
+MAX_PREPARED_STATEMENTS = 200
+
+_PARAM_RE = re.compile(r"%\((\w+)\)s|%%")
+
+# The names of the statements that have been prepared, per database
+# connection. Keyed on the underlying psycopg2 connection, so that when
+# Django opens a new connection it automatically starts out empty.
+_prepared_statements = weakref.WeakKeyDictionary()
+
+# Thread pool for run_on_snapshot(), created on first use
+_query_executor = None
+_query_executor_lock = threading.Lock()
+
 
 class DiffableModel(object):
     """
     Make it possible to diff a model.
+
+    Many to many fields are only included in the diff after calling
+    track_manytomany() before changing them. Looking them up takes a query
+    per field, which we don't want to do for every instance that's loaded.
     """
 
     def __init__(self, *args, **kwargs):
         super(DiffableModel, self).__init__(*args, **kwargs)
+        self.__track_manytomany = False
+        self.__initial = self._dict
+
+    def track_manytomany(self):
+        self.__track_manytomany = True
         self.__initial = self._dict
 
     @property
@@ -42,5 +76,159 @@ class DiffableModel(object):
     @property
     def _dict(self):
         fields = [field.name for field in self._meta.fields]
-        fields.extend([field.name for field in self._meta.many_to_many])
+        if self.__track_manytomany:
+            fields.extend([field.name for field in self._meta.many_to_many])
         return model_to_dict(self, fields=fields)
+
+
+@functools.lru_cache(maxsize=1000)
+def _compile_statement(sql):
+    """Convert a query with named parameters into one for PREPARE
+
+    Returns the statement name, the query with positional parameters, and the
+    names of the parameters in order.
+    """
+    names = []
+
+    def replace(m):
+        if m.group(1) is None:
+            return "%"
+        if m.group(1) not in names:
+            names.append(m.group(1))
+        return "${0}".format(names.index(m.group(1)) + 1)
+
+    body = _PARAM_RE.sub(replace, sql)
+    name = "stmt_" + hashlib.sha1(sql.encode()).hexdigest()[:24]
+    return name, body, names
+
+
+def _prepare(curs, name, body):
+    """Prepare a statement, or use the one of the same name the session has"""
+    try:
+        if curs.db.in_atomic_block:
+            # In a savepoint, so that the transaction survives if it already
+            # exists.
+            with transaction.atomic(using=curs.db.alias):
+                curs.execute(f"PREPARE {name} AS {body}")
+        else:
+            curs.execute(f"PREPARE {name} AS {body}")
+    except DatabaseError as e:
+        if not isinstance(e.__cause__, psycopg2.errors.DuplicatePreparedStatement):
+            raise
+        # A connection pooler handed us a session in which some other client
+        # already prepared it. The name is the hash of the query text, so it
+        # is the same query: use it.
+
+
+def execute_prepared(curs, sql, params):
+    """Execute a query as a named prepared statement
+
+    The query uses named parameters, just like for curs.execute(). Every
+    distinct query text is prepared once per database connection, which saves
+    PostgreSQL from parsing and, once it settles on a generic plan, planning
+    it again on every execution. After that, executing it is a single round
+    trip.
+
+    If the session lost the statement, e.g. because a connection pooler
+    handed us a different one, the query runs without preparing it. Inside a
+    transaction that isn't possible, because the failed EXECUTE aborted it, so
+    then the error is raised, and only the next transaction prepares again.
+    With a transaction-mode pooler, set PREPARED_STATEMENTS to False instead.
+    """
+    if not settings.PREPARED_STATEMENTS:
+        curs.execute(sql, params)
+        return
+
+    name, body, names = _compile_statement(sql)
+    prepared = _prepared_statements.setdefault(curs.db.connection, set())
+    args = [params[n] for n in names]
+    if args:
+        execute_sql = "EXECUTE {0}({1})".format(name, ", ".join(["%s"] * len(args)))
+    else:
+        execute_sql = f"EXECUTE {name}"
+
+    if name not in prepared:
+        if len(prepared) >= MAX_PREPARED_STATEMENTS:
+            curs.execute("DEALLOCATE ALL")
+            prepared.clear()
+        _prepare(curs, name, body)
+        prepared.add(name)
+
+    try:
+        curs.execute(execute_sql, args)
+    except DatabaseError as e:
+        if not isinstance(e.__cause__, psycopg2.errors.InvalidSqlStatementName):
+            raise
+        # The session lost all of our prepared statements, so forget about
+        # them.
+        prepared.clear()
+        if curs.db.in_atomic_block:
+            raise
+        curs.execute(sql, params)
+
+
+def _run_in_snapshot(snapshot, func):
+    # Worker threads keep their database connection between tasks for as long
+    # as CONN_MAX_AGE allows, just like the request handling threads do, so
+    # that with persistent connections they work as a small connection pool.
+    close_old_connections()
+    try:
+        with transaction.atomic():
+            with connection.cursor() as curs:
+                curs.execute(
+                    "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+                )
+                curs.execute("SET TRANSACTION SNAPSHOT %s", [snapshot])
+            return func()
+    finally:
+        close_old_connections()
+
+
+def _get_query_executor():
+    global _query_executor
+
+    with _query_executor_lock:
+        if _query_executor is None:
+            _query_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=settings.PARALLEL_QUERY_WORKERS,
+                thread_name_prefix="query",
+            )
+        return _query_executor
+
+
+def run_on_snapshot(*funcs):
+    """Run independent read-only queries concurrently, on the current snapshot
+
+    The first function runs in the current transaction, and the others each
+    on their own connection in a worker thread. Those import the snapshot of
+    the current transaction, so all of them see exactly the same data, just
+    like when they were run one after another in a REPEATABLE READ
+    transaction. Returns the results of the functions in order.
+
+    Falls back to running them one after another when parallel queries are
+    disabled, when not in a transaction, or when the current transaction has
+    written anything, because other connections can't see those changes.
+    """
+    if settings.PARALLEL_QUERY_WORKERS < 1 or len(funcs) < 2:
+        return [func() for func in funcs]
+
+    if not connection.in_atomic_block:
+        return [func() for func in funcs]
+
+    with connection.cursor() as curs:
+        curs.execute(
+            "SELECT pg_current_xact_id_if_assigned() IS NULL, pg_export_snapshot()"
+        )
+        read_only, snapshot = curs.fetchone()
+    if not read_only:
+        return [func() for func in funcs]
+
+    executor = _get_query_executor()
+    futures = [executor.submit(_run_in_snapshot, snapshot, func) for func in funcs[1:]]
+    try:
+        results = [funcs[0]()]
+    finally:
+        # The snapshot can only be imported while this transaction is still
+        # running, so always wait for the workers to be done with it.
+        concurrent.futures.wait(futures)
+    return results + [f.result() for f in futures]
@@ -2,23 +2,34 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
 from django.db import connection, transaction
-from django.db.models import Count, Q
+from django.db.models import F, Max, Prefetch, Q
 from django.http import (
     Http404,
     HttpResponse,
     HttpResponseForbidden,
     HttpResponseRedirect,
+    JsonResponse,
 )
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import aget_object_or_404, get_object_or_404, render
+from django.template.loader import render_to_string
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 
+import base64
 import collections
+import hashlib
 import hmac
 import json
-import urllib
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from email.mime.text import MIMEText
 from email.utils import formatdate, make_msgid
 
@@ -26,8 +37,20 @@ from pgcommitfest.mailqueue.util import send_mail, send_simple_mail
 from pgcommitfest.userprofile.models import UserProfile
 from pgcommitfest.userprofile.util import UserWrapper
 
-from .ajax import _archivesAPI, doAttachThread, refresh_single_thread
-from .feeds import ActivityFeed
+from .activity import (
+    ACTIVITY_FILTERS,
+    activity_feed_response,
+    get_activity_filter,
+    load_activity,
+)
+from .ajax import doAttachThread, refresh_single_thread
+from .cache import (
+    cache_anonymous_page,
+    cached_dashboard_data,
+    dashboard_version,
+    invalidate_pages_of_patches,
+    invalidate_patch_pages,
+)
 from .forms import (
     BulkEmailForm,
     CommentForm,
@@ -35,33 +58,29 @@ from .forms import (
     NewPatchForm,
     PatchForm,
 )
+from .live import activity_stream_response
 from .models import (
-    CfbotBranch,
     CfbotTask,
     CommitFest,
     Committer,
     MailThread,
+    MailThreadAnnotation,
+    MailThreadAttachment,
+    MailThreadMessage,
     Patch,
     PatchHistory,
+    PatchInvolvement,
     PatchOnCommitFest,
-    Tag,
+    PatchSummary,
     UserInputError,
 )
+from .refdata import get_reference_data
+from .util import execute_prepared, run_on_snapshot
 
 
 def get_tags_data():
     """Generate JSON data for enhanced selectize dropdown with tag colors and descriptions."""
-    return json.dumps(
-        [
-            {
-                "id": tag.id,
-                "name": tag.name,
-                "color": tag.color,
-                "description": tag.description,
-            }
-            for tag in Tag.objects.all().order_by("name")
-        ]
-    )
+    return get_reference_data().tags_json
 
 
 @transaction.atomic
@@ -88,62 +107,178 @@ def home(request):
             days=30
         )
 
-        curs = connection.cursor()
-        curs.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
-
         # Use existing cfs data instead of querying again
         cf = cfs.get("in_progress") or cfs.get("open")
 
         form = CommitFestFilterForm(request.GET, commitfest=cf)
-        patch_list = patchlist(request, cf, personalized=True)
+        context.update(
+            {
+                "show_dashboard": True,
+                "form": form,
+                "tags_data": get_tags_data(),
+                "all_tags": get_reference_data().tags_by_id,
+                "userprofile": getattr(request.user, "userprofile", UserProfile()),
+                "is_experienced_user": is_experienced_user,
+            }
+        )
+
+        query = patchlist_query(request, cf, personalized=True)
+        redirect = _patchlist_redirect(request, query)
+        if redirect:
+            return redirect
+
+        if query.sortkey == 0 and not request.GET.get("cursor"):
+            # The default grouped view. The status summary and every group
+            # are loaded separately by commitfest.js, all at the same time, so
+            # the page shows up without waiting for the slowest of them. They
+            # can't share a snapshot like the queries below do, so instead
+            # they all get the version of the dashboard, see
+            # _dashboard_version_conflict().
+            context.update(
+                {
+                    "has_filter": query.has_filter,
+                    "grouping": True,
+                    "sortkey": 0,
+                    "dashboard_sections": DASHBOARD_SECTIONS.items(),
+                    "dashboard_query": request.GET.urlencode(),
+                    "dashboard_version": dashboard_version(request),
+                }
+            )
+            return render(request, "home.html", context)
+
+        # These don't depend on each other, so run them concurrently. They
+        # still see the same snapshot as the rest of this view.
+        patch_list, statussummary = run_on_snapshot(
+            lambda: cached_dashboard_data(
+                request,
+                "patchlist",
+                lambda: patchlist(request, cf, personalized=True),
+            ),
+            lambda: cached_dashboard_data(
+                request,
+                "statussummary",
+                lambda: _dashboard_status_summary(request.user),
+            ),
+        )
 
         if patch_list.redirect:
             return patch_list.redirect
 
-        # Get stats related to user for current commitfest (same as me() view)
+        context.update(
+            {
+                "patches": patch_list.patches,
+                "statussummary": statussummary,
+                "has_filter": patch_list.has_filter,
+                "grouping": patch_list.sortkey == 0,
+                "sortkey": patch_list.sortkey,
+                "next_page_query": (
+                    patchlist_page_query(request, patch_list.next_cursor)
+                    if patch_list.next_cursor
+                    else None
+                ),
+                "first_page_query": patchlist_page_query(request, None),
+            }
+        )
+
+    return render(request, "home.html", context)
+
+
+def _dashboard_status_summary(user):
+    """Count the open patches the user is involved in, per status"""
+    with connection.cursor() as curs:
         curs.execute(
             """SELECT
-                ps.status, ps.statusstring, count(*)
+                poc.status, count(*)
             FROM commitfest_patchoncommitfest poc
-            INNER JOIN commitfest_patch p ON p.id = poc.patch_id
-            INNER JOIN commitfest_patchstatus ps ON ps.status=poc.status
             WHERE
-                ps.status = ANY(%(openstatuses)s)
-            AND (
-                EXISTS (
-                    SELECT 1 FROM commitfest_patch_reviewers cpr WHERE cpr.patch_id=p.id AND cpr.user_id=%(user_id)s
-                )
-                OR EXISTS (
-                    SELECT 1 FROM commitfest_patch_authors cpa WHERE cpa.patch_id=p.id AND cpa.user_id=%(user_id)s
-                )
-                OR p.committer_id=%(user_id)s
+                poc.status = ANY(%(openstatuses)s)
+            AND poc.patch_id IN (
+                SELECT patch_id FROM commitfest_patchinvolvement WHERE user_id=%(user_id)s
             )
-            GROUP BY ps.status ORDER BY ps.sortkey""",
+            GROUP BY poc.status""",
             {
-                "user_id": request.user.id,
+                "user_id": user.id,
                 "openstatuses": PatchOnCommitFest.OPEN_STATUSES,
             },
         )
-        statussummary = curs.fetchall()
+        return _status_summary(curs.fetchall())
+
+
+def _dashboard_version_conflict(request):
+    """Check that the dashboard didn't change since the page was rendered
+
+    The parts of the dashboard are fetched with separate requests, so each
+    runs its queries on its own snapshot. If a patch changes in between, it
+    could show up in two groups, or in none. So the page passes the version
+    of the dashboard it was rendered with, and when that changed, this
+    returns a response with the new version, and commitfest.js loads all
+    parts again. This is checked after the part was computed, so that it
+    covers the changes that its queries saw.
+    """
+    expected = request.headers.get("X-Dashboard-Version")
+    version = dashboard_version(request)
+    if expected is None or expected == version:
+        return None
+    return JsonResponse({"version": version}, status=409)
 
-        context.update(
+
+def dashboard_section(request, section):
+    """Return the rows of one group of the dashboard, with the same filters
+    as the dashboard itself"""
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+    if section not in DASHBOARD_SECTIONS:
+        raise Http404("Unknown section")
+
+    redirect = _patchlist_redirect(
+        request, patchlist_query(request, None, personalized=True, section=section)
+    )
+    if redirect:
+        return redirect
+
+    def render_section():
+        patch_list = patchlist(request, None, personalized=True, section=section)
+        # Rendered without the request, so that the context processors don't
+        # run their queries for the full page.
+        return render_to_string(
+            "dashboard_patches.inc",
             {
-                "show_dashboard": True,
-                "form": form,
+                "user": request.user,
                 "patches": patch_list.patches,
-                "statussummary": statussummary,
-                "tags_data": get_tags_data(),
-                "all_tags": {t.id: t for t in Tag.objects.all()},
-                "has_filter": patch_list.has_filter,
-                "grouping": patch_list.sortkey == 0,
-                "sortkey": patch_list.sortkey,
-                "openpatchids": [p["id"] for p in patch_list.patches if p["is_open"]],
+                "grouping": True,
+                "all_tags": get_reference_data().tags_by_id,
                 "userprofile": getattr(request.user, "userprofile", UserProfile()),
-                "is_experienced_user": is_experienced_user,
-            }
+                # The rest of this group continues on the next page of the
+                # regular dashboard.
+                "more_query": (
+                    patchlist_page_query(request, patch_list.next_cursor)
+                    if patch_list.next_cursor
+                    else None
+                ),
+            },
         )
 
-    return render(request, "home.html", context)
+    # Rendering the rows takes longer than the query, so the rendered rows are
+    # what gets cached.
+    html = cached_dashboard_data(request, section, render_section)
+    return _dashboard_version_conflict(request) or JsonResponse({"html": html})
+
+
+def dashboard_statussummary(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Login required"}, status=401)
+
+    html = render_to_string(
+        "dashboard_statussummary.inc",
+        {
+            "statussummary": cached_dashboard_data(
+                request,
+                "statussummary",
+                lambda: _dashboard_status_summary(request.user),
+            )
+        },
+    )
+    return _dashboard_version_conflict(request) or JsonResponse({"html": html})
 
 
 @login_required
@@ -195,59 +330,158 @@ def archive(request):
     )
 
 
-def activity(request, cfid=None, rss=None):
-    # Number of notes to fetch
-    if rss:
-        num = 50
-    else:
-        num = 100
+# Conditional GET support. The validators are computed using a single cheap
+# query on data that changes whenever the page would change, so that we can
+# answer with a 304 before running any of the expensive queries.
 
-    if cfid:
-        cf = get_object_or_404(CommitFest, pk=cfid)
+# The commitfests that are not closed are shown in the header of every page
+_OPEN_COMMITFESTS_SQL = "(SELECT string_agg(id || ':' || status, ',' ORDER BY id) FROM commitfest_commitfest WHERE status != {0})".format(
+    CommitFest.STATUS_CLOSED
+)
 
-        # Yes, we do string concatenation of the were clause. Because
-        # we're evil.  And also because the number has been verified
-        # when looking up the cf itself, so nothing can be injected
-        # there.
-        where = "WHERE EXISTS (SELECT 1 FROM commitfest_patchoncommitfest poc2 WHERE poc2.patch_id=p.id AND poc2.commitfest_id={0})".format(
-            cf.id
+
+def _make_etag(request, values):
+    # Messages flashed before a redirect are shown on the page we get
+    # redirected to, so that page can't be answered with a 304.
+    if len(messages.get_messages(request)):
+        return None
+    # Pages also depend on the user looking at them and the query parameters,
+    # and on the current time because of relative timestamps. We allow those
+    # to be up to an hour stale.
+    data = repr(
+        (
+            request.user.id,
+            sorted(request.GET.lists()),
+            datetime.now().strftime("%Y%m%d%H"),
+            values,
         )
-    else:
-        cf = None
-        where = ""
+    )
+    return '"{0}"'.format(hashlib.sha256(data.encode()).hexdigest())
+
 
-    sql = "SELECT ph.date, auth_user.username AS by, ph.what, p.id AS patchid, p.name, (SELECT max(commitfest_id) FROM commitfest_patchoncommitfest poc WHERE poc.patch_id=p.id) AS cfid FROM commitfest_patchhistory ph INNER JOIN commitfest_patch p ON ph.patch_id=p.id INNER JOIN auth_user on auth_user.id=ph.by_id {0} ORDER BY ph.date DESC LIMIT {1}".format(
-        where, num
+def _commitfest_etag(request, cfid):
+    curs = connection.cursor()
+    curs.execute(
+        f"""SELECT cf.status, {_OPEN_COMMITFESTS_SQL},
+    count(poc.id), max(poc.leavedate), max(p.modified), max(p.lastmail), max(b.modified),
+    (SELECT max(t.modified) FROM commitfest_cfbottask t INNER JOIN commitfest_patchoncommitfest poc2 ON poc2.patch_id=t.patch_id WHERE poc2.commitfest_id=cf.id)
+FROM commitfest_commitfest cf
+LEFT JOIN commitfest_patchoncommitfest poc ON poc.commitfest_id=cf.id
+LEFT JOIN commitfest_patch p ON p.id=poc.patch_id
+LEFT JOIN commitfest_cfbotbranch b ON b.patch_id=p.id
+WHERE cf.id=%(cfid)s
+GROUP BY cf.id""",
+        {"cfid": cfid},
     )
+    row = curs.fetchone()
+    if not row:
+        return None
+    return _make_etag(request, row)
 
+
+def _patch_etag(request, patchid):
     curs = connection.cursor()
-    curs.execute(sql)
-    activity = [dict(zip([c[0] for c in curs.description], r)) for r in curs.fetchall()]
+    curs.execute(
+        f"""SELECT p.modified, p.lastmail, {_OPEN_COMMITFESTS_SQL},
+    (SELECT max(date) FROM commitfest_patchhistory ph WHERE ph.patch_id=p.id),
+    (SELECT modified FROM commitfest_cfbotbranch b WHERE b.patch_id=p.id),
+    (SELECT max(modified) FROM commitfest_cfbottask t WHERE t.patch_id=p.id),
+    (SELECT max(latestmessage) FROM commitfest_mailthread t INNER JOIN commitfest_mailthread_patches tp ON tp.mailthread_id=t.id WHERE tp.patch_id=p.id),
+    EXISTS (SELECT 1 FROM commitfest_patch_subscribers s WHERE s.patch_id=p.id AND s.user_id=%(userid)s)
+FROM commitfest_patch p
+WHERE p.id=%(patchid)s""",
+        {"patchid": patchid, "userid": request.user.id},
+    )
+    row = curs.fetchone()
+    if not row:
+        return None
+    return _make_etag(request, row)
 
-    if rss:
-        # Return RSS feed with these objects
-        return ActivityFeed(activity, cf)(request)
+
+def _activity_last_change(cfid):
+    curs = connection.cursor()
+    if cfid:
+        curs.execute(
+            "SELECT max(date) FROM commitfest_patchhistory WHERE commitfest_id=%(cfid)s",
+            {"cfid": cfid},
+        )
     else:
-        # Return regular webpage
-        return render(
-            request,
-            "activity.html",
-            {
-                "commitfest": cf,
-                "activity": activity,
-                "title": cf and "Commitfest activity" or "Global Commitfest activity",
-                "rss_alternate": cf
-                and "/{0}/activity.rss/".format(cf.id)
-                or "/activity.rss/",
-                "rss_alternate_title": "PostgreSQL Commitfest Activity Log",
-                "breadcrumbs": cf
-                and [
-                    {"title": cf.title, "href": "/%s/" % cf.pk},
-                ]
-                or None,
-            },
+        curs.execute("SELECT max(date) FROM commitfest_patchhistory")
+    return curs.fetchone()[0]
+
+
+def _activity_etag(request, cfid=None):
+    return _make_etag(request, _activity_last_change(cfid))
+
+
+@condition(etag_func=_activity_etag)
+def activity(request, cfid=None):
+    # Number of notes to show per page
+    num = 100
+
+    if cfid:
+        cf = get_object_or_404(CommitFest, pk=cfid)
+    else:
+        cf = None
+
+    # Older entries are paged by (date, id), so that any page is read
+    # straight from the date index, or the commitfest and date one. Filtered
+    # pages use the ones with the event as well.
+    filtername = get_activity_filter(request)
+    activity = load_activity(
+        cf and cf.id,
+        num + 1,
+        _decode_cursor(request.GET.get("cursor", ""), "activity", [datetime, int]),
+        filtername=filtername,
+    )
+
+    next_cursor = None
+    if len(activity) > num:
+        activity = activity[:num]
+        next_cursor = _encode_cursor(
+            "activity", [activity[-1]["date"], activity[-1]["id"]]
         )
 
+    return render(
+        request,
+        "activity.html",
+        {
+            "commitfest": cf,
+            "activity": activity,
+            "next_page_query": next_cursor
+            and patchlist_page_query(request, next_cursor),
+            "activity_filters": [
+                (name, title) for name, (title, _) in ACTIVITY_FILTERS.items()
+            ],
+            "activity_filter": filtername,
+            "title": cf and "Commitfest activity" or "Global Commitfest activity",
+            "rss_alternate": (
+                cf and "/{0}/activity.rss/".format(cf.id) or "/activity.rss/"
+            )
+            + (filtername and f"?type={filtername}" or ""),
+            "rss_alternate_title": "PostgreSQL Commitfest Activity Log",
+            "breadcrumbs": cf
+            and [
+                {"title": cf.title, "href": "/%s/" % cf.pk},
+            ]
+            or None,
+        },
+    )
+
+
+def activity_feed(request, cfid=None):
+    # The feeds are rendered ahead of time, see activity.py
+    return activity_feed_response(request, cfid and int(cfid))
+
+
+async def activity_stream(request, cfid=None):
+    # The streams are long-lived, so they're only served by the ASGI
+    # application, see live.py
+    if settings.ACTIVITY_STREAM_URL is None or not isinstance(request, ASGIRequest):
+        raise Http404("Activity streams are not served here")
+    cf = await aget_object_or_404(CommitFest, pk=cfid) if cfid else None
+    return await activity_stream_response(request, cf, get_activity_filter(request))
+
 
 def redir(request, what, end):
     if what == "open":
@@ -288,15 +522,53 @@ def redir(request, what, end):
 
 
 PatchList = collections.namedtuple(
-    "PatchList", ["patches", "has_filter", "sortkey", "redirect"]
+    "PatchList",
+    ["patches", "has_filter", "sortkey", "redirect", "next_cursor", "open_patch_ids"],
+    defaults=[None, None],
 )
 
+# Maximum number of patches to show on a single page of a patch list
+PATCHLIST_PAGE_SIZE = 250
+
+# The groups of the personalized patch list on the dashboard, in the order
+# they are shown. The titles are what the list is sorted on, see the
+# group_name column in patchlist_query().
+DASHBOARD_SECTIONS = {
+    "closed": "Your still open patches in a closed commitfest (you should move or close these)",
+    "changes": "Your patches that need changes from you",
+    "review": "Patches that are ready for your review",
+    "blocked": "Blocked on others",
+}
+
+PatchListQuery = collections.namedtuple(
+    "PatchListQuery",
+    ["sql", "params", "where_str", "sortcols", "sortkey", "has_filter"],
+)
+
+
+def patchlist_query(request, cf, personalized=False, section=None):
+    """Build the query for a patch list from the filters in the request
 
-def patchlist(request, cf, personalized=False):
+    This is shared between the HTML pages and the API, so they support exactly
+    the same filters and orderings. The query has no LIMIT, and returns the
+    sort values of each row as sortval_<n> columns, for building a cursor to
+    the next page. Returns None if the filters require a logged in user, but
+    there is none.
+
+    The personalized list covers all commitfests, so cf is not used for it.
+    It can be limited to a single group with section, which is one of the
+    keys of DASHBOARD_SECTIONS.
+    """
     # Build a dynamic filter based on the filtering options entered
     whereclauses = []
     whereparams = {}
 
+    # Values that are fixed in the code are put in the query as literals, and
+    # only the ones that come from the request are parameters. That way the
+    # generic plan of the prepared statement is built knowing these values,
+    # which makes it good enough for PostgreSQL to actually use it.
+    openstatuses = _sql_int_array(PatchOnCommitFest.OPEN_STATUSES)
+
     if request.GET.get("status", "-1") != "-1":
         try:
             whereparams["status"] = int(request.GET["status"])
@@ -319,14 +591,14 @@ def patchlist(request, cf, personalized=False):
     if request.GET.getlist("tag") != []:
         try:
             tag_ids = [int(t) for t in request.GET.getlist("tag")]
-            for tag_id in tag_ids:
-                # Instead of using parameters, we just inline the tag_id. This
-                # is easier because we have can have multiple tags, and since
-                # tag_id is always an int it's safe with respect to SQL
-                # injection.
+            for i, tag_id in enumerate(tag_ids):
+                # One parameter per tag, instead of inlining the ids, so that
+                # the query text only depends on the number of tags and the
+                # prepared statement can be reused.
                 whereclauses.append(
-                    f"EXISTS (SELECT 1 FROM commitfest_patch_tags tags WHERE tags.patch_id=p.id AND tags.tag_id={tag_id})"
+                    f"EXISTS (SELECT 1 FROM commitfest_patch_tags tags WHERE tags.patch_id=p.id AND tags.tag_id=%(tag_{i})s)"
                 )
+                whereparams[f"tag_{i}"] = tag_id
         except ValueError:
             # int() failed -- so just ignore this filter
             pass
@@ -339,14 +611,7 @@ def patchlist(request, cf, personalized=False):
         elif request.GET["author"] == "-3":
             # Checking for "yourself" requires the user to be logged in!
             if not request.user.is_authenticated:
-                return PatchList(
-                    patches=[],
-                    has_filter=False,
-                    sortkey=0,
-                    redirect=HttpResponseRedirect(
-                        "%s?next=%s" % (settings.LOGIN_URL, request.path)
-                    ),
-                )
+                return None
             whereclauses.append(
                 "EXISTS (SELECT 1 FROM commitfest_patch_authors cpa WHERE cpa.patch_id=p.id AND cpa.user_id=%(self)s)"
             )
@@ -369,14 +634,7 @@ def patchlist(request, cf, personalized=False):
         elif request.GET["reviewer"] == "-3":
             # Checking for "yourself" requires the user to be logged in!
             if not request.user.is_authenticated:
-                return PatchList(
-                    patches=[],
-                    has_filter=False,
-                    sortkey=0,
-                    redirect=HttpResponseRedirect(
-                        "%s?next=%s" % (settings.LOGIN_URL, request.path)
-                    ),
-                )
+                return None
             whereclauses.append(
                 "EXISTS (SELECT 1 FROM commitfest_patch_reviewers cpr WHERE cpr.patch_id=p.id AND cpr.user_id=%(self)s)"
             )
@@ -392,121 +650,151 @@ def patchlist(request, cf, personalized=False):
                 pass
 
     if request.GET.get("text", "") != "":
-        whereclauses.append("p.name ILIKE '%%' || %(txt)s || '%%'")
+        # Written like this, instead of ILIKE, so that it can use the trigram
+        # index on UPPER(name).
+        whereclauses.append("UPPER(p.name) LIKE UPPER('%%' || %(txt)s || '%%')")
         whereparams["txt"] = request.GET["text"]
 
     has_filter = len(whereclauses) > 0
 
     if personalized:
-        whereclauses.append("""
-            EXISTS (
-                SELECT 1 FROM commitfest_patch_reviewers cpr WHERE cpr.patch_id=p.id AND cpr.user_id=%(self)s
-            ) OR EXISTS (
-                SELECT 1 FROM commitfest_patch_authors cpa WHERE cpa.patch_id=p.id AND cpa.user_id=%(self)s
-            ) OR p.committer_id=%(self)s""")
+        # Only patches the user is involved in, which is done by the join
+        # with their involvement rows below.
         whereparams["self"] = request.user.id
 
-        whereclauses.append("poc.status=ANY(%(openstatuses)s)")
+        whereclauses.append(f"poc.status=ANY({openstatuses})")
     else:
         whereclauses.append("poc.commitfest_id=%(cid)s")
+        whereparams["cid"] = cf.id
         # Exclude "Moved to other CF" patches from draft commitfests
         if cf.draft:
-            whereclauses.append("poc.status != %(status_moved)s")
-            whereparams["status_moved"] = PatchOnCommitFest.STATUS_MOVED
+            whereclauses.append(f"poc.status != {PatchOnCommitFest.STATUS_MOVED}")
 
     if personalized:
         # For now we can just order by these names in descending order, because
         # they are crafted such that they alphabetically sort in the intended
         # order.
-        columns_str = """
+        is_committer = request.user.id in get_reference_data().committers_by_user_id
+        if is_committer:
+            review_statuses = _sql_int_array(
+                [PatchOnCommitFest.STATUS_REVIEW, PatchOnCommitFest.STATUS_COMMITTER]
+            )
+        else:
+            review_statuses = _sql_int_array([PatchOnCommitFest.STATUS_REVIEW])
+        group_name_str = f"""
             CASE WHEN
-                EXISTS (
-                    SELECT 1 FROM commitfest_patch_authors cpa WHERE cpa.patch_id=p.id AND cpa.user_id=%(self)s
-                ) AND (
-                    cf.status = %(closed_status)s
+                involvement.is_author AND (
+                    cf.status = {CommitFest.STATUS_CLOSED}
                 )
-            THEN 'Your still open patches in a closed commitfest (you should move or close these)'
+            THEN '{DASHBOARD_SECTIONS["closed"]}'
             WHEN
-                EXISTS (
-                    SELECT 1 FROM commitfest_patch_authors cpa WHERE cpa.patch_id=p.id AND cpa.user_id=%(self)s
-                ) AND (
-                    poc.status=%(needs_author)s
+                involvement.is_author AND (
+                    poc.status={PatchOnCommitFest.STATUS_AUTHOR}
                     OR branch.needs_rebase_since IS NOT NULL
                     OR branch.failing_since + interval '4 days' < now()
-                    OR (%(is_committer)s AND poc.status=%(needs_committer)s)
+                    OR ({is_committer} AND poc.status={PatchOnCommitFest.STATUS_COMMITTER})
                 )
-            THEN 'Your patches that need changes from you'
+            THEN '{DASHBOARD_SECTIONS["changes"]}'
             WHEN
-                NOT EXISTS (
-                    SELECT 1 FROM commitfest_patch_authors cpa WHERE cpa.patch_id=p.id AND cpa.user_id=%(self)s
-                ) AND (
-                    poc.status=ANY(%(review_statuses)s)
+                NOT involvement.is_author AND (
+                    poc.status=ANY({review_statuses})
                 )
-            THEN 'Patches that are ready for your review'
-            ELSE 'Blocked on others'
-            END AS group_name,
+            THEN '{DASHBOARD_SECTIONS["review"]}'
+            ELSE '{DASHBOARD_SECTIONS["blocked"]}'
+            END"""
+        if section:
+            whereclauses.append(f"{group_name_str} = %(section)s")
+            whereparams["section"] = DASHBOARD_SECTIONS[section]
+        columns_str = f"""
+            {group_name_str} AS group_name,
             cf.id AS cf_id,
             cf.name AS cf_name,
             cf.status AS cf_status,
         """
-        whereparams["needs_author"] = PatchOnCommitFest.STATUS_AUTHOR
-        whereparams["needs_committer"] = PatchOnCommitFest.STATUS_COMMITTER
-        whereparams["closed_status"] = CommitFest.STATUS_CLOSED
-        is_committer = bool(Committer.objects.filter(user=request.user, active=True))
-        whereparams["is_committer"] = is_committer
-
-        if is_committer:
-            whereparams["review_statuses"] = [
-                PatchOnCommitFest.STATUS_REVIEW,
-                PatchOnCommitFest.STATUS_COMMITTER,
-            ]
-        else:
-            whereparams["review_statuses"] = [
-                PatchOnCommitFest.STATUS_REVIEW,
-            ]
-        joins_str = "INNER JOIN commitfest_commitfest cf ON poc.commitfest_id=cf.id"
-        groupby_str = "cf.id,"
+        joins_str = f"""INNER JOIN (
+    SELECT patch_id, bool_or(role = {PatchInvolvement.ROLE_AUTHOR}) AS is_author
+    FROM commitfest_patchinvolvement
+    WHERE user_id=%(self)s
+    GROUP BY patch_id
+) involvement ON involvement.patch_id=p.id
+INNER JOIN commitfest_commitfest cf ON poc.commitfest_id=cf.id"""
     else:
         columns_str = ""
         joins_str = ""
-        groupby_str = ""
 
-    # Figure out custom ordering
+    # Figure out custom ordering. Every ordering is a list of (expression,
+    # type, descending, nulls first) tuples, so that we can use the same list
+    # to generate both the ORDER BY clause and the keyset condition for the
+    # next page. The type is the one of the value of the expression in a
+    # cursor, see _decode_cursor.
     try:
         sortkey = int(request.GET.get("sortkey", "0"))
     except ValueError:
         sortkey = 0
 
     if sortkey == 2:
-        orderby_str = "lastmail, created"
+        sortcols = [
+            ("p.lastmail", datetime, False, False),
+            ("p.created", datetime, False, False),
+        ]
     elif sortkey == -2:
-        orderby_str = "lastmail DESC, created DESC"
+        sortcols = [
+            ("p.lastmail", datetime, True, True),
+            ("p.created", datetime, True, True),
+        ]
     elif sortkey == 3:
-        orderby_str = "num_cfs DESC, modified, created"
+        sortcols = [
+            ("summary.num_cfs", int, True, True),
+            ("p.modified", datetime, False, False),
+            ("p.created", datetime, False, False),
+        ]
     elif sortkey == -3:
-        orderby_str = "num_cfs ASC, modified DESC, created DESC"
+        sortcols = [
+            ("summary.num_cfs", int, False, False),
+            ("p.modified", datetime, True, True),
+            ("p.created", datetime, True, True),
+        ]
     elif sortkey == 4:
-        orderby_str = "p.id"
+        sortcols = [("p.id", int, False, False)]
     elif sortkey == -4:
-        orderby_str = "p.id DESC"
+        sortcols = [("p.id", int, True, True)]
     elif sortkey == 5:
-        orderby_str = "p.name, created"
+        sortcols = [
+            ("p.name", str, False, False),
+            ("p.created", datetime, False, False),
+        ]
     elif sortkey == -5:
-        orderby_str = "p.name DESC, created DESC"
+        sortcols = [("p.name", str, True, True), ("p.created", datetime, True, True)]
     elif sortkey == 6:
-        orderby_str = "branch.all_additions + branch.all_deletions NULLS LAST, created"
+        sortcols = [
+            ("branch.all_additions + branch.all_deletions", int, False, False),
+            ("p.created", datetime, False, False),
+        ]
     elif sortkey == -6:
-        orderby_str = (
-            "branch.all_additions + branch.all_deletions DESC NULLS LAST, created DESC"
-        )
+        sortcols = [
+            ("branch.all_additions + branch.all_deletions", int, True, False),
+            ("p.created", datetime, True, True),
+        ]
     elif sortkey == 7:
-        orderby_str = "branch.failing_since DESC NULLS FIRST, branch.created DESC"
+        sortcols = [
+            ("branch.failing_since", datetime, True, True),
+            ("branch.created", datetime, True, True),
+        ]
     elif sortkey == -7:
-        orderby_str = "branch.failing_since NULLS LAST, branch.created"
+        sortcols = [
+            ("branch.failing_since", datetime, False, False),
+            ("branch.created", datetime, False, False),
+        ]
     elif sortkey == 8:
-        orderby_str = "poc.commitfest_id, lastmail DESC"
+        sortcols = [
+            ("poc.commitfest_id", int, False, False),
+            ("p.lastmail", datetime, True, True),
+        ]
     elif sortkey == -8:
-        orderby_str = "poc.commitfest_id DESC, lastmail"
+        sortcols = [
+            ("poc.commitfest_id", int, True, True),
+            ("p.lastmail", datetime, False, False),
+        ]
     else:
         if personalized:
             # First we sort by group_name, to have the grouping work.
@@ -518,51 +806,77 @@ def patchlist(request, cf, personalized=False):
             # progress" commitfest before ones in the "Open" commitfest.
             # And then to break ties, we put ones with the most recent email at
             # the top.
-            orderby_str = """group_name DESC,
-                COALESCE(
+            sortcols = [
+                (group_name_str, str, True, True),
+                (
+                    f"""COALESCE(
                     branch.failing_since,
-                    CASE WHEN cf.status = %(cf_closed_status)s
+                    CASE WHEN cf.status = {CommitFest.STATUS_CLOSED}
                     THEN enddate ELSE NULL END
-                ) DESC NULLS FIRST,
-                cf.startdate,
-                lastmail DESC"""
-            whereparams["cf_closed_status"] = CommitFest.STATUS_CLOSED
+                )""",
+                    datetime,
+                    True,
+                    True,
+                ),
+                ("cf.startdate", date, False, False),
+                ("p.lastmail", datetime, True, True),
+            ]
         else:
-            orderby_str = "created"
+            sortcols = [("p.created", datetime, False, False)]
         sortkey = 0
 
-    if not has_filter and sortkey == 0 and request.GET:
-        # Redirect to get rid of the ugly url
-        return PatchList(
-            patches=[],
-            has_filter=False,
-            sortkey=0,
-            redirect=HttpResponseRedirect(request.path),
-        )
+    # Open patches are always shown first, and the id of the
+    # patchoncommitfest row makes sure the order is fully deterministic,
+    # which is required for the keyset pagination to not skip or repeat
+    # rows.
+    sortcols = (
+        [(f"poc.status=ANY({openstatuses})", bool, True, True)]
+        + sortcols
+        + [("poc.id", int, False, False)]
+    )
 
     if whereclauses:
         where_str = "({0})".format(") AND (".join(whereclauses))
     else:
         where_str = "true"
-    params = {
-        "openstatuses": PatchOnCommitFest.OPEN_STATUSES,
-        "cid": cf.id,
-    }
-    params.update(whereparams)
+    params = dict(whereparams)
+
+    # The cursor contains the sort values of the last row of the previous
+    # page, so we continue right after it. This keeps pages stable even if
+    # patches get added or removed in the meantime, unlike an OFFSET.
+    cursor_values = _decode_cursor(
+        request.GET.get("cursor", ""), sortkey, [c[1] for c in sortcols]
+    )
+    if cursor_values:
+        keyset_str, keyset_params = _keyset_condition(sortcols, cursor_values)
+        params.update(keyset_params)
+    else:
+        keyset_str = "true"
+
+    orderby_str = ", ".join(
+        "{0}{1}{2}".format(
+            expr,
+            " DESC" if descending else "",
+            " NULLS FIRST" if nulls_first else " NULLS LAST",
+        )
+        for expr, _, descending, nulls_first in sortcols
+    )
+    sortvals_str = "".join(
+        f"{expr} AS sortval_{i},\n" for i, (expr, _, _, _) in enumerate(sortcols)
+    )
 
     # Let's not overload the poor django ORM
-    curs = connection.cursor()
-    curs.execute(
-        f"""SELECT p.id, p.name, poc.status, v.version AS targetversion, p.created, p.modified, p.lastmail, committer.first_name || ' ' || committer.last_name || ' (' || committer.username || ')' AS committer,
+    sql = f"""SELECT p.id, p.name, poc.status, v.version AS targetversion, p.created, p.modified, p.lastmail, summary.committer_name AS committer,
         {columns_str}
-(poc.status=ANY(%(openstatuses)s)) AS is_open,
-(SELECT string_agg(first_name || ' ' || last_name || ' (' || username || ')', ', ') FROM auth_user INNER JOIN commitfest_patch_authors cpa ON cpa.user_id=auth_user.id WHERE cpa.patch_id=p.id) AS author_names,
-(SELECT string_agg(first_name || ' ' || last_name || ' (' || username || ')', ', ') FROM auth_user INNER JOIN commitfest_patch_reviewers cpr ON cpr.user_id=auth_user.id WHERE cpr.patch_id=p.id) AS reviewer_names,
-(SELECT count(1) FROM commitfest_patchoncommitfest pcf WHERE pcf.patch_id=p.id) AS num_cfs,
-(SELECT array_agg(tag_id) FROM commitfest_patch_tags t WHERE t.patch_id=p.id) AS tag_ids,
+(poc.status=ANY({openstatuses})) AS is_open,
+summary.author_names,
+summary.reviewer_names,
+summary.num_cfs,
+summary.tag_ids,
 
 branch.needs_rebase_since,
 branch.failing_since,
+{sortvals_str}
 (
     SELECT row_to_json(t) as cfbot_results
     from (
@@ -586,32 +900,204 @@ branch.failing_since,
 )
 FROM commitfest_patch p
 INNER JOIN commitfest_patchoncommitfest poc ON poc.patch_id=p.id
+INNER JOIN commitfest_patchsummary summary ON summary.patch_id=p.id
 {joins_str}
-LEFT JOIN auth_user committer ON committer.id=p.committer_id
 LEFT JOIN commitfest_targetversion v ON p.targetversion_id=v.id
 LEFT JOIN commitfest_cfbotbranch branch ON branch.patch_id=p.id
-WHERE {where_str}
-GROUP BY p.id, poc.id, {groupby_str} committer.id, v.version, branch.patch_id
-ORDER BY is_open DESC, {orderby_str}""",
-        params,
+WHERE {where_str} AND ({keyset_str})
+ORDER BY {orderby_str}"""
+    return PatchListQuery(
+        sql=sql,
+        params=params,
+        where_str=where_str,
+        sortcols=sortcols,
+        sortkey=sortkey,
+        has_filter=has_filter,
+    )
+
+
+def _patchlist_redirect(request, query):
+    """Return the redirect to show instead of the patch list, if any"""
+    if query is None:
+        # Checking for "yourself" requires the user to be logged in!
+        return HttpResponseRedirect("%s?next=%s" % (settings.LOGIN_URL, request.path))
+
+    if not query.has_filter and query.sortkey == 0 and request.GET.keys() - {"cursor"}:
+        # Redirect to get rid of the ugly url
+        return HttpResponseRedirect(request.path)
+
+    return None
+
+
+def patchlist(request, cf, personalized=False, section=None):
+    query = patchlist_query(request, cf, personalized, section)
+    redirect = _patchlist_redirect(request, query)
+    if redirect:
+        return PatchList(
+            patches=[],
+            has_filter=False,
+            sortkey=0,
+            redirect=redirect,
+        )
+    sortcols = query.sortcols
+
+    curs = connection.cursor()
+    execute_prepared(
+        curs, f"{query.sql}\nLIMIT {PATCHLIST_PAGE_SIZE + 1}", query.params
     )
     patches = [
         dict(zip([col[0] for col in curs.description], row)) for row in curs.fetchall()
     ]
+
+    # We fetch one more row than we show, to know if there is a next page
+    next_cursor = None
+    if len(patches) > PATCHLIST_PAGE_SIZE:
+        patches = patches[:PATCHLIST_PAGE_SIZE]
+        next_cursor = _encode_cursor(
+            query.sortkey,
+            [patches[-1][f"sortval_{i}"] for i in range(len(sortcols))],
+        )
+    for p in patches:
+        for i in range(len(sortcols)):
+            del p[f"sortval_{i}"]
+
+    # The links to mail all authors and reviewers should include the open
+    # patches on all pages, not just this one.
+    open_patch_ids = None
+    if not personalized and request.user.is_staff:
+        execute_prepared(
+            curs,
+            f"""SELECT p.id
+FROM commitfest_patch p
+INNER JOIN commitfest_patchoncommitfest poc ON poc.patch_id=p.id
+WHERE {query.where_str} AND poc.status=ANY({_sql_int_array(PatchOnCommitFest.OPEN_STATUSES)})
+ORDER BY p.id""",
+            query.params,
+        )
+        open_patch_ids = [r[0] for r in curs.fetchall()]
+
     return PatchList(
         patches=patches,
-        sortkey=sortkey,
-        has_filter=has_filter,
+        sortkey=query.sortkey,
+        has_filter=query.has_filter,
         redirect=False,
+        next_cursor=next_cursor,
+        open_patch_ids=open_patch_ids,
     )
 
 
+def _sql_int_array(values):
+    return "ARRAY[{0}]::integer[]".format(",".join(str(int(v)) for v in values))
+
+
+def _keyset_condition(sortcols, values):
+    """Build a condition matching the rows that sort after the given values
+
+    Generates the equivalent of a row comparison, but one that works for a mix
+    of ascending and descending columns as well as NULLs.
+    """
+    clauses = []
+    params = {}
+    equal = []
+    for i, ((expr, _, descending, nulls_first), value) in enumerate(
+        zip(sortcols, values)
+    ):
+        if value is None:
+            # Only non-NULL values can sort after a NULL, and only if NULLs
+            # sort first.
+            after = f"({expr}) IS NOT NULL" if nulls_first else None
+            equal_str = f"({expr}) IS NULL"
+        else:
+            params[f"cursor_{i}"] = value
+            after = "({0}) {1} %(cursor_{2})s".format(
+                expr, "<" if descending else ">", i
+            )
+            if not nulls_first:
+                after = f"{after} OR ({expr}) IS NULL"
+            equal_str = f"({expr}) = %(cursor_{i})s"
+        if after:
+            clauses.append(" AND ".join(equal + [f"({after})"]))
+        equal.append(equal_str)
+    return "({0})".format(") OR (".join(clauses)), params
+
+
+# Cursors for keyset pagination. The kind is the sortkey for the patch lists,
+# and the name of the list for the lists on the patch page, so that a cursor
+# for one list can't be used for another one.
+def _encode_cursor(kind, values):
+    values = [v.isoformat() if isinstance(v, date) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps([kind] + values).encode()).decode()
+
+
+def _cursor_value_valid(value, type_):
+    if value is None:
+        return True
+    if type_ in (date, datetime):
+        # Encoded with isoformat()
+        if not isinstance(value, str):
+            return False
+        try:
+            type_.fromisoformat(value)
+        except ValueError:
+            return False
+        return True
+    if type_ is str:
+        # Strings with NUL bytes can't be sent to PostgreSQL
+        return isinstance(value, str) and "\x00" not in value
+    if type_ is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, type_)
+
+
+def _decode_cursor(cursor, kind, types):
+    """Return the values of the cursor, which must have the given types
+
+    An invalid cursor, or one for a different ordering, is simply ignored and
+    gives the first page. The values are checked, so that one that was
+    tampered with never makes the query fail.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != len(types) + 1:
+        return None
+    if values[0] != kind:
+        return None
+    if not all(_cursor_value_valid(v, t) for v, t in zip(values[1:], types)):
+        return None
+    return values[1:]
+
+
+def patchlist_page_query(request, cursor):
+    """Return the query string for another page of the current patch list
+
+    Passing None as the cursor gives the first page.
+    """
+    query = request.GET.copy()
+    query.pop("cursor", None)
+    if cursor:
+        query["cursor"] = cursor
+    return query.urlencode()
+
+
+def _status_summary(counts):
+    """Turn (status, count) rows into (status, statusstring, count) rows in
+    the order of the patch statuses"""
+    statuses = get_reference_data().patch_statuses
+    return [
+        (status, statuses[status].statusstring, count)
+        for status, count in sorted(counts, key=lambda r: statuses[r[0]].sortkey)
+    ]
+
+
+@cache_anonymous_page("cf")
+@condition(etag_func=_commitfest_etag)
 @transaction.atomic
 def commitfest(request, cfid):
     curs = connection.cursor()
-    # Make sure the patchlist() query, the stats query and, Tag.objects.all()
-    # all work on the same snapshot. Needs to be first in the
-    # transaction.atomic decorator.
+    # Make sure the patchlist() query and the stats query work on the same
+    # snapshot. Needs to be first in the transaction.atomic decorator.
     curs.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
     # Find ourselves
     cf = get_object_or_404(CommitFest, pk=cfid)
@@ -620,17 +1106,17 @@ def commitfest(request, cfid):
     if patch_list.redirect:
         return patch_list.redirect
 
-    # Generate patch status summary.
+    # Generate patch status summary from the precomputed counts.
     # Exclude "Moved to other CF" status from draft commitfests
-    status_filter = "AND poc.status != %(status_moved)s" if cf.draft else ""
+    status_filter = "AND sc.status != %(status_moved)s" if cf.draft else ""
     curs.execute(
-        f"SELECT ps.status, ps.statusstring, count(*) FROM commitfest_patchoncommitfest poc INNER JOIN commitfest_patchstatus ps ON ps.status=poc.status WHERE commitfest_id=%(id)s {status_filter} GROUP BY ps.status ORDER BY ps.sortkey",
+        f"SELECT sc.status, sc.count FROM commitfest_commitfeststatuscount sc WHERE sc.commitfest_id=%(id)s AND sc.count > 0 {status_filter}",
         {
             "id": cf.id,
             "status_moved": PatchOnCommitFest.STATUS_MOVED,
         },
     )
-    statussummary = curs.fetchall()
+    statussummary = _status_summary(curs.fetchall())
     statussummary.append([-1, "Total", sum((r[2] for r in statussummary))])
 
     # Generates a fairly expensive query, which we shouldn't do unless
@@ -646,11 +1132,17 @@ def commitfest(request, cfid):
             "patches": patch_list.patches,
             "statussummary": statussummary,
             "tags_data": get_tags_data(),
-            "all_tags": {t.id: t for t in Tag.objects.all()},
+            "all_tags": get_reference_data().tags_by_id,
             "has_filter": patch_list.has_filter,
             "title": f"{cf.title} ({cf.periodstring})",
             "sortkey": patch_list.sortkey,
-            "openpatchids": [p["id"] for p in patch_list.patches if p["is_open"]],
+            "openpatchids": patch_list.open_patch_ids or [],
+            "next_page_query": (
+                patchlist_page_query(request, patch_list.next_cursor)
+                if patch_list.next_cursor
+                else None
+            ),
+            "first_page_query": patchlist_page_query(request, None),
             "header_activity": "Activity log",
             "header_activity_link": "activity/",
             "userprofile": getattr(request.user, "userprofile", UserProfile()),
@@ -658,40 +1150,77 @@ def commitfest(request, cfid):
     )
 
 
+def _search_patches():
+    """Patches with just the related data that patchsearch.html shows
+
+    The tags and the number of commitfests come from the summary, so only
+    the people and the commitfests need to be prefetched. This only happens
+    for the page of results that is actually shown.
+    """
+    people = User.objects.only("first_name", "last_name", "username")
+    return (
+        Patch.objects.select_related("targetversion", "committer__user", "summary")
+        .defer("summary__search_document")
+        .prefetch_related(
+            Prefetch("authors", queryset=people),
+            Prefetch("reviewers", queryset=people),
+            Prefetch(
+                "patchoncommitfest_set",
+                queryset=PatchOnCommitFest.objects.select_related(
+                    "commitfest"
+                ).order_by("-enterdate"),
+            ),
+        )
+    )
+
+
 def patches_by_messageid(messageid):
-    # First try to find the messageid in our database
-    patches = (
-        Patch.objects.select_related()
-        .filter(mailthread_set__messageid=messageid)
-        .order_by(
-            "created",
+    # All messages of the attached threads are recorded locally, so this
+    # never needs to ask the archives.
+    return (
+        _search_patches()
+        .filter(
+            mailthread_set__in=MailThreadMessage.objects.filter(
+                messageid=messageid
+            ).values("mailthread_id")
         )
-        .all()
+        .order_by("created")
     )
-    if patches:
-        return patches
 
-    urlsafe_messageid = urllib.parse.quote(messageid)
 
-    # If it's not there, try to find it in the archives
-    try:
-        thread = _archivesAPI(f"/message-id.json/{urlsafe_messageid}")
-    except Http404:
-        return []
+SEARCH_PAGE_SIZE = 50
+# Searching for something very common would otherwise count and sort the
+# whole patch table, so we only ever look at this many of the best matches.
+SEARCH_MAX_RESULTS = 1000
 
-    if len(thread) == 0:
-        return []
+# The orderings of the search results for every sortkey, other than the
+# default of relevance.
+SEARCH_ORDERINGS = {
+    2: ["-modified", "id"],  # Latest mail, using modified as proxy
+    -2: ["modified", "id"],
+    3: ["-summary__num_cfs", "id"],  # Num cfs
+    -3: ["summary__num_cfs", "id"],
+    4: ["id"],  # ID
+    -4: ["-id"],
+    5: ["name", "id"],  # Patch name
+    -5: ["-name", "id"],
+    8: ["latest_cf", "id"],  # CF
+    -8: ["-latest_cf", "id"],
+}
 
-    first_email = min(thread, key=lambda x: x["date"])
 
-    return (
-        Patch.objects.select_related()
-        .filter(mailthread_set__messageid=first_email["msgid"])
-        .order_by(
-            "created",
-        )
-        .all()
-    )
+def search_page_query(request, page):
+    """Return the query string for another page of the search results"""
+    query = request.GET.copy()
+    query["page"] = page
+    return query.urlencode()
+
+
+def _involved_patch_ids(role, user_id=None):
+    involvement = PatchInvolvement.objects.filter(role=role)
+    if user_id is not None:
+        involvement = involvement.filter(user_id=user_id)
+    return involvement.values("patch_id")
 
 
 # We require login for this page primarily so that the author/reviewer filter
@@ -703,6 +1232,10 @@ def global_search(request):
     if "searchterm" not in request.GET:
         return HttpResponseRedirect("/")
     searchterm = request.GET["searchterm"].strip()
+    try:
+        sortkey = int(request.GET.get("sortkey") or "1")
+    except ValueError:
+        sortkey = 1
     patches = []
 
     if "@" in searchterm:
@@ -712,26 +1245,31 @@ def global_search(request):
         patches = patches_by_messageid(cleaned_id)
 
     if not patches:
-        patches_query = (
-            Patch.objects.select_related("targetversion", "committer")
-            .prefetch_related(
-                "authors",
-                "reviewers",
-                "tags",
-                "patchoncommitfest_set__commitfest",
-                "mailthread_set",
-            )
-            .select_related("cfbot_branch")
-            .filter(name__icontains=searchterm)
+        search_query = SearchQuery(
+            searchterm, config="english", search_type="websearch"
+        )
+        # Full text matches are found through the GIN index on the search
+        # document, and substrings of the name through the trigram index.
+        # These are combined with a UNION, because an OR across the join
+        # could use neither of them.
+        matching_ids = (
+            PatchSummary.objects.filter(search_document=search_query)
+            .values("patch_id")
+            .union(Patch.objects.filter(name__icontains=searchterm).values("id"))
         )
+        patches_query = _search_patches().filter(id__in=matching_ids)
 
-        # Apply filters using the same logic as patchlist
+        # Apply filters using the same logic as patchlist. These use
+        # subqueries instead of joins on the many-to-many tables, so that
+        # the result never needs a DISTINCT.
         if request.GET.get("status", "-1") != "-1":
             try:
                 status = int(request.GET["status"])
                 patches_query = patches_query.filter(
-                    patchoncommitfest__status=status
-                ).distinct()
+                    id__in=PatchOnCommitFest.objects.filter(status=status).values(
+                        "patch_id"
+                    )
+                )
             except ValueError:
                 pass
 
@@ -748,85 +1286,94 @@ def global_search(request):
         if request.GET.getlist("tag"):
             try:
                 tag_ids = [int(t) for t in request.GET.getlist("tag")]
-                for tag_id in tag_ids:
-                    patches_query = patches_query.filter(tags__id=tag_id)
-                patches_query = patches_query.distinct()
+                patches_query = patches_query.filter(summary__tag_ids__contains=tag_ids)
             except ValueError:
                 pass
 
         # Apply author filter
         if request.GET.get("author", "-1") != "-1":
             if request.GET["author"] == "-2":
-                patches_query = patches_query.filter(authors__isnull=True)
+                patches_query = patches_query.exclude(
+                    id__in=_involved_patch_ids(PatchInvolvement.ROLE_AUTHOR)
+                )
             elif request.GET["author"] == "-3":
                 # Filter for current user's patches
                 if not request.user.is_authenticated:
                     return HttpResponseRedirect(
                         f"{settings.LOGIN_URL}?next={request.path}?searchterm={searchterm}"
                     )
-                patches_query = patches_query.filter(authors=request.user)
+                patches_query = patches_query.filter(
+                    id__in=_involved_patch_ids(
+                        PatchInvolvement.ROLE_AUTHOR, request.user.id
+                    )
+                )
             else:
                 try:
                     author_id = int(request.GET["author"])
-                    patches_query = patches_query.filter(authors__id=author_id)
+                    patches_query = patches_query.filter(
+                        id__in=_involved_patch_ids(
+                            PatchInvolvement.ROLE_AUTHOR, author_id
+                        )
+                    )
                 except ValueError:
                     pass
 
         # Apply reviewer filter
         if request.GET.get("reviewer", "-1") != "-1":
             if request.GET["reviewer"] == "-2":
-                patches_query = patches_query.filter(reviewers__isnull=True)
+                patches_query = patches_query.exclude(
+                    id__in=_involved_patch_ids(PatchInvolvement.ROLE_REVIEWER)
+                )
             elif request.GET["reviewer"] == "-3":
                 # Filter for current user's reviews
                 if not request.user.is_authenticated:
                     return HttpResponseRedirect(
                         f"{settings.LOGIN_URL}?next={request.path}?searchterm={searchterm}"
                     )
-                patches_query = patches_query.filter(reviewers=request.user)
+                patches_query = patches_query.filter(
+                    id__in=_involved_patch_ids(
+                        PatchInvolvement.ROLE_REVIEWER, request.user.id
+                    )
+                )
             else:
                 try:
                     reviewer_id = int(request.GET["reviewer"])
-                    patches_query = patches_query.filter(reviewers__id=reviewer_id)
+                    patches_query = patches_query.filter(
+                        id__in=_involved_patch_ids(
+                            PatchInvolvement.ROLE_REVIEWER, reviewer_id
+                        )
+                    )
                 except ValueError:
                     pass
 
-        # Ensure distinct results after filtering on many-to-many relationships
-        patches_query = patches_query.distinct()
-
-        # Apply sorting based on sortkey parameter (adapted for Django ORM)
-        sortkey = request.GET.get("sortkey", "1")
-        if sortkey == "2":  # Latest mail
-            patches_query = patches_query.order_by("-modified")  # Use modified as proxy
-        elif sortkey == "-2":
-            patches_query = patches_query.order_by("modified")
-        elif sortkey == "3":  # Num cfs
-            patches_query = patches_query.annotate(
-                num_cfs=Count("patchoncommitfest")
-            ).order_by("-num_cfs")
-        elif sortkey == "-3":
-            patches_query = patches_query.annotate(
-                num_cfs=Count("patchoncommitfest")
-            ).order_by("num_cfs")
-        elif sortkey == "4":  # ID
-            patches_query = patches_query.order_by("id")
-        elif sortkey == "-4":
-            patches_query = patches_query.order_by("-id")
-        elif sortkey == "5":  # Patch name
-            patches_query = patches_query.order_by("name")
-        elif sortkey == "-5":
-            patches_query = patches_query.order_by("-name")
-        elif sortkey == "8":  # CF
-            patches_query = patches_query.order_by("patchoncommitfest__commitfest__id")
-        elif sortkey == "-8":
-            patches_query = patches_query.order_by("-patchoncommitfest__commitfest__id")
-        else:  # Default: Created (sortkey 1)
-            patches_query = patches_query.order_by("created")
-
-        patches = patches_query.all()
-
-    if len(patches) == 1:
-        patch = patches[0]
+        # Only the best matches are shown, ranked by the full text match
+        # first, and then by how close the name is to the search term, so
+        # that among patches that match equally well the most specific name
+        # comes first.
+        best_matches = patches_query.annotate(
+            rank=SearchRank(F("summary__search_document"), search_query),
+            relevance=TrigramSimilarity("name", searchterm),
+        ).order_by("-rank", "-relevance", "created", "id")[:SEARCH_MAX_RESULTS]
+
+        # Those are then sorted based on the sortkey parameter (adapted for
+        # Django ORM). The id makes the order unique, so that pages don't
+        # overlap.
+        ordering = SEARCH_ORDERINGS.get(sortkey)
+        if ordering is None:
+            patches = best_matches
+        else:
+            patches = patches_query.filter(id__in=best_matches.values("id"))
+            if abs(sortkey) == 8:
+                patches = patches.annotate(
+                    latest_cf=Max("patchoncommitfest__commitfest_id")
+                )
+            patches = patches.order_by(*ordering)
+
+    paginator = Paginator(patches, SEARCH_PAGE_SIZE)
+    if paginator.count == 1:
+        patch = paginator.page(1)[0]
         return HttpResponseRedirect(f"/patch/{patch.id}/")
+    page = paginator.get_page(request.GET.get("page"))
 
     # Use the existing filter form (no cf parameter, will require login for user lookups)
     form = CommitFestFilterForm(request.GET)
@@ -845,14 +1392,26 @@ def global_search(request):
         request,
         "patchsearch.html",
         {
-            "patches": patches,
+            "patches": page,
+            "page": page,
+            "truncated": paginator.count >= SEARCH_MAX_RESULTS,
+            "previous_page_query": (
+                search_page_query(request, page.previous_page_number())
+                if page.has_previous()
+                else None
+            ),
+            "next_page_query": (
+                search_page_query(request, page.next_page_number())
+                if page.has_next()
+                else None
+            ),
             "title": "Patch search results",
             "searchterm": searchterm,
             "form": form,
             "cf": None,  # No specific commitfest context
-            "sortkey": int(request.GET.get("sortkey") or "1"),
+            "sortkey": sortkey,
             "tags_data": get_tags_data(),
-            "all_tags": {t.id: t for t in Tag.objects.all()},
+            "all_tags": get_reference_data().tags_by_id,
             "userprofile": userprofile,
         },
     )
@@ -864,23 +1423,114 @@ def patch_legacy_redirect(request, cfid, patchid):
     return HttpResponseRedirect(f"/patch/{patchid}/")
 
 
-def patch(request, patchid):
-    patch = get_object_or_404(Patch.objects.select_related(), pk=patchid)
+# The patch page only shows this many history entries, and attachments per
+# thread, the rest is loaded on demand by patch_history and
+# patch_attachments.
+PATCH_HISTORY_PAGE_SIZE = 20
+PATCH_ATTACHMENTS_PAGE_SIZE = 5
+
+
+def _history_rows():
+    return PatchHistory.objects.select_related("by").order_by("-date", "-id")
+
+
+def _attachment_rows():
+    return MailThreadAttachment.objects.order_by("-date", "-id")
+
 
-    patch_commitfests = (
-        PatchOnCommitFest.objects.select_related("commitfest")
-        .filter(patch=patch)
-        .order_by("-enterdate")
-        .all()
+def _first_page(rows, kind, page_size):
+    """Split rows into the page to show and the cursor for the next one
+
+    rows must be ordered by descending date and id, and contain at most one
+    more row than the page size, to know if there is a next page.
+    """
+    rows = list(rows)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, _encode_cursor(kind, [rows[-1].date, rows[-1].id])
+
+
+def _next_page(request, queryset, kind, page_size):
+    """Return the page of queryset after the cursor in the request, and the
+    cursor for the page after that"""
+    values = _decode_cursor(request.GET.get("cursor", ""), kind, [datetime, int])
+    if values:
+        queryset = queryset.filter(
+            Q(date__lt=values[0]) | Q(date=values[0], id__lt=values[1])
+        )
+    return _first_page(queryset[: page_size + 1], kind, page_size)
+
+
+def load_patch_details(patchid):
+    """Load a patch with everything that patch.html shows
+
+    All the related rows are fetched up front with one query per relation,
+    so that the number of queries for the patch page is the same no matter
+    how many threads, attachments, annotations or history entries the patch
+    has. Of the history and attachments only the first page is loaded.
+    """
+    return get_object_or_404(
+        Patch.objects.select_related(
+            "targetversion", "committer__user", "cfbot_branch"
+        ).prefetch_related(
+            "tags",
+            "authors",
+            "reviewers",
+            Prefetch(
+                "patchoncommitfest_set",
+                queryset=PatchOnCommitFest.objects.select_related(
+                    "commitfest"
+                ).order_by("-enterdate"),
+            ),
+            Prefetch(
+                "mailthread_set",
+                queryset=MailThread.objects.prefetch_related(
+                    Prefetch(
+                        "mailthreadattachment_set",
+                        queryset=_attachment_rows()[: PATCH_ATTACHMENTS_PAGE_SIZE + 1],
+                        to_attr="first_attachments",
+                    ),
+                    Prefetch(
+                        "mailthreadannotation_set",
+                        queryset=MailThreadAnnotation.objects.select_related("user"),
+                    ),
+                ),
+            ),
+            Prefetch(
+                "patchhistory_set",
+                queryset=_history_rows()[: PATCH_HISTORY_PAGE_SIZE + 1],
+                to_attr="first_history",
+            ),
+            Prefetch("cfbot_tasks", queryset=CfbotTask.objects.order_by("position")),
+        ),
+        pk=patchid,
     )
+
+
+@cache_anonymous_page("patch")
+@condition(etag_func=_patch_etag)
+def patch(request, patchid):
+    patch = load_patch_details(patchid)
+
+    patch_commitfests = patch.patchoncommitfest_set.all()
     cf = patch_commitfests[0].commitfest
 
-    committers = Committer.objects.filter(active=True).order_by(
-        "user__first_name", "user__last_name"
-    )
+    committers = get_reference_data().committers
 
     cfbot_branch = getattr(patch, "cfbot_branch", None)
-    cfbot_tasks = patch.cfbot_tasks.order_by("position") if cfbot_branch else []
+    cfbot_tasks = patch.cfbot_tasks.all() if cfbot_branch else []
+
+    history, history_cursor = _first_page(
+        patch.first_history, "history", PATCH_HISTORY_PAGE_SIZE
+    )
+    threads = list(patch.mailthread_set.all())
+    for t in threads:
+        t.attachments, t.attachments_cursor = _first_page(
+            t.first_attachments,
+            "attachments",
+            PATCH_ATTACHMENTS_PAGE_SIZE,
+        )
 
     # XXX: this creates a session, so find a smarter way. Probably handle
     # it in the callback and just ask the user then?
@@ -909,6 +1559,9 @@ def patch(request, patchid):
             "patch_commitfests": patch_commitfests,
             "cfbot_branch": cfbot_branch,
             "cfbot_tasks": cfbot_tasks,
+            "history": history,
+            "history_cursor": history_cursor,
+            "threads": threads,
             "is_committer": is_committer,
             "is_this_committer": is_this_committer,
             "is_reviewer": is_reviewer,
@@ -925,10 +1578,56 @@ def patch(request, patchid):
     )
 
 
+def _rows_response(request, template, context, cursor):
+    return JsonResponse(
+        {
+            "html": render_to_string(template, context),
+            "next": (
+                f"{request.path}?{patchlist_page_query(request, cursor)}"
+                if cursor
+                else None
+            ),
+        }
+    )
+
+
+def patch_history(request, patchid):
+    """The history entries of a patch after the ones shown on its page"""
+    patch = get_object_or_404(Patch, pk=patchid)
+    history, cursor = _next_page(
+        request,
+        _history_rows().filter(patch=patch),
+        "history",
+        PATCH_HISTORY_PAGE_SIZE,
+    )
+    return _rows_response(
+        request, "patch_history_rows.inc", {"history": history}, cursor
+    )
+
+
+def patch_attachments(request, patchid, threadid):
+    """The attachments of a thread after the ones shown on the patch page"""
+    thread = get_object_or_404(MailThread, pk=threadid, patches=patchid)
+    attachments, cursor = _next_page(
+        request,
+        _attachment_rows().filter(mailthread=thread),
+        "attachments",
+        PATCH_ATTACHMENTS_PAGE_SIZE,
+    )
+    return _rows_response(
+        request,
+        "patch_attachment_rows.inc",
+        {"attachments": attachments},
+        cursor,
+    )
+
+
 @login_required
 @transaction.atomic
 def patchform(request, patchid):
     patch = get_object_or_404(Patch, pk=patchid)
+    # The history records which authors, reviewers and tags were changed
+    patch.track_manytomany()
     cf = patch.current_commitfest()
 
     prevreviewers = list(patch.reviewers.all())
@@ -954,6 +1653,9 @@ def patchform(request, patchid):
                     patch=patch,
                     by=request.user,
                     what="Changed %s to %s" % (field, value),
+                    event=PatchHistory.EVENT_EDITED,
+                    data={"field": field},
+                    commitfest=cf,
                 ).save_and_notify(
                     prevcommitter=prevcommitter,
                     prevreviewers=prevreviewers,
@@ -961,6 +1663,8 @@ def patchform(request, patchid):
                 )
             r.set_modified()
             r.save()
+            r.update_summary()
+            invalidate_patch_pages(r)
             return HttpResponseRedirect("../../%s/" % r.pk)
         # Else fall through and render the page again
     else:
@@ -998,9 +1702,15 @@ def newpatch(request, cfid):
                 patch=patch, commitfest=cf, enterdate=datetime.now()
             )
             poc.save()
+            patch.update_summary()
             PatchHistory(
-                patch=patch, by=request.user, what="Created patch record"
+                patch=patch,
+                by=request.user,
+                what="Created patch record",
+                event=PatchHistory.EVENT_CREATED,
+                commitfest=cf,
             ).save()
+            invalidate_patch_pages(patch)
             # Now add the thread
             try:
                 doAttachThread(
@@ -1097,6 +1807,9 @@ def comment(request, patchid, what):
                     patch=poc.patch,
                     by=request.user,
                     what="New status: %s" % poc.statusstring,
+                    event=PatchHistory.EVENT_STATUS,
+                    data={"status": poc.status},
+                    commitfest=cf,
                 ).save_and_notify()
                 txt += "\n\nThe new status of this patch is: %s\n" % poc.statusstring
 
@@ -1139,7 +1852,11 @@ def comment(request, patchid, what):
                 patch=patch,
                 by=request.user,
                 what="Posted %s with messageid %s" % (what, msg["Message-ID"]),
+                event=PatchHistory.EVENT_POSTED,
+                data={"kind": what, "messageid": msg["Message-ID"]},
+                commitfest=cf,
             ).save()
+            invalidate_patch_pages(patch)
 
             messages.add_message(
                 request,
@@ -1202,7 +1919,12 @@ def status(request, patchid, status):
     if new_status != poc.status:
         poc.set_status(new_status)
         PatchHistory(
-            patch=poc.patch, by=request.user, what="New status: %s" % poc.statusstring
+            patch=poc.patch,
+            by=request.user,
+            what="New status: %s" % poc.statusstring,
+            event=PatchHistory.EVENT_STATUS,
+            data={"status": poc.status},
+            commitfest=cf,
         ).save_and_notify()
 
     return HttpResponseRedirect("/patch/%s/" % (poc.patch.id))
@@ -1272,6 +1994,9 @@ def close(request, patchid, status):
                 patch=poc.patch,
                 by=request.user,
                 what="Changed committer to %s" % committer,
+                event=PatchHistory.EVENT_EDITED,
+                data={"field": "committer"},
+                commitfest=poc.commitfest,
             ).save_and_notify(prevcommitter=prevcommitter)
 
         poc.status = PatchOnCommitFest.STATUS_COMMITTED
@@ -1283,12 +2008,17 @@ def close(request, patchid, status):
         "committed": PatchOnCommitFest.STATUS_COMMITTED,
     }
     poc.set_status(status_mapping[status])
+    if status == "committed":
+        poc.patch.update_summary()
 
     PatchHistory(
         patch=poc.patch,
         by=request.user,
         what="Closed in commitfest %s with status: %s"
         % (poc.commitfest, poc.statusstring),
+        event=PatchHistory.EVENT_CLOSED,
+        data={"status": poc.status},
+        commitfest=poc.commitfest,
     ).save_and_notify()
 
     return HttpResponseRedirect(f"/patch/{patchid}")
@@ -1341,6 +2071,8 @@ def reviewer(request, patchid, status):
             patch=patch,
             by=request.user,
             what="Added %s as reviewer" % request.user.username,
+            event=PatchHistory.EVENT_REVIEWER_ADDED,
+            data={"user": request.user.username},
         ).save_and_notify()
     elif status == "remove" and is_reviewer:
         patch.reviewers.remove(request.user)
@@ -1349,7 +2081,11 @@ def reviewer(request, patchid, status):
             patch=patch,
             by=request.user,
             what="Removed %s from reviewers" % request.user.username,
+            event=PatchHistory.EVENT_REVIEWER_REMOVED,
+            data={"user": request.user.username},
         ).save_and_notify()
+    patch.update_summary()
+    invalidate_patch_pages(patch)
     return HttpResponseRedirect("../../")
 
 
@@ -1370,11 +2106,14 @@ def remove_all_reviewers(request, patchid):
     patch.reviewers.clear()
     patch.set_modified()
     patch.save()
+    patch.update_summary()
     PatchHistory(
         patch=patch,
         by=request.user,
         what="Removed all reviewers",
+        event=PatchHistory.EVENT_REVIEWERS_REMOVED,
     ).save_and_notify(prevreviewers=prevreviewers)
+    invalidate_patch_pages(patch)
     return HttpResponseRedirect(f"/patch/{patchid}/")
 
 
@@ -1383,10 +2122,9 @@ def remove_all_reviewers(request, patchid):
 def committer(request, patchid, status):
     patch = get_object_or_404(Patch, pk=patchid)
 
-    committer = list(Committer.objects.filter(user=request.user, active=True))
-    if len(committer) == 0:
+    committer = get_reference_data().committers_by_user_id.get(request.user.id)
+    if committer is None:
         return HttpResponseForbidden("Only committers can do that!")
-    committer = committer[0]
 
     is_committer = committer == patch.committer
 
@@ -1398,6 +2136,8 @@ def committer(request, patchid, status):
             patch=patch,
             by=request.user,
             what="Added %s as committer" % request.user.username,
+            event=PatchHistory.EVENT_COMMITTER_ADDED,
+            data={"user": request.user.username},
         ).save_and_notify(prevcommitter=prevcommitter)
     elif status == "remove" and is_committer:
         patch.committer = None
@@ -1406,8 +2146,12 @@ def committer(request, patchid, status):
             patch=patch,
             by=request.user,
             what="Removed %s from committers" % request.user.username,
+            event=PatchHistory.EVENT_COMMITTER_REMOVED,
+            data={"user": request.user.username},
         ).save_and_notify(prevcommitter=prevcommitter)
     patch.save()
+    patch.update_summary()
+    invalidate_patch_pages(patch)
     return HttpResponseRedirect("../../")
 
 
@@ -1535,183 +2279,286 @@ def send_email(request, cfid):
     )
 
 
-@transaction.atomic
 def cfbot_ingest(message):
     """Ingest a single message status update message receive from cfbot.  It
-    should be a Python dictionary, decoded from JSON already."""
+    should be a Python dictionary, decoded from JSON already. Returns what
+    happened to it, see cfbot_ingest_batch."""
+    return cfbot_ingest_batch([message])[0]
 
-    cursor = connection.cursor()
 
-    branch_status = message["branch_status"]
-    patch_id = branch_status["submission_id"]
-    branch_id = branch_status["branch_id"]
-
-    try:
-        patch = Patch.objects.get(pk=patch_id)
-    except Patch.DoesNotExist:
-        # If the patch doesn't exist, there's nothing to do. This should never
+@transaction.atomic
+def cfbot_ingest_batch(messages):
+    """Ingest a list of status update messages received from cfbot, in the
+    order cfbot sent them, in a single transaction.
+
+    Returns a list with what happened to each message:
+    - "applied": its branch or task status was stored
+    - "stale": we already had, or the batch contained, the same or a newer
+      status (see below)
+    - "old_branch": the patch has a newer branch than the message is about
+    - "unknown_patch": the patch doesn't exist
+
+    During a full CI run cfbot sends thousands of messages, so all the
+    branches and tasks are upserted with one statement each, instead of a
+    handful of statements per message.
+    """
+    results = [None] * len(messages)
+    branches = [m["branch_status"] for m in messages]
+    patch_ids = sorted({b["submission_id"] for b in branches})
+
+    with connection.cursor() as cursor:
+        # Every message should have a branch_status, which we will INSERT
+        # or UPDATE.  We do this first, because cfbot_task refers to it.
+        # Due to the way messages are sent/queued by cfbot it's possible that
+        # it sends the messages out-of-order. To handle this we we only update
+        # in two cases:
+        # 1. The created time of the branch is newer than the one in our
+        #    database: This is a newer branch
+        # 2. If it's the same branch that we already have, but the modified
+        #    time is newer: This is a status update for the current branch that
+        #    we received in-order.
+        # A single statement can't update the same row twice, so of all the
+        # messages about a patch only the one that would win using these rules
+        # is used. Patches that don't exist are skipped. This should never
         # happen in production, but on the test system it's possible because
         # not it doesn't contain the newest patches that the CFBot knows about.
-        return
-
-    # Every message should have a branch_status, which we will INSERT
-    # or UPDATE.  We do this first, because cfbot_task refers to it.
-    # Due to the way messages are sent/queued by cfbot it's possible that it
-    # sends the messages out-of-order. To handle this we we only update in two
-    # cases:
-    # 1. The created time of the branch is newer than the one in our database:
-    #    This is a newer branch
-    # 2. If it's the same branch that we already have, but the modified time is
-    #    newer: This is a status update for the current branch that we received
-    #    in-order.
-    cursor.execute(
-        """INSERT INTO commitfest_cfbotbranch (patch_id, branch_id,
-                                                branch_name, commit_id,
-                                                apply_url, status,
-                                                created, modified,
-                                                version, patch_count,
-                                                first_additions, first_deletions,
-                                                all_additions, all_deletions
-                                                )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (patch_id) DO UPDATE
-                        SET status = EXCLUDED.status,
-                            modified = EXCLUDED.modified,
-                            branch_id = EXCLUDED.branch_id,
-                            branch_name = EXCLUDED.branch_name,
-                            commit_id = EXCLUDED.commit_id,
-                            apply_url = EXCLUDED.apply_url,
-                            created = EXCLUDED.created,
-                            version = EXCLUDED.version,
-                            patch_count = EXCLUDED.patch_count,
-                            first_additions = EXCLUDED.first_additions,
-                            first_deletions = EXCLUDED.first_deletions,
-                            all_additions = EXCLUDED.all_additions,
-                            all_deletions = EXCLUDED.all_deletions
-                        WHERE commitfest_cfbotbranch.created < EXCLUDED.created
-                            OR (commitfest_cfbotbranch.branch_id = EXCLUDED.branch_id
-                                AND commitfest_cfbotbranch.modified < EXCLUDED.modified)
-                        """,
-        (
-            patch_id,
-            branch_id,
-            branch_status["branch_name"],
-            branch_status["commit_id"],
-            branch_status["apply_url"],
-            branch_status["status"],
-            branch_status["created"],
-            branch_status["modified"],
-            branch_status["version"],
-            branch_status["patch_count"],
-            branch_status["first_additions"],
-            branch_status["first_deletions"],
-            branch_status["all_additions"],
-            branch_status["all_deletions"],
-        ),
-    )
-
-    # Now we check what we have in our database. If that contains a different
-    # branch_id than what we just tried to insert, then apparently this is a
-    # status update for an old branch and we don't care about any of the
-    # contents of this message.
-    branch_in_db = CfbotBranch.objects.get(pk=patch_id)
-    if branch_in_db.branch_id != branch_id:
-        return
-
-    # Most messages have a task_status.  It might be missing in rare cases, like
-    # when cfbot decides that a whole branch has timed out.  We INSERT or
-    # UPDATE.
-    if "task_status" in message:
-        task_status = message["task_status"]
-        if task_status["status"] in [x[0] for x in CfbotTask.STATUS_CHOICES]:
+        cursor.execute(
+            """WITH m AS (
+                SELECT DISTINCT ON (m.patch_id) m.*
+                FROM unnest(%s::int[], %s::int[], %s::int[], %s::text[],
+                            %s::text[], %s::text[], %s::text[],
+                            %s::timestamptz[], %s::timestamptz[], %s::text[],
+                            %s::int[], %s::int[], %s::int[], %s::int[],
+                            %s::int[])
+                    AS m(idx, patch_id, branch_id, branch_name, commit_id,
+                         apply_url, status, created, modified, version,
+                         patch_count, first_additions, first_deletions,
+                         all_additions, all_deletions)
+                INNER JOIN commitfest_patch p ON p.id = m.patch_id
+                ORDER BY m.patch_id, m.created DESC, m.modified DESC, m.idx
+            ), upserted AS (
+                INSERT INTO commitfest_cfbotbranch (patch_id, branch_id,
+                                                    branch_name, commit_id,
+                                                    apply_url, status,
+                                                    created, modified,
+                                                    version, patch_count,
+                                                    first_additions, first_deletions,
+                                                    all_additions, all_deletions
+                                                    )
+                SELECT patch_id, branch_id, branch_name, commit_id, apply_url,
+                       status::cfbotbranch_status, created, modified, version,
+                       patch_count, first_additions, first_deletions,
+                       all_additions, all_deletions
+                FROM m
+                ON CONFLICT (patch_id) DO UPDATE
+                    SET status = EXCLUDED.status,
+                        modified = EXCLUDED.modified,
+                        branch_id = EXCLUDED.branch_id,
+                        branch_name = EXCLUDED.branch_name,
+                        commit_id = EXCLUDED.commit_id,
+                        apply_url = EXCLUDED.apply_url,
+                        created = EXCLUDED.created,
+                        version = EXCLUDED.version,
+                        patch_count = EXCLUDED.patch_count,
+                        first_additions = EXCLUDED.first_additions,
+                        first_deletions = EXCLUDED.first_deletions,
+                        all_additions = EXCLUDED.all_additions,
+                        all_deletions = EXCLUDED.all_deletions
+                    WHERE commitfest_cfbotbranch.created < EXCLUDED.created
+                        OR (commitfest_cfbotbranch.branch_id = EXCLUDED.branch_id
+                            AND commitfest_cfbotbranch.modified < EXCLUDED.modified)
+                RETURNING patch_id
+            )
+            SELECT m.idx FROM m INNER JOIN upserted USING (patch_id)""",
+            [
+                list(range(len(branches))),
+                [b["submission_id"] for b in branches],
+                [b["branch_id"] for b in branches],
+                [b["branch_name"] for b in branches],
+                [b["commit_id"] for b in branches],
+                [b["apply_url"] for b in branches],
+                [b["status"] for b in branches],
+                [b["created"] for b in branches],
+                [b["modified"] for b in branches],
+                [b["version"] for b in branches],
+                [b["patch_count"] for b in branches],
+                [b["first_additions"] for b in branches],
+                [b["first_deletions"] for b in branches],
+                [b["all_additions"] for b in branches],
+                [b["all_deletions"] for b in branches],
+            ],
+        )
+        applied = {r[0] for r in cursor.fetchall()}
+
+        # Most messages have a task_status.  It might be missing in rare cases,
+        # like when cfbot decides that a whole branch has timed out.  We INSERT
+        # or UPDATE, but only for the branch that is now in our database. The
+        # others are status updates for an old branch and we don't care about
+        # them.
+        task_statuses = [x[0] for x in CfbotTask.STATUS_CHOICES]
+        tasks = [
+            (i, m["branch_status"], m["task_status"])
+            for i, m in enumerate(messages)
+            if "task_status" in m and m["task_status"]["status"] in task_statuses
+        ]
+        if tasks:
             cursor.execute(
-                """INSERT INTO commitfest_cfbottask (task_id, task_name, patch_id, branch_id,
-                                                position, status,
-                                                created, modified)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        ON CONFLICT (branch_id, position) DO UPDATE
-                            SET task_id = EXCLUDED.task_id,
-                                task_name = EXCLUDED.task_name,
-                                status = EXCLUDED.status,
-                                created = EXCLUDED.created,
-                                modified = EXCLUDED.modified
-                        WHERE commitfest_cfbottask.modified < EXCLUDED.modified""",
-                (
-                    task_status["task_id"],
-                    task_status["task_name"],
-                    patch_id,
-                    branch_id,
-                    task_status["position"],
-                    task_status["status"],
-                    task_status["created"],
-                    task_status["modified"],
-                ),
+                """WITH m AS (
+                    SELECT DISTINCT ON (m.branch_id, m.position) m.*
+                    FROM unnest(%s::int[], %s::text[], %s::text[], %s::int[],
+                                %s::int[], %s::int[], %s::text[],
+                                %s::timestamptz[], %s::timestamptz[])
+                        AS m(idx, task_id, task_name, patch_id, branch_id,
+                             position, status, created, modified)
+                    INNER JOIN commitfest_cfbotbranch b
+                        ON b.patch_id = m.patch_id AND b.branch_id = m.branch_id
+                    ORDER BY m.branch_id, m.position, m.modified DESC, m.idx
+                ), upserted AS (
+                    INSERT INTO commitfest_cfbottask (task_id, task_name, patch_id,
+                                                      branch_id, position, status,
+                                                      created, modified)
+                    SELECT task_id, task_name, patch_id, branch_id, position,
+                           status::cfbottask_status, created, modified
+                    FROM m
+                    ON CONFLICT (branch_id, position) DO UPDATE
+                        SET task_id = EXCLUDED.task_id,
+                            task_name = EXCLUDED.task_name,
+                            status = EXCLUDED.status,
+                            created = EXCLUDED.created,
+                            modified = EXCLUDED.modified
+                    WHERE commitfest_cfbottask.modified < EXCLUDED.modified
+                    RETURNING branch_id, position
+                )
+                SELECT m.idx FROM m INNER JOIN upserted USING (branch_id, position)""",
+                [
+                    [i for i, b, t in tasks],
+                    [t["task_id"] for i, b, t in tasks],
+                    [t["task_name"] for i, b, t in tasks],
+                    [b["submission_id"] for i, b, t in tasks],
+                    [b["branch_id"] for i, b, t in tasks],
+                    [t["position"] for i, b, t in tasks],
+                    [t["status"] for i, b, t in tasks],
+                    [t["created"] for i, b, t in tasks],
+                    [t["modified"] for i, b, t in tasks],
+                ],
             )
+            applied.update(r[0] for r in cursor.fetchall())
+
+        # Remove any old tasks that are not related to the current branch.
+        # These should only be left over when we just updated the branch_id.
+        # Knowing if we just updated the branch_id was is not trivial though,
+        # because INSERT ON CONFLICT does not allow us to easily return the old
+        # value of the row. So instead we always delete all tasks that are not
+        # related to the current branch. This is fine, because doing so is
+        # very cheap in the no-op case because we have an index on patch_id
+        # and there's only a handful of tasks per patch.
+        cursor.execute(
+            """DELETE FROM commitfest_cfbottask t
+            USING commitfest_cfbotbranch b
+            WHERE t.patch_id = b.patch_id AND b.patch_id = ANY(%s)
+                AND t.branch_id != b.branch_id""",
+            [patch_ids],
+        )
 
-    # Remove any old tasks that are not related to this branch. These should
-    # only be left over when we just updated the branch_id. Knowing if we just
-    # updated the branch_id was is not trivial though, because INSERT ON
-    # CONFLICT does not allow us to easily return the old value of the row.
-    # So instead we always delete all tasks that are not related to this
-    # branch. This is fine, because doing so is very cheap in the no-op case
-    # because we have an index on patch_id and there's only a handful of tasks
-    # per patch.
-    cursor.execute(
-        "DELETE FROM commitfest_cfbottask WHERE patch_id=%s AND branch_id != %s",
-        (patch_id, branch_id),
-    )
+        # Now we check what we have in our database.
+        cursor.execute(
+            """SELECT patch_id, branch_id, needs_rebase_since, failing_since
+            FROM commitfest_cfbotbranch WHERE patch_id = ANY(%s)""",
+            [patch_ids],
+        )
+        branches_in_db = {r[0]: r[1:] for r in cursor.fetchall()}
+
+        # We change the needs_rebase_since and failing_since fields separately,
+        # because this way we can find out what their previous state was (sadly
+        # INSERT ON CONFLICT does not allow us to return that). We need to know
+        # the previous state so we can skip sending notifications if the
+        # needs_rebase status did not change. The messages of each patch are
+        # applied to that state in the order cfbot sent them.
+        states = {}
+        rebase_changes = []
+        for i, message in enumerate(messages):
+            branch_status = message["branch_status"]
+            patch_id = branch_status["submission_id"]
+            if patch_id not in branches_in_db:
+                results[i] = "unknown_patch"
+                continue
+            branch_id, needs_rebase_since, failing_since = branches_in_db[patch_id]
+            # If the database contains a different branch_id than the one in
+            # the message, then apparently this is a status update for an old
+            # branch and we don't care about any of the contents of this
+            # message.
+            if branch_id != branch_status["branch_id"]:
+                results[i] = "old_branch"
+                continue
+            results[i] = "applied" if i in applied else "stale"
+
+            state = states.setdefault(patch_id, [needs_rebase_since, failing_since])
+            needs_rebase = branch_status["commit_id"] is None
+            if bool(state[0]) is not needs_rebase:
+                state[0] = datetime.now() if needs_rebase else None
+                rebase_changes.append((patch_id, needs_rebase))
+
+            failing = branch_status["status"] in ("failed", "timeout") or needs_rebase
+            finished = branch_status["status"] == "finished"
+
+            if (
+                "task_status" in message
+                and message["task_status"]["status"]
+                in (
+                    "ABORTED",
+                    "ERRORED",
+                    "FAILED",
+                )
+                and message["task_status"]["task_name"] != "FormattingCheck"
+            ):
+                failing = True
 
-    # We change the needs_rebase field using a separate UPDATE because this way
-    # we can find out what the previous state of the field was (sadly INSERT ON
-    # CONFLICT does not allow us to return that). We need to know the previous
-    # state so we can skip sending notifications if the needs_rebase status did
-    # not change.
-    needs_save = False
-    needs_rebase = branch_status["commit_id"] is None
-    if bool(branch_in_db.needs_rebase_since) is not needs_rebase:
-        if needs_rebase:
-            branch_in_db.needs_rebase_since = datetime.now()
-        else:
-            branch_in_db.needs_rebase_since = None
-        needs_save = True
+            if (failing or finished) and bool(state[1]) is not failing:
+                state[1] = datetime.now() if failing else None
 
-        if needs_rebase:
-            PatchHistory(
-                patch=patch, by=None, by_cfbot=True, what="Patch needs rebase"
-            ).save_and_notify(authors_only=True)
-        else:
-            PatchHistory(
-                patch=patch,
-                by=None,
-                by_cfbot=True,
-                what="Patch does not need rebase anymore",
-            ).save_and_notify(authors_only=True)
-
-    # Similarly, we change the failing_since field using a separate UPDATE
-    failing = branch_status["status"] in ("failed", "timeout") or needs_rebase
-    finished = branch_status["status"] == "finished"
-
-    if (
-        "task_status" in message
-        and message["task_status"]["status"]
-        in (
-            "ABORTED",
-            "ERRORED",
-            "FAILED",
-        )
-        and message["task_status"]["task_name"] != "FormattingCheck"
-    ):
-        failing = True
+        changed = [
+            (patch_id, state)
+            for patch_id, state in states.items()
+            if state != list(branches_in_db[patch_id][1:])
+        ]
+        if changed:
+            cursor.execute(
+                """UPDATE commitfest_cfbotbranch b
+                SET needs_rebase_since = u.needs_rebase_since,
+                    failing_since = u.failing_since
+                FROM unnest(%s::int[], %s::timestamptz[], %s::timestamptz[])
+                    AS u(patch_id, needs_rebase_since, failing_since)
+                WHERE b.patch_id = u.patch_id""",
+                [
+                    [patch_id for patch_id, state in changed],
+                    [state[0] for patch_id, state in changed],
+                    [state[1] for patch_id, state in changed],
+                ],
+            )
 
-    if (failing or finished) and bool(branch_in_db.failing_since) is not failing:
-        if failing:
-            branch_in_db.failing_since = datetime.now()
-        else:
-            branch_in_db.failing_since = None
-        needs_save = True
+        patches = Patch.objects.in_bulk([p for p, _ in rebase_changes])
+        for patch_id, needs_rebase in rebase_changes:
+            if needs_rebase:
+                PatchHistory(
+                    patch=patches[patch_id],
+                    by=None,
+                    by_cfbot=True,
+                    what="Patch needs rebase",
+                    event=PatchHistory.EVENT_NEEDS_REBASE,
+                ).save_and_notify(authors_only=True)
+            else:
+                PatchHistory(
+                    patch=patches[patch_id],
+                    by=None,
+                    by_cfbot=True,
+                    what="Patch does not need rebase anymore",
+                    event=PatchHistory.EVENT_REBASED,
+                ).save_and_notify(authors_only=True)
 
-    if needs_save:
-        branch_in_db.save()
+        # The CI status is shown on the commitfest and patch pages
+        invalidate_pages_of_patches(branches_in_db.keys())
+
+    return results
 
 
 @csrf_exempt
@@ -1723,6 +2570,11 @@ def cfbot_notify(request):
     if not hmac.compare_digest(j["shared_secret"], settings.CFBOT_SECRET):
         return HttpResponseForbidden(b"Invalid API key")
 
+    # cfbot can send many messages at once, as a list in "messages", and then
+    # gets back what happened to each of them.
+    if "messages" in j:
+        return JsonResponse({"results": cfbot_ingest_batch(j["messages"])})
+
     cfbot_ingest(j)
     return HttpResponse(status=200)
 
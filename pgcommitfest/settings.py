@@ -82,6 +82,7 @@ STATICFILES_FINDERS = ()
 SECRET_KEY = "REALLYCHANGETHISINLOCAL_SETTINGS.PY"
 
 MIDDLEWARE = (
+    "pgcommitfest.commitfest.memo.RequestMemoMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -174,6 +175,37 @@ AUTO_MOVE_EMAIL_ACTIVITY_DAYS = 30
 # Patches failing CI for longer than this many days will NOT be auto-moved
 AUTO_MOVE_MAX_FAILING_DAYS = 21
 
+# Number of worker threads per process that run independent queries of the
+# dashboard concurrently, each on its own database connection (see
+# run_on_snapshot in commitfest/util.py). With 0 all queries run one after
+# another on the connection of the request. Only enable this together with
+# persistent connections (CONN_MAX_AGE), otherwise connecting takes longer
+# than what running the queries concurrently saves.
+PARALLEL_QUERY_WORKERS = 0
+
+# Run the patch list queries as prepared statements (see execute_prepared in
+# commitfest/util.py), so that PostgreSQL can reuse their plans. Turn this off
+# when connecting through a connection pooler in transaction mode, where the
+# prepared statements of one transaction are gone in the next.
+PREPARED_STATEMENTS = True
+
+# Base URL of the ASGI application (pgcommitfest/asgi.py) that streams new
+# activity to open commitfest and activity pages, e.g.
+# "http://localhost:8008" in development, or "" when the web server sends
+# the */activity/stream/ URLs of the site itself to it. Every open page keeps
+# a stream open for minutes, so these are never served by the WSGI workers.
+# None turns the streams off.
+ACTIVITY_STREAM_URL = None
+
+# Pages for anonymous users are cached in the default cache (see
+# commitfest/cache.py). For invalidations to reach all processes serving the
+# site, production should override this with a shared cache like memcached.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 # Load local settings overrides
 try:
     from .local_settings import *  # noqa: F403
@@ -18,18 +18,27 @@ urlpatterns = [
     re_path(r"^$", views.home),
     re_path(r"^api/v1/commitfests/needs_ci$", apiv1.commitfestst_that_need_ci),
     re_path(r"^api/v1/commitfests/(\d+)/patches$", apiv1.commitfest_patches),
+    re_path(r"^api/v1/commitfests/(\d+)/patchlist$", apiv1.commitfest_patchlist),
     re_path(r"^api/v1/patches/(\d+)/threads$", apiv1.patch_threads),
+    re_path(r"^dashboard/statussummary/$", views.dashboard_statussummary),
+    re_path(r"^dashboard/section/(\w+)/$", views.dashboard_section),
     re_path(r"^help/$", views.help),
     re_path(r"^commitfest_history/$", views.commitfest_history),
     re_path(r"^me/$", views.me_legacy_redirect),
     re_path(r"^archive/$", views.archive),
-    re_path(r"^activity(?P<rss>\.rss)?/", views.activity),
+    re_path(r"^activity/stream/$", views.activity_stream),
+    re_path(r"^activity/", views.activity),
+    re_path(r"^activity\.rss/", views.activity_feed),
     re_path(r"^(\d+)/$", views.commitfest),
     re_path(r"^(open|inprogress|current|draft)/(.*)$", views.redir),
-    re_path(r"^(?P<cfid>\d+)/activity(?P<rss>\.rss)?/$", views.activity),
+    re_path(r"^(?P<cfid>\d+)/activity/$", views.activity),
+    re_path(r"^(?P<cfid>\d+)/activity/stream/$", views.activity_stream),
+    re_path(r"^(?P<cfid>\d+)/activity\.rss/$", views.activity_feed),
     re_path(r"^(\d+)/(\d+)/$", views.patch_legacy_redirect),
     re_path(r"^patch/(\d+)/$", views.patch),
     re_path(r"^patch/(\d+)/edit/$", views.patchform),
+    re_path(r"^patch/(\d+)/history/$", views.patch_history),
+    re_path(r"^patch/(\d+)/thread/(\d+)/attachments/$", views.patch_attachments),
     re_path(r"^(\d+)/new/$", views.newpatch),
     re_path(r"^patch/(\d+)/status/(review|author|committer)/$", views.status),
     re_path(r"^patch/(\d+)/close/(reject|withdrawn|feedback|committed)/$", views.close),
@@ -1,6 +1,8 @@
 from email.header import Header
 from email.utils import formataddr
 
+from pgcommitfest.commitfest.memo import memoized
+
 from .models import UserExtraEmail, UserProfile
 
 
@@ -10,8 +12,13 @@ class UserWrapper(object):
 
     @property
     def email(self):
+        # Sending a notification looks this up several times for the same
+        # users, so it's memoized for the request.
+        return memoized(("user_email", self.user.id), self._lookup_email)
+
+    def _lookup_email(self):
         try:
-            up = UserProfile.objects.get(user=self.user)
+            up = UserProfile.objects.select_related("selectedemail").get(user=self.user)
             if up.selectedemail:
                 return up.selectedemail.email
             else:
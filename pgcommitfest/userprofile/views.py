@@ -4,6 +4,8 @@ from django.db import transaction
 from django.http import HttpResponseRedirect
 from django.shortcuts import render
 
+from pgcommitfest.commitfest.cache import invalidate_user_dashboards
+
 from .forms import UserProfileForm
 from .models import UserProfile
 
@@ -17,6 +19,8 @@ def userprofile(request):
         form = UserProfileForm(request.user, request.POST, instance=profile)
         if form.is_valid():
             form.save()
+            # The profile decides how timestamps are shown on the dashboard
+            invalidate_user_dashboards([request.user.id])
             messages.add_message(request, messages.INFO, "User profile saved.")
             return HttpResponseRedirect(".")
     else: